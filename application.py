@@ -1,8 +1,112 @@
-from flask import Flask, render_template, request
-from pipeline.prediction_pipeline import hybrid_recommendation
+import os
+import time
+
+from flask import Flask, Response, g, jsonify, render_template, request
+from config.paths_config import CONFIG_PATH, RESULT_CACHE_PATH, SERVING_BUNDLE_PATH
+from pipeline.prediction_pipeline import cached_recommendation, cached_recommendation_batch, recommend_requests
+from src.custom_exception import CustomException
+from src.logger import get_logger
+from utils.artifact_store import BundleArtifactStore, get_artifact_store, set_artifact_store
+from utils.common_functions import read_yaml
+from utils import metrics
+from utils.id_encoder import encode_many
+from utils.micro_batcher import MicroBatcher
+from utils.result_cache import build_result_cache
+
+logger = get_logger(__name__)
 
 app = Flask(__name__)
 
+serving_config = read_yaml(CONFIG_PATH).get("serving", {})
+metrics.set_enabled(serving_config.get("metrics", {}).get("enabled", True))
+
+# Load every artifact once at startup; requests only read from memory.
+# The serving bundle, when training produced one, maps everything from a single file.
+bundle_config = serving_config.get("bundle", {})
+if bundle_config.get("enabled", True) and os.path.exists(SERVING_BUNDLE_PATH):
+    artifact_store = set_artifact_store(
+        BundleArtifactStore(SERVING_BUNDLE_PATH, verify=bundle_config.get("verify_checksums", False))
+    )
+else:
+    artifact_store = get_artifact_store()
+artifact_store.version_check_interval = serving_config.get("version_check_interval", 1.0)
+try:
+    artifact_store.warm_up()
+except CustomException as e:
+    # Boot anyway: requests needing the missing artifact fail, the rest are served
+    logger.error(f"Artifact warm-up failed, loading the remaining artifacts on first use: {e}")
+
+# Optional re-ranking with the model head (needs weights/model_head.npz from training)
+rerank_config = serving_config.get("rerank", {})
+rerank_weight = float(rerank_config.get("weight", 0.3)) if rerank_config.get("enabled", False) else 0.0
+if rerank_weight and artifact_store.model_head is None:
+    logger.warning("Re-ranking disabled: the model head was not exported by training.")
+    rerank_weight = 0.0
+
+# Results only change with the artifacts, so repeat requests are served from here
+result_cache = build_result_cache(serving_config.get("cache", {}), default_sqlite_path=RESULT_CACHE_PATH)
+
+# Concurrent API requests are queued for a few ms and scored together
+api_config = serving_config.get("api", {})
+recommendation_batcher = MicroBatcher(
+    # Each queued request carries the snapshot of the request that submitted it
+    lambda requests: recommend_requests(requests, store=artifact_store, rerank_weight=rerank_weight),
+    max_batch_size=api_config.get("max_batch_size", 256),
+    max_wait_ms=api_config.get("batch_window_ms", 5),
+)
+
+# Cache and batcher keep their own counters; /metrics reads them at scrape time
+if result_cache is not None:
+    metrics.CallbackMetric(
+        "recommendation_cache_evictions_total", "Result cache evictions (LRU and TTL), per process.", "counter",
+        ("reason",), lambda: {(reason,): result_cache.stats()[key]
+                              for reason, key in (("lru", "evictions"), ("ttl", "expirations"))},
+    )
+    metrics.CallbackMetric(
+        "recommendation_cache_entries", "Entries in the result cache.", "gauge",
+        (), lambda: {(): result_cache.stats()["entries"]},
+    )
+metrics.CallbackMetric(
+    "recommendation_batches_total", "Micro-batches scored for /api/recommendations.", "counter",
+    (), lambda: {(): recommendation_batcher.stats()["batches"]},
+)
+metrics.CallbackMetric(
+    "recommendation_batched_requests_total", "Requests scored through the micro-batcher.", "counter",
+    (), lambda: {(): recommendation_batcher.stats()["items"]},
+)
+
+
+def request_store():
+    """
+    Artifact snapshot for the current request, taken once: a new artifact
+    version is picked up (and the result cache emptied) between requests,
+    never in the middle of one.
+    """
+    if "artifacts" not in g:
+        if artifact_store.refresh() and result_cache is not None:
+            result_cache.clear()
+        g.artifacts = artifact_store.snapshot()
+    return g.artifacts
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or "unknown"
+    if "request_start" in g:
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, endpoint)
+    metrics.REQUESTS.inc(endpoint, str(response.status_code))
+    return response
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/', methods=['GET', 'POST'])
 def home():
     recommendations = None
@@ -11,7 +115,8 @@ def home():
     if request.method == 'POST':
         try:
             user_id = int(request.form.get("userID"))
-            recommendations = hybrid_recommendation(user_id)
+            recommendations = cached_recommendation(user_id, cache=result_cache, store=request_store(),
+                                                    rerank_weight=rerank_weight)
         except Exception as e:
             error = "An error occurred while generating recommendations."
             print(f"Error occurred: {e}")
@@ -20,5 +125,77 @@ def home():
                            recommendations=recommendations,
                            error=error)
 
+
+def _api_params(params):
+    return float(params.get("user_weight", 0.5)), float(params.get("content_weight", 0.5))
+
+
+@app.route('/api/recommendations', methods=['GET', 'POST'])
+def api_recommendations():
+    params = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    try:
+        user_id = int(params["user_id"])
+        user_weight, content_weight = _api_params(params)
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="user_id (int) is required; user_weight and content_weight must be numbers"), 400
+
+    try:
+        store = request_store()
+        # Unknown users never take a batch slot or a result cache entry
+        if encode_many(store.user2user_encoded, [user_id])[0] < 0:
+            return jsonify(error=f"User not found: {user_id}"), 404
+
+        def compute(user_ids):
+            return [recommendation_batcher((user_ids[0], user_weight, content_weight, store))]
+
+        recommendations = cached_recommendation_batch(
+            [user_id], user_weight, content_weight, cache=result_cache, store=store, compute=compute,
+            rerank_weight=rerank_weight,
+        )[0]
+    except CustomException as e:
+        logger.error(f"Recommendations failed for user {user_id}: {e}")
+        return jsonify(error=str(e)), 500
+    except Exception as e:
+        logger.error(f"Recommendations failed for user {user_id}: {e}")
+        return jsonify(error="An error occurred while generating recommendations."), 500
+
+    return jsonify(user_id=user_id, recommendations=recommendations)
+
+
+@app.route('/api/recommendations/bulk', methods=['POST'])
+def api_recommendations_bulk():
+    params = request.get_json(silent=True) or {}
+    try:
+        user_ids = [int(user_id) for user_id in params["user_ids"]]
+        user_weight, content_weight = _api_params(params)
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="user_ids (list of int) is required; user_weight and content_weight must be numbers"), 400
+
+    max_users = api_config.get("max_bulk_users", 10000)
+    if len(user_ids) > max_users:
+        return jsonify(error=f"At most {max_users} user_ids per request"), 400
+
+    try:
+        store = request_store()
+        known = encode_many(store.user2user_encoded, user_ids) >= 0
+        known_ids = [user_id for user_id, is_known in zip(user_ids, known) if is_known]
+
+        # Already a batch: scored directly, without going through the micro-batcher
+        recommendations = cached_recommendation_batch(
+            known_ids, user_weight, content_weight, cache=result_cache, store=store, rerank_weight=rerank_weight
+        ) if known_ids else []
+    except CustomException as e:
+        logger.error(f"Bulk recommendations failed for {len(user_ids)} users: {e}")
+        return jsonify(error=str(e)), 500
+    except Exception as e:
+        logger.error(f"Bulk recommendations failed for {len(user_ids)} users: {e}")
+        return jsonify(error="An error occurred while generating recommendations."), 500
+
+    return jsonify(
+        results=[{"user_id": user_id, "recommendations": recs} for user_id, recs in zip(known_ids, recommendations)],
+        unknown_user_ids=[user_id for user_id, is_known in zip(user_ids, known) if not is_known],
+    )
+
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,76 @@
+"""
+Recall@k vs. latency of the IVF index against exact search.
+
+    python -m benchmarks.bench_ann --rows 200000 --k 10
+    python -m benchmarks.bench_ann --weights weights/user_weights.pkl
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+from utils.ann_index import IVFIndex
+from utils.topk import top_k
+
+
+def synthetic_embeddings(n_rows, dim=128, n_clusters=256, seed=42):
+    """Clustered, L2-normalized vectors (roughly what trained embeddings look like)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n_rows)]
+    vectors += 0.6 * rng.standard_normal((n_rows, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(weights, k=10, n_queries=200, n_probes=(1, 2, 4, 8, 16, 32), n_lists=None, seed=42):
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(weights), min(n_queries, len(weights)), replace=False)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(weights, n_lists=n_lists, seed=seed)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact = [set(top_k(weights @ weights[q], k, self_index=q).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1e3
+
+    rows = []
+    for n_probe in n_probes:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        found = [index.search(weights, weights[q], k, n_probe, self_index=q)[0] for q in queries]
+        ann_ms = (time.perf_counter() - start) / len(queries) * 1e3
+
+        recall = np.mean([len(exact_ids & set(ids.tolist())) / k for exact_ids, ids in zip(exact, found)])
+        rows.append({"n_probe": n_probe, "recall": recall, "ann_ms": ann_ms, "speedup": exact_ms / ann_ms})
+
+    return {"rows": len(weights), "n_lists": index.n_lists, "build_s": build_s, "exact_ms": exact_ms, "probes": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weights", help="Embedding artifact (.pkl or .npy); synthetic data if omitted")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-lists", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.weights:
+        weights = np.load(args.weights) if args.weights.endswith(".npy") else joblib.load(args.weights)
+    else:
+        weights = synthetic_embeddings(args.rows)
+    weights = np.ascontiguousarray(weights, dtype=np.float32)
+
+    report = run(weights, args.k, args.queries, n_lists=args.n_lists)
+    print(f"rows={report['rows']} lists={report['n_lists']} build={report['build_s']:.1f}s "
+          f"exact={report['exact_ms']:.3f} ms/query")
+    print(f"{'n_probe':>8} {f'recall@{args.k}':>10} {'ms/query':>10} {'speedup':>8}")
+    for r in report["probes"]:
+        print(f"{r['n_probe']:>8} {r['recall']:>10.3f} {r['ann_ms']:>10.3f} {r['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Throughput and p50/p99 latency of per-request vs. micro-batched recommendations.
+
+    python -m benchmarks.bench_api --clients 32 --requests 2000 --window-ms 5
+
+Uses the trained artifacts under artifacts/. `--clients` threads each send
+requests back to back for random known users; "single" calls
+hybrid_recommendation per request, "batched" goes through the MicroBatcher
+used by /api/recommendations. The result cache is not involved.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from pipeline.prediction_pipeline import hybrid_recommendation, recommend_requests
+from utils.artifact_store import get_artifact_store
+from utils.micro_batcher import MicroBatcher
+
+
+def _load(fn, user_ids, n_clients):
+    latencies = [[] for _ in range(n_clients)]
+    chunks = np.array_split(user_ids, n_clients)
+
+    def client(i):
+        for user_id in chunks[i]:
+            start = time.perf_counter()
+            fn(int(user_id))
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ms = np.concatenate([np.asarray(l) for l in latencies]) * 1e3
+    return {"rps": len(user_ids) / wall, "p50_ms": np.percentile(ms, 50), "p99_ms": np.percentile(ms, 99)}
+
+
+def run(n_clients, n_requests, window_ms, max_batch_size, seed=42):
+    store = get_artifact_store()
+    store.warm_up()
+    rng = np.random.default_rng(seed)
+    user_ids = rng.choice(np.asarray(store.user2user_encoded.ids), n_requests)
+
+    batcher = MicroBatcher(lambda requests: recommend_requests(requests, store=store),
+                           max_batch_size=max_batch_size, max_wait_ms=window_ms)
+    report = {
+        "single": _load(lambda user_id: hybrid_recommendation(user_id, store=store), user_ids, n_clients),
+        "batched": _load(lambda user_id: batcher((user_id, 0.5, 0.5)), user_ids, n_clients),
+    }
+    report["batched"]["mean_batch_size"] = batcher.stats()["mean_batch_size"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    report = run(args.clients, args.requests, args.window_ms, args.max_batch_size)
+    print(f"clients={args.clients} requests={args.requests} window={args.window_ms} ms "
+          f"max_batch={args.max_batch_size} mean_batch={report['batched']['mean_batch_size']:.1f}")
+    print(f"{'mode':>8} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name in ("single", "batched"):
+        r = report[name]
+        print(f"{name:>8} {r['rps']:>10.1f} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
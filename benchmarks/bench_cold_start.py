@@ -0,0 +1,89 @@
+"""
+Worker cold start: separate artifact files vs. the single-file serving bundle.
+
+    python -m benchmarks.bench_cold_start --repeats 5
+
+Uses the trained artifacts under artifacts/ and weights/. Each run is a fresh
+interpreter that opens the store, warms it up and serves one
+hybrid_recommendation; the bundle is built into a temporary file first unless
+--bundle points at an existing one. Times exclude interpreter and import
+start-up, and are medians over --repeats runs.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def child(layout, bundle_path):
+    from pipeline.prediction_pipeline import hybrid_recommendation
+    from utils.artifact_store import ArtifactStore, BundleArtifactStore
+
+    start = time.perf_counter()
+    store = BundleArtifactStore(bundle_path) if layout == "bundle" else ArtifactStore()
+    opened = time.perf_counter()
+    store.warm_up()
+    warmed = time.perf_counter()
+    hybrid_recommendation(int(store.user2user_encoded.ids[0]), store=store)
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "open_ms": (opened - start) * 1e3,
+        "warm_up_ms": (warmed - opened) * 1e3,
+        "first_request_ms": (done - warmed) * 1e3,
+        "total_ms": (done - start) * 1e3,
+    }))
+
+
+def run(bundle_path, repeats):
+    results = {}
+    for layout in ("files", "bundle"):
+        runs = []
+        for _ in range(repeats):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", layout, "--bundle", bundle_path],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        results[layout] = {key: float(np.median([r[key] for r in runs])) for key in runs[0]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--bundle", help="Existing serving bundle (built from the current artifacts if omitted)")
+    parser.add_argument("--child", choices=["files", "bundle"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.bundle)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_cold_start_") as workdir:
+        bundle_path = args.bundle
+        if bundle_path is None:
+            from utils.artifact_store import ArtifactStore
+            from utils.serving_bundle import build_serving_bundle
+
+            bundle_path = os.path.join(workdir, "bundle.bin")
+            start = time.perf_counter()
+            build_serving_bundle(bundle_path, ArtifactStore())
+            print(f"bundle built in {time.perf_counter() - start:.2f}s "
+                  f"({os.path.getsize(bundle_path) / 2**20:.1f} MB)")
+
+        results = run(bundle_path, args.repeats)
+
+    print(f"{'layout':>8} {'open (ms)':>10} {'warm-up (ms)':>13} {'1st req (ms)':>13} {'total (ms)':>11}")
+    for layout, r in results.items():
+        print(f"{layout:>8} {r['open_ms']:>10.1f} {r['warm_up_ms']:>13.1f} "
+              f"{r['first_request_ms']:>13.1f} {r['total_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
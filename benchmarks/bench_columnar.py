@@ -0,0 +1,89 @@
+"""
+Load time and on-disk size: processed CSV/pickle layout vs. columnar .npy tables.
+
+    python -m benchmarks.bench_columnar --rows 5000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar import read_frame, read_table, table_nbytes, write_table
+
+
+def synthetic_ratings(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, max(1, n_rows // 500), n_rows)
+    anime = rng.integers(0, 17_000, n_rows)
+    return pd.DataFrame({
+        "user_id": users * 3 + 1,
+        "anime_id": anime * 2 + 1,
+        "rating": rng.integers(0, 11, n_rows) / 10.0,
+        "user": users,
+        "anime": anime,
+    })
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(n_rows, workdir):
+    df = synthetic_ratings(n_rows)
+    csv_path = os.path.join(workdir, "rating.csv")
+    table_path = os.path.join(workdir, "rating")
+
+    _, csv_write = _timed(lambda: df.to_csv(csv_path, index=False))
+    # DataProcessor stores ids/codes as int32
+    _, table_write = _timed(lambda: write_table(table_path, df.astype({
+        col: np.int32 for col in ["user_id", "anime_id", "user", "anime"]
+    })))
+
+    _, csv_read = _timed(lambda: pd.read_csv(csv_path))
+    _, csv_projected = _timed(lambda: pd.read_csv(csv_path, usecols=["user_id", "anime_id", "rating"]))
+    _, table_read = _timed(lambda: read_frame(table_path))
+    # Memory-mapped projection, touching every value once
+    _, table_projected = _timed(
+        lambda: [np.asarray(col).sum() for col in read_table(table_path, ["user_id", "anime_id", "rating"]).values()]
+    )
+
+    return {
+        "rows": n_rows,
+        "csv_mb": os.path.getsize(csv_path) / 2**20,
+        "table_mb": table_nbytes(table_path) / 2**20,
+        "csv_write_s": csv_write,
+        "table_write_s": table_write,
+        "csv_read_s": csv_read,
+        "table_read_s": table_read,
+        "csv_projected_s": csv_projected,
+        "table_projected_s": table_projected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_columnar_")
+    try:
+        r = run(args.rows, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"rows={r['rows']}")
+    print(f"{'':>22} {'CSV':>10} {'columnar':>10}")
+    print(f"{'size (MB)':>22} {r['csv_mb']:>10.1f} {r['table_mb']:>10.1f}")
+    print(f"{'write (s)':>22} {r['csv_write_s']:>10.3f} {r['table_write_s']:>10.3f}")
+    print(f"{'full load (s)':>22} {r['csv_read_s']:>10.3f} {r['table_read_s']:>10.3f}")
+    print(f"{'3-column load (s)':>22} {r['csv_projected_s']:>10.3f} {r['table_projected_s']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
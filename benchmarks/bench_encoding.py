@@ -0,0 +1,94 @@
+"""
+Time of encode_data: unique() + dict + Series.map vs. vectorized factorize.
+
+    python -m benchmarks.bench_encoding --rows 20000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.id_encoder import IdEncoder
+
+
+def synthetic_ratings_file(path, n_rows, seed=42):
+    """animelist.csv-shaped file with ~n_rows/500 users and 17k anime."""
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "user_id": rng.integers(0, max(1, n_rows // 500), n_rows) * 3 + 1,
+        "anime_id": rng.integers(0, 17_000, n_rows) * 2 + 1,
+        "rating": rng.integers(0, 11, n_rows),
+    }).to_csv(path, index=False)
+
+
+def encode_dicts(df):
+    """The previous encode_data body."""
+    user_ids = df["user_id"].unique().tolist()
+    user2user_encoded = {x: i for i, x in enumerate(user_ids)}
+    user2user_decoded = {i: x for i, x in enumerate(user_ids)}
+    users = df["user_id"].map(user2user_encoded)
+
+    anime_ids = df["anime_id"].unique().tolist()
+    anime2anime_encoded = {x: i for i, x in enumerate(anime_ids)}
+    anime2anime_decoded = {i: x for i, x in enumerate(anime_ids)}
+    anime = df["anime_id"].map(anime2anime_encoded)
+    return users.to_numpy(), anime.to_numpy(), user2user_decoded, anime2anime_decoded
+
+
+def encode_factorize(df):
+    users, user_encoder = IdEncoder.factorize(df["user_id"])
+    anime, anime_encoder = IdEncoder.factorize(df["anime_id"])
+    return users, anime, user_encoder, anime_encoder
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run(n_rows, workdir):
+    path = os.path.join(workdir, "animelist.csv")
+    synthetic_ratings_file(path, n_rows)
+    df = pd.read_csv(path, usecols=["user_id", "anime_id", "rating"])
+
+    (dict_users, dict_anime, _, _), dict_s = _timed(encode_dicts, df)
+    (users, anime, user_encoder, anime_encoder), factorize_s = _timed(encode_factorize, df)
+
+    if not (np.array_equal(dict_users, users) and np.array_equal(dict_anime, anime)):
+        raise AssertionError("factorize codes differ from the dict encoding")
+
+    return {
+        "rows": n_rows,
+        "users": len(user_encoder),
+        "anime": len(anime_encoder),
+        "dict_s": dict_s,
+        "factorize_s": factorize_s,
+        "dict_codes_mb": (dict_users.nbytes + dict_anime.nbytes) / 2**20,
+        "factorize_codes_mb": (users.nbytes + anime.nbytes) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_encoding_")
+    try:
+        r = run(args.rows, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"rows={r['rows']} users={r['users']} anime={r['anime']}")
+    print(f"{'':>16} {'dict+map':>10} {'factorize':>10}")
+    print(f"{'encode (s)':>16} {r['dict_s']:>10.3f} {r['factorize_s']:>10.3f}")
+    print(f"{'codes (MB)':>16} {r['dict_codes_mb']:>10.1f} {r['factorize_codes_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Keras training throughput with in-memory arrays vs the streaming tf.data pipeline.
+
+    python -m benchmarks.bench_input_pipeline --rows 2000000 --epochs 3
+
+Writes synthetic ratings as train/test column tables in a temporary
+directory, then trains RecommenderNet on them twice with the same batch size
+and learning rate: once passing whole arrays to model.fit (the "numpy"
+input pipeline) and once streaming through RatingDataset ("tf_data", with
+the training section of config.yaml). samples/sec comes from
+ThroughputLogger, so validation time is excluded. Needs TensorFlow.
+"""
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_training import synthetic_ratings
+from config.paths_config import CONFIG_PATH
+from utils.columnar import read_table, write_table
+from utils.common_functions import read_yaml
+
+
+def _write_splits(data, directory):
+    paths = {}
+    for name, (X, y) in zip(("train", "test"), data):
+        paths[name] = os.path.join(directory, name)
+        write_table(paths[name], {"user": X[0], "anime": X[1], "rating": y})
+    return paths
+
+
+def run(pipeline, paths, n_users, n_anime, training_config, epochs, lr):
+    from src.base_model import BaseModel
+    from src.input_pipeline import RatingDataset, ThroughputLogger
+
+    model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(n_users=n_users, n_anime=n_anime)
+    model.optimizer.learning_rate = lr
+
+    if pipeline == "tf_data":
+        train = RatingDataset(paths["train"], training_config)
+        test = RatingDataset(paths["test"], training_config)
+        inputs = {"x": train.build(shuffle=True), "validation_data": test.build(shuffle=False)}
+        n_samples = train.n_rows
+    else:
+        train = read_table(paths["train"], mmap=False)
+        test = read_table(paths["test"], mmap=False)
+        inputs = {
+            "x": [train["user"], train["anime"]],
+            "y": train["rating"],
+            "batch_size": training_config.get("batch_size", 10000),
+            "validation_data": ([test["user"], test["anime"]], test["rating"]),
+        }
+        n_samples = len(train["rating"])
+
+    throughput = ThroughputLogger(n_samples)
+    start = time.perf_counter()
+    history = model.fit(**inputs, epochs=epochs, verbose=0, callbacks=[throughput])
+    return {
+        "wall_s": time.perf_counter() - start,
+        # The first epoch includes tracing/graph building
+        "samples_per_sec": throughput.samples_per_sec,
+        "steady_samples_per_sec": float(np.mean(throughput.samples_per_sec[1:] or throughput.samples_per_sec)),
+        "val_loss": min(history.history["val_loss"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--anime", type=int, default=2_000)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--pipeline", choices=("numpy", "tf_data"), action="append",
+                        help="Run only these pipelines (default: both, each in this process)")
+    args = parser.parse_args()
+
+    training_config = read_yaml(CONFIG_PATH).get("training", {})
+    data = synthetic_ratings(args.users, args.anime, args.rows)
+    workdir = tempfile.mkdtemp(prefix="bench_input_pipeline_")
+    try:
+        paths = _write_splits(data, workdir)
+        del data
+        results = {
+            pipeline: run(pipeline, paths, args.users, args.anime, training_config, args.epochs, args.lr)
+            for pipeline in args.pipeline or ("numpy", "tf_data")
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"rows={args.rows} users={args.users} anime={args.anime} epochs={args.epochs} "
+          f"batch={training_config.get('batch_size', 10000)}")
+    print(f"{'pipeline':>8} {'wall (s)':>9} {'samples/s (steady)':>19} {'val loss':>9}  per epoch")
+    for name, r in results.items():
+        per_epoch = " ".join(f"{rate:,.0f}" for rate in r["samples_per_sec"])
+        print(f"{name:>8} {r['wall_s']:>9.1f} {r['steady_samples_per_sec']:>19,.0f} {r['val_loss']:>9.4f}  {per_epoch}")
+    print(f"peak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
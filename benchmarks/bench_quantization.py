@@ -0,0 +1,89 @@
+"""
+Memory, latency and top-k overlap of float16 / int8 embeddings against float32.
+
+    python -m benchmarks.bench_quantization --rows 500000 --k 10
+    python -m benchmarks.bench_quantization --weights weights/user_weights.npy
+
+float16 is scored the way serving loads it (utils.quantization.load_quantized):
+widened to float32 once, so it only saves disk. On 200k x 128 synthetic rows
+(1 CPU, NumPy 2.4, 100 queries, scoring + top-k):
+
+     precision  stored MB  resident MB  ms/query  top10 overlap
+       float32       97.7         97.7      15.8          1.000
+       float16       48.8         97.7      15.7          0.997
+          int8       25.2         25.2      11.4          0.959
+
+Scoring int8 as a single matmul instead measured ~3x slower than float32:
+NumPy widens the whole matrix into a temporary first.
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+from benchmarks.bench_ann import synthetic_embeddings
+from utils.quantization import QuantizedMatrix, quantize_int8
+from utils.topk import top_k
+
+
+def run(weights, k=10, n_queries=100, seed=42):
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(weights), min(n_queries, len(weights)), replace=False)
+
+    int8_values, int8_scale = quantize_int8(weights)
+    float16_values = weights.astype(np.float16)
+    matrices = {
+        "float32": (weights, weights.nbytes),
+        "float16": (float16_values.astype(np.float32), float16_values.nbytes),
+        "int8": (QuantizedMatrix(int8_values, int8_scale), int8_values.nbytes + int8_scale.nbytes),
+    }
+
+    reference = {}
+    results = []
+    for precision, (matrix, stored_bytes) in matrices.items():
+        start = time.perf_counter()
+        found = [top_k(matrix @ matrix[q], k, self_index=q) for q in queries]
+        latency_ms = (time.perf_counter() - start) / len(queries) * 1e3
+
+        if precision == "float32":
+            reference = {q: set(ids.tolist()) for q, ids in zip(queries, found)}
+        overlap = np.mean([len(reference[q] & set(ids.tolist())) / k for q, ids in zip(queries, found)])
+
+        results.append({
+            "precision": precision,
+            "stored_mb": stored_bytes / 2**20,
+            "resident_mb": matrix.nbytes / 2**20,
+            "ms_per_query": latency_ms,
+            "overlap": overlap,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weights", help="Embedding artifact (.pkl or .npy); synthetic data if omitted")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.weights:
+        weights = np.load(args.weights) if args.weights.endswith(".npy") else joblib.load(args.weights)
+    else:
+        weights = synthetic_embeddings(args.rows)
+    weights = np.ascontiguousarray(weights, dtype=np.float32)
+
+    results = run(weights, args.k, args.queries)
+    base = results[0]
+    print(f"{'precision':>10} {'stored MB':>10} {'resident MB':>12} {'saved':>7} {'ms/query':>9} {'speedup':>8} "
+          f"{f'top{args.k} overlap':>13}")
+    for r in results:
+        print(f"{r['precision']:>10} {r['stored_mb']:>10.1f} {r['resident_mb']:>12.1f} "
+              f"{1 - r['resident_mb'] / base['resident_mb']:>6.0%} {r['ms_per_query']:>9.3f} "
+              f"{base['ms_per_query'] / r['ms_per_query']:>7.2f}x {r['overlap']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
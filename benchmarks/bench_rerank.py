@@ -0,0 +1,86 @@
+"""
+Latency added by re-ranking candidates with the RecommenderNet head.
+
+    python -m benchmarks.bench_rerank --queries 200 --batch 256 --weight 0.3
+
+Uses the trained artifacts under artifacts/ and weights/ (including
+weights/model_head.npz). Times hybrid_recommendation per user and
+hybrid_recommendation_batch per block of --batch users, with re-ranking off
+and on, plus predict_ratings alone on the candidate pairs of one block.
+Also reports how much of each top-n list re-ranking changes.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_suite import latency_summary
+from pipeline.prediction_pipeline import hybrid_recommendation, hybrid_recommendation_batch, predict_ratings
+from utils.artifact_store import ArtifactStore
+
+
+def _timed_calls(fn, inputs):
+    seconds, results = [], []
+    for value in inputs:
+        start = time.perf_counter()
+        results.append(fn(value))
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds), results
+
+
+def run(store, n_queries, batch, weight, seed):
+    rng = np.random.default_rng(seed)
+    user_ids = store.user2user_encoded.ids
+    users = user_ids[rng.choice(len(user_ids), min(n_queries, len(user_ids)), replace=False)].tolist()
+    blocks = [users[i:i + batch] for i in range(0, len(users), batch)]
+
+    # One untimed pass so both variants start warm
+    hybrid_recommendation_batch(blocks[0], store=store, rerank_weight=weight)
+
+    results = {}
+    results["single"], plain = _timed_calls(lambda u: hybrid_recommendation(u, store=store), users)
+    results["single + rerank"], reranked = _timed_calls(
+        lambda u: hybrid_recommendation(u, store=store, rerank_weight=weight), users
+    )
+    results["batch/user"], _ = _timed_calls(lambda b: hybrid_recommendation_batch(b, store=store), blocks)
+    results["batch + rerank/user"], _ = _timed_calls(
+        lambda b: hybrid_recommendation_batch(b, store=store, rerank_weight=weight), blocks
+    )
+    for key in ("batch/user", "batch + rerank/user"):
+        results[key] = {k: v / batch if k.endswith("_ms") else v for k, v in results[key].items()}
+
+    # The scoring pass alone, on as many pairs as a block typically has (~60 candidates per user)
+    n_pairs = 60 * batch
+    user_codes = rng.integers(0, len(store.user_weights), n_pairs)
+    anime_codes = rng.integers(0, len(store.anime_weights), n_pairs)
+    results[f"predict_ratings ({n_pairs} pairs)"], _ = _timed_calls(
+        lambda _: predict_ratings(user_codes, anime_codes, store), range(20)
+    )
+
+    overlap = [len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(plain, reranked) if a]
+    return results, float(np.mean(overlap)) if overlap else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--weight", type=float, default=0.3, help="rerank_weight")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    store = ArtifactStore().warm_up()
+    if store.model_head is None:
+        raise SystemExit(f"{store.paths['model_head']} not found; train once to export the model head")
+
+    results, overlap = run(store, args.queries, args.batch, args.weight, args.seed)
+
+    print(f"{'call':>34} {'mean (ms)':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for label, r in results.items():
+        print(f"{label:>34} {r['mean_ms']:>10.3f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+    if overlap is not None:
+        print(f"mean top-n overlap with the vote ranking: {overlap:.0%}")
+
+
+if __name__ == "__main__":
+    main()
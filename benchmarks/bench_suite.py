@@ -0,0 +1,316 @@
+"""
+Benchmark suite on synthetic data: processing stages, training, helpers and end-to-end latency as JSON.
+
+    python -m benchmarks.bench_suite --users 20000 --anime 5000 --output results.json
+    python -m benchmarks.bench_suite --compare baseline.json results.json
+
+Generates raw CSVs with benchmarks/synthetic_data.py in a temporary directory,
+then times every DataProcessor stage, one NumPy training epoch, each helper in
+utils/helpers.py and hybrid_recommendation end to end (p50/p95/p99 over
+--queries random users). Artifacts go to the temporary directory; nothing
+under artifacts/ or weights/ is touched. --compare prints new/old ratios of
+every timing in two result files.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate
+from config.paths_config import *
+from pipeline.prediction_pipeline import hybrid_recommendation
+from src.data_processing import DataProcessor
+from src.numpy_trainer import NumpyRecommenderNet
+from utils.artifact_store import ArtifactStore
+from utils.columnar import read_table
+from utils.common_functions import read_yaml, save_array
+from utils.helpers import (
+    find_similar_animes,
+    find_similar_users,
+    getAnimeFrame,
+    getSynopsis,
+    get_user_preferences,
+    get_user_recommendations,
+)
+from utils.neighbour_table import NeighbourTable
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def latency_summary(seconds):
+    ms = np.asarray(seconds) * 1e3
+    return {
+        "n": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def _latencies(fn, inputs):
+    """Per-call latency of fn over inputs; calls that raise are counted, not timed."""
+    seconds, errors = [], 0
+    for args in inputs:
+        start = time.perf_counter()
+        try:
+            fn(*args)
+        except ValueError:
+            errors += 1
+            continue
+        seconds.append(time.perf_counter() - start)
+    return {**latency_summary(seconds), "errors": errors}
+
+
+def _processed(processed_dir, path):
+    return os.path.join(processed_dir, os.path.relpath(path, PROCESSED_DIR))
+
+
+def _weights(weights_dir, path):
+    return os.path.join(weights_dir, os.path.relpath(path, WEIGHTS_DIR))
+
+
+def bench_data_processing(raw, processed_dir, min_rating):
+    processor = DataProcessor(raw["animelist"], processed_dir, anime_file=raw["anime"], synopsis_file=raw["synopsis"])
+    stages = {
+        "load_data": lambda: processor.load_data(usecols=["user_id", "anime_id", "rating"]),
+        "filter_users": lambda: processor.filter_users(min_rating),
+        "scale_ratings": processor.scale_ratings,
+        "encode_data": processor.encode_data,
+        "build_rating_index": processor.build_rating_index,
+        "split_data": processor.split_data,
+        "save_artifacts": processor.save_artifacts,
+        "process_anime_data": processor.process_anime_data,
+    }
+    timings = {}
+    for name, fn in stages.items():
+        timings[f"{name}_s"] = _timed(fn)
+        if name == "load_data":
+            raw_rows = len(processor.rating_df)
+    timings["total_s"] = sum(timings.values())
+
+    sizes = {
+        "raw_rows": raw_rows,
+        "rating_rows": len(processor.rating_df),
+        "users": len(processor.user2user_encoded),
+        "anime": len(processor.anime2anime_encoded),
+    }
+    return timings, sizes
+
+
+def bench_training(processed_dir, weights_dir, config, epochs, learning_rate):
+    train = read_table(_processed(processed_dir, TRAIN_TABLE), ["user", "anime", "rating"])
+    test = read_table(_processed(processed_dir, TEST_TABLE), ["user", "anime", "rating"])
+    n_users = int(max(train["user"].max(), test["user"].max())) + 1
+    n_anime = int(max(train["anime"].max(), test["anime"].max())) + 1
+    batch_size = config.get("training", {}).get("batch_size", 10000)
+
+    model = NumpyRecommenderNet(n_users, n_anime, config["model"]["embedding_size"])
+    start = time.perf_counter()
+    history = model.fit(
+        [train["user"], train["anime"]], train["rating"],
+        ([test["user"], test["anime"]], test["rating"]),
+        batch_size=batch_size, epochs=epochs, learning_rate=lambda epoch: learning_rate, patience=epochs,
+    )
+    fit_s = time.perf_counter() - start
+
+    # Serving artifacts: L2-normalized embeddings and the anime neighbour table
+    os.makedirs(weights_dir, exist_ok=True)
+    user_weights = model.user_embedding / np.linalg.norm(model.user_embedding, axis=1, keepdims=True)
+    anime_weights = model.anime_embedding / np.linalg.norm(model.anime_embedding, axis=1, keepdims=True)
+    save_array(_weights(weights_dir, USER_WEIGHTS_NPY), user_weights.astype(np.float32))
+    save_array(_weights(weights_dir, ANIME_WEIGHTS_NPY), anime_weights.astype(np.float32))
+
+    table_config = config.get("neighbour_table", {})
+    neighbour_s = _timed(lambda: NeighbourTable.build(
+        anime_weights, k=table_config.get("k", 50), block_size=table_config.get("block_size", 1024)
+    ).save(_weights(weights_dir, ANIME_NEIGHBOURS_PATH)))
+
+    return {
+        "backend": "numpy",
+        "train_rows": len(train["rating"]),
+        "epochs": len(history["loss"]),
+        "epoch_s": fit_s / len(history["loss"]),
+        "samples_per_sec": float(np.mean(history["samples_per_sec"])),
+        "val_loss": float(history["val_loss"][-1]),
+        "neighbour_table_s": neighbour_s,
+    }
+
+
+def serving_store(processed_dir, weights_dir):
+    """ArtifactStore over the benchmark's own processed/ and weights/ directories."""
+    encoders = {
+        "user": _processed(processed_dir, USER_ENCODER),
+        "anime": _processed(processed_dir, ANIME_ENCODER),
+    }
+    return ArtifactStore(paths={
+        "user_weights": _weights(weights_dir, USER_WEIGHTS_NPY),
+        "anime_weights": _weights(weights_dir, ANIME_WEIGHTS_NPY),
+        "user_ann_index": _weights(weights_dir, USER_ANN_INDEX_PATH),
+        "anime_ann_index": _weights(weights_dir, ANIME_ANN_INDEX_PATH),
+        "anime_neighbours": _weights(weights_dir, ANIME_NEIGHBOURS_PATH),
+        "user2user_encoded": encoders["user"],
+        "user2user_decoded": encoders["user"],
+        "anime2anime_encoded": encoders["anime"],
+        "anime2anime_decoded": encoders["anime"],
+        "rating_df": _processed(processed_dir, RATING_TABLE),
+        "rating_index": _processed(processed_dir, RATING_INDEX),
+        "anime_df": _processed(processed_dir, ANIME_TABLE),
+        "synopsis_df": _processed(processed_dir, SYNOPSIS_TABLE),
+    })
+
+
+def bench_helpers(store, n_queries, rng):
+    paths = store.paths
+    user_ids = [int(u) for u in rng.choice(np.asarray(store.user2user_encoded.ids), n_queries)]
+
+    catalog = store.anime_catalog
+    encoded_anime = np.isin(catalog.columns["anime_id"], np.asarray(store.anime2anime_encoded.ids))
+    rows = rng.choice(np.flatnonzero(encoded_anime), n_queries)
+    anime_ids = [int(a) for a in catalog.columns["anime_id"][rows]]
+    anime_names = catalog.columns["eng_version"][rows].tolist()
+
+    def similar_users(user_id):
+        return find_similar_users(user_id, paths["user_weights"], paths["user2user_encoded"],
+                                  paths["user2user_decoded"], store=store)
+
+    def preferences(user_id):
+        return get_user_preferences(user_id, paths["rating_df"], paths["anime_df"], store)
+
+    # get_user_recommendations takes the outputs of the two helpers above
+    recommendation_inputs = [(similar_users(u), preferences(u)) for u in user_ids]
+
+    return {
+        "getAnimeFrame": _latencies(lambda a: getAnimeFrame(a, paths["anime_df"], store),
+                                    [(a,) for a in anime_ids]),
+        "getSynopsis": _latencies(lambda a: getSynopsis(a, paths["synopsis_df"], store),
+                                  [(a,) for a in anime_ids]),
+        "find_similar_animes": _latencies(
+            lambda name: find_similar_animes(name, paths["anime_weights"], paths["anime2anime_encoded"],
+                                             paths["anime2anime_decoded"], paths["anime_df"], store=store),
+            [(name,) for name in anime_names],
+        ),
+        "find_similar_users": _latencies(similar_users, [(u,) for u in user_ids]),
+        "get_user_preferences": _latencies(preferences, [(u,) for u in user_ids]),
+        "get_user_recommendations": _latencies(
+            lambda similar, pref: get_user_recommendations(similar, pref, paths["anime_df"], paths["synopsis_df"],
+                                                           paths["rating_df"], store=store),
+            recommendation_inputs,
+        ),
+    }
+
+
+def bench_end_to_end(store, n_queries, rng):
+    user_ids = [int(u) for u in rng.choice(np.asarray(store.user2user_encoded.ids), n_queries)]
+    return _latencies(lambda u: hybrid_recommendation(u, store=store), [(u,) for u in user_ids])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    config = read_yaml(CONFIG_PATH)
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        start = time.perf_counter()
+        raw = generate(os.path.join(workdir, "raw"), args.users, args.anime, args.ratings_per_user, args.seed)
+        generate_s = time.perf_counter() - start
+
+        processed_dir = os.path.join(workdir, "processed")
+        weights_dir = os.path.join(workdir, "weights")
+        processing, sizes = bench_data_processing(raw, processed_dir, args.min_rating)
+        training = bench_training(processed_dir, weights_dir, config, args.epochs, args.lr)
+
+        store = serving_store(processed_dir, weights_dir)
+        warm_up_s = _timed(store.warm_up)
+        helpers = bench_helpers(store, args.queries, rng)
+        end_to_end = bench_end_to_end(store, args.queries, rng)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+            "data": sizes,
+        },
+        "generate_s": generate_s,
+        "data_processing": processing,
+        "training": training,
+        "serving": {"warm_up_s": warm_up_s, "helpers": helpers, "hybrid_recommendation": end_to_end},
+    }
+
+
+def _timings(report, prefix=""):
+    """Flatten a report to {dotted.key: value} for every *_s / *_ms timing."""
+    flat = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_timings(value, f"{name}."))
+        elif key.endswith(("_s", "_ms")) and isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = _timings(json.load(f))
+    with open(new_path) as f:
+        new = _timings(json.load(f))
+
+    print(f"{'metric':<60} {'old':>10} {'new':>10} {'new/old':>8}")
+    for name in sorted(old.keys() & new.keys()):
+        ratio = new[name] / old[name] if old[name] else float("nan")
+        print(f"{name:<60} {old[name]:>10.3f} {new[name]:>10.3f} {ratio:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--anime", type=int, default=5_000)
+    parser.add_argument("--ratings-per-user", type=int, default=200)
+    parser.add_argument("--min-rating", type=int, default=400, help="DataProcessor.filter_users threshold")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here (stdout if omitted)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Synopsis lookups: filtering the synopsis frame vs. the offset-indexed synopsis store.
+
+    python -m benchmarks.bench_synopsis --anime 12000 --queries 2000
+
+Builds a synthetic anime_with_synopsis table (benchmarks/synthetic_data.py)
+and times, per lookup by anime id: the former getSynopsis (boolean filter over
+the frame), the store (binary search + blob slice), the store with zlib block
+compression, and batch lookups of --batch ids at a time. Also reports the
+on-disk size of each store layout.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_suite import latency_summary
+from benchmarks.synthetic_data import anime_table, synopsis_table
+from utils.synopsis_store import SynopsisStore, synopsis_columns
+
+
+def frame_lookup(df, anime_id):
+    id_col, _, text_col = synopsis_columns(df)
+    row = df[df[id_col] == anime_id]
+    return None if row.empty else row[text_col].values[0]
+
+
+def _per_call(fn, inputs):
+    seconds = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def _store_bytes(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def run(n_anime, n_queries, batch, seed):
+    rng = np.random.default_rng(seed)
+    df = synopsis_table(anime_table(n_anime, rng), rng)
+    anime_ids = rng.choice(df["MAL_ID"].to_numpy(), n_queries).tolist()
+
+    results = {"frame filter": _per_call(lambda a: frame_lookup(df, a), anime_ids)}
+    expected = [frame_lookup(df, a) for a in anime_ids]
+
+    with tempfile.TemporaryDirectory(prefix="bench_synopsis_") as workdir:
+        sizes = {}
+        for compression in (None, "zlib"):
+            label = f"store ({compression or 'plain'})"
+            directory = os.path.join(workdir, label)
+            SynopsisStore.from_frame(df, compression=compression).save(directory)
+            sizes[label] = _store_bytes(directory)
+
+            store = SynopsisStore.load(directory)
+            if store.get_many(anime_ids) != expected:
+                raise AssertionError(f"{label} lookups differ from the frame filter")
+
+            # Fresh store, so the zlib timings start with an empty block cache
+            store = SynopsisStore.load(directory)
+            results[label] = _per_call(store.get, anime_ids)
+            batches = [anime_ids[i:i + batch] for i in range(0, len(anime_ids), batch)]
+            summary = _per_call(store.get_many, batches)
+            results[f"{label} batch/id"] = {
+                key: value / batch if key.endswith("_ms") else value for key, value in summary.items()
+            }
+
+    return results, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--anime", type=int, default=12_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--batch", type=int, default=10, help="Ids per get_many call")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results, sizes = run(args.anime, args.queries, args.batch, args.seed)
+
+    print(f"{'lookup':>24} {'mean (us)':>10} {'p50 (us)':>9} {'p99 (us)':>9}")
+    for label, r in results.items():
+        print(f"{label:>24} {r['mean_ms'] * 1e3:>10.1f} {r['p50_ms'] * 1e3:>9.1f} {r['p99_ms'] * 1e3:>9.1f}")
+    for label, size in sizes.items():
+        print(f"{label}: {size / 2**20:.1f} MB on disk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Micro-benchmark: full argsort vs. partial top-k selection on similarity scores.
+
+    python -m benchmarks.bench_topk --sizes 10000 100000 1000000 --k 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.topk import top_k
+
+
+def _best_time(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, k=10, dim=128, repeats=5, seed=42):
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for n_rows in sizes:
+        weights = rng.standard_normal((n_rows, dim), dtype=np.float32)
+        weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+        query = 0
+        dists = weights @ weights[query]
+
+        argsort_s = _best_time(lambda: np.argsort(dists)[-(k + 1):], repeats)
+        topk_s = _best_time(lambda: top_k(dists, k, self_index=query), repeats)
+
+        results.append({
+            "rows": n_rows,
+            "argsort_ms": argsort_s * 1e3,
+            "top_k_ms": topk_s * 1e3,
+            "speedup": argsort_s / topk_s,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'argsort ms':>12} {'top_k ms':>10} {'speedup':>8}")
+    for r in run(args.sizes, args.k, args.dim, args.repeats):
+        print(f"{r['rows']:>10} {r['argsort_ms']:>12.3f} {r['top_k_ms']:>10.3f} {r['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Wall-clock time and val loss of the Keras and NumPy training backends.
+
+    python -m benchmarks.bench_training --users 5000 --anime 2000 --rows 2000000 --epochs 5
+
+Both backends train RecommenderNet on the same synthetic ratings with the same
+batch size, epochs and a fixed learning rate. The Keras row is skipped when
+TensorFlow is not installed; its time includes importing TensorFlow.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from config.paths_config import CONFIG_PATH
+from src.numpy_trainer import NumpyRecommenderNet
+from utils.common_functions import read_yaml
+
+
+def synthetic_ratings(n_users, n_anime, n_rows, rank=8, test_size=10_000, seed=42):
+    """Ratings in [0, 1] from a low-rank user x anime affinity plus noise."""
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(size=(n_users, rank)).astype(np.float32)
+    anime_factors = rng.normal(size=(n_anime, rank)).astype(np.float32)
+
+    users = rng.integers(0, n_users, n_rows).astype(np.int32)
+    anime = rng.integers(0, n_anime, n_rows).astype(np.int32)
+    affinity = np.einsum("ij,ij->i", user_factors[users], anime_factors[anime]) / np.sqrt(rank)
+    ratings = np.clip(1 / (1 + np.exp(-affinity)) + rng.normal(0, 0.05, n_rows), 0, 1).astype(np.float32)
+
+    train, test = slice(0, n_rows - test_size), slice(n_rows - test_size, n_rows)
+    return ([users[train], anime[train]], ratings[train]), ([users[test], anime[test]], ratings[test])
+
+
+def run_numpy(data, n_users, n_anime, embedding_size, batch_size, epochs, lr):
+    (X_train, y_train), (X_test, y_test) = data
+    start = time.perf_counter()
+    model = NumpyRecommenderNet(n_users, n_anime, embedding_size)
+    history = model.fit(X_train, y_train, (X_test, y_test), batch_size=batch_size, epochs=epochs,
+                        learning_rate=lambda epoch: lr, patience=epochs)
+    return time.perf_counter() - start, min(history["val_loss"])
+
+
+def run_keras(data, n_users, n_anime, batch_size, epochs, lr):
+    (X_train, y_train), (X_test, y_test) = data
+    start = time.perf_counter()
+    try:
+        from src.base_model import BaseModel
+    except ImportError:
+        return None
+
+    model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(n_users=n_users, n_anime=n_anime)
+    model.optimizer.learning_rate = lr
+    history = model.fit(x=X_train, y=y_train, batch_size=batch_size, epochs=epochs, verbose=0,
+                        validation_data=(X_test, y_test))
+    return time.perf_counter() - start, min(history.history["val_loss"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--anime", type=int, default=2_000)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    config = read_yaml(CONFIG_PATH)
+    embedding_size = config["model"]["embedding_size"]
+    batch_size = args.batch_size or config.get("training", {}).get("batch_size", 10000)
+
+    data = synthetic_ratings(args.users, args.anime, args.rows)
+    results = {
+        "numpy": run_numpy(data, args.users, args.anime, embedding_size, batch_size, args.epochs, args.lr),
+        "keras": run_keras(data, args.users, args.anime, batch_size, args.epochs, args.lr),
+    }
+
+    print(f"rows={args.rows} users={args.users} anime={args.anime} epochs={args.epochs} batch={batch_size}")
+    print(f"{'backend':>8} {'wall (s)':>10} {'val loss':>10}")
+    for name, result in results.items():
+        if result is None:
+            print(f"{name:>8} {'skipped (TensorFlow not installed)':>22}")
+        else:
+            print(f"{name:>8} {result[0]:>10.2f} {result[1]:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
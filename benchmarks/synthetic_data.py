@@ -0,0 +1,157 @@
+"""
+Synthetic raw data in the schema of the Kaggle anime dataset.
+
+    python -m benchmarks.synthetic_data --output-dir /tmp/anime_raw --users 20000 --anime 5000
+
+Writes animelist.csv, anime.csv and anime_with_synopsis.csv with the columns
+the real files have. Ratings come from a low-rank user x anime affinity so a
+trained model has something to learn; user activity is log-normal and anime
+popularity Zipf-like, roughly like the real data.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+GENRES = np.array([
+    "Action", "Adventure", "Comedy", "Drama", "Fantasy", "Horror", "Mecha", "Music", "Mystery",
+    "Psychological", "Romance", "Sci-Fi", "Slice of Life", "Sports", "Supernatural", "Thriller",
+])
+TYPES = np.array(["TV", "Movie", "OVA", "ONA", "Special", "Music"])
+SOURCES = np.array(["Manga", "Original", "Light novel", "Visual novel", "Game", "Novel"])
+SEASONS = np.array(["Spring", "Summer", "Fall", "Winter"])
+WORDS = np.array([
+    "a", "the", "young", "girl", "boy", "world", "school", "friends", "battle", "secret", "power",
+    "journey", "city", "dream", "war", "love", "team", "mysterious", "ancient", "future", "must",
+    "discovers", "fight", "save", "family", "life", "new", "strange", "hero", "village",
+])
+
+FILE_NAMES = {
+    "animelist": "animelist.csv",
+    "anime": "anime.csv",
+    "synopsis": "anime_with_synopsis.csv",
+}
+
+
+def _unknown(values, rng, fraction):
+    """Object column with `fraction` of the entries replaced by "Unknown", as in anime.csv."""
+    values = np.asarray(values).astype(object)
+    values[rng.random(len(values)) < fraction] = "Unknown"
+    return values
+
+
+def anime_table(n_anime, rng):
+    """anime.csv: MAL_ID, Name, Score, Genres, English name, ... (string columns use "Unknown")."""
+    mal_ids = np.sort(rng.choice(np.arange(1, n_anime * 3 + 1), n_anime, replace=False))
+    names = np.array([f"Anime {i}" for i in mal_ids], dtype=object)
+    english = np.array([f"Anime {i} (EN)" for i in mal_ids], dtype=object)
+
+    n_genres = rng.integers(1, 5, n_anime)
+    genres = [", ".join(rng.choice(GENRES, k, replace=False)) for k in n_genres]
+    members = (rng.pareto(1.2, n_anime) * 1000).astype(np.int64) + 10
+    years = rng.integers(1970, 2021, n_anime)
+
+    df = pd.DataFrame({
+        "MAL_ID": mal_ids,
+        "Name": names,
+        "Score": _unknown(np.round(rng.uniform(4.0, 9.2, n_anime), 2), rng, 0.05),
+        "Genres": genres,
+        "English name": _unknown(english, rng, 0.3),
+        "Japanese name": names,
+        "Type": rng.choice(TYPES, n_anime),
+        "Episodes": _unknown(rng.integers(1, 100, n_anime), rng, 0.02),
+        "Aired": [f"{year}" for year in years],
+        "Premiered": _unknown([f"{s} {y}" for s, y in zip(rng.choice(SEASONS, n_anime), years)], rng, 0.5),
+        "Producers": "Unknown",
+        "Licensors": "Unknown",
+        "Studios": "Unknown",
+        "Source": rng.choice(SOURCES, n_anime),
+        "Duration": "24 min. per ep.",
+        "Rating": "PG-13 - Teens 13 or older",
+        "Ranked": _unknown(np.arange(1, n_anime + 1), rng, 0.05),
+        "Popularity": np.argsort(np.argsort(-members)) + 1,
+        "Members": members,
+        "Favorites": members // 50,
+        "Watching": members // 10,
+        "Completed": members // 2,
+        "On-Hold": members // 40,
+        "Dropped": members // 30,
+        "Plan to Watch": members // 5,
+    })
+    for score in range(10, 0, -1):
+        df[f"Score-{score}"] = _unknown(members // (2 * score), rng, 0.05)
+    return df
+
+
+def synopsis_table(anime_df, rng, words_per_synopsis=60):
+    """anime_with_synopsis.csv: MAL_ID, Name, Score, Genres, sypnopsis (the column is misspelled upstream)."""
+    n = len(anime_df)
+    words = rng.choice(WORDS, (n, words_per_synopsis))
+    return pd.DataFrame({
+        "MAL_ID": anime_df["MAL_ID"],
+        "Name": anime_df["Name"],
+        "Score": anime_df["Score"],
+        "Genres": anime_df["Genres"],
+        "sypnopsis": [" ".join(row) + "." for row in words],
+    })
+
+
+def animelist_table(n_users, anime_ids, popularity, ratings_per_user, rng, rank=8):
+    """animelist.csv: user_id, anime_id, rating, watching_status, watched_episodes."""
+    n_anime = len(anime_ids)
+    counts = np.maximum(1, rng.lognormal(np.log(ratings_per_user), 0.8, n_users)).astype(np.int64)
+    counts = np.minimum(counts, n_anime)
+
+    users = np.repeat(np.arange(n_users), counts)
+    p = popularity / popularity.sum()
+    anime = rng.choice(n_anime, len(users), p=p)
+
+    user_factors = rng.normal(size=(n_users, rank)).astype(np.float32)
+    anime_factors = rng.normal(size=(n_anime, rank)).astype(np.float32)
+    affinity = np.einsum("ij,ij->i", user_factors[users], anime_factors[anime]) / np.sqrt(rank)
+    ratings = np.clip(np.rint(5.5 + 2.5 * affinity + rng.normal(0, 1.0, len(users))), 1, 10).astype(np.int64)
+    # Plan-to-watch / unscored entries carry rating 0
+    ratings[rng.random(len(users)) < 0.2] = 0
+
+    return pd.DataFrame({
+        "user_id": users,
+        "anime_id": anime_ids[anime],
+        "rating": ratings,
+        "watching_status": rng.integers(1, 7, len(users)),
+        "watched_episodes": rng.integers(0, 30, len(users)),
+    })
+
+
+def generate(output_dir, n_users=20_000, n_anime=5_000, ratings_per_user=200, seed=42):
+    """Write the three raw CSVs to `output_dir`; returns {"animelist"|"anime"|"synopsis": path}."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {name: os.path.join(output_dir, file_name) for name, file_name in FILE_NAMES.items()}
+
+    anime_df = anime_table(n_anime, rng)
+    anime_df.to_csv(paths["anime"], index=False)
+    synopsis_table(anime_df, rng).to_csv(paths["synopsis"], index=False)
+
+    popularity = anime_df["Members"].to_numpy().astype(np.float64)
+    animelist = animelist_table(n_users, anime_df["MAL_ID"].to_numpy(), popularity, ratings_per_user, rng)
+    animelist.to_csv(paths["animelist"], index=False)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--anime", type=int, default=5_000)
+    parser.add_argument("--ratings-per-user", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    paths = generate(args.output_dir, args.users, args.anime, args.ratings_per_user, args.seed)
+    for path in paths.values():
+        print(f"{path}: {os.path.getsize(path) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,17 +16,26 @@ RAW_DIR = os.path.join(ARTIFACTS_DIR, "raw")
 
 PROCESSED_DIR = os.path.join(ARTIFACTS_DIR, "processed")
 ANIMELIST_CSV = os.path.join(ARTIFACTS_DIR, "raw", "animelist.csv")
-ANIME_CSV = os.path.join(ARTIFACTS_DIR, "raw", "animelist.csv")
+ANIME_CSV = os.path.join(ARTIFACTS_DIR, "raw", "anime.csv")
 ANIMESYNOPSIS_CSV = os.path.join(ARTIFACTS_DIR, "raw", "anime_with_synopsis.csv")
 
-X_TRAIN_ARRAY = os.path.join(PROCESSED_DIR, "X_train_array.pkl")
-X_TEST_ARRAY = os.path.join(PROCESSED_DIR, "X_test_array.pkl")
-Y_TRAIN = os.path.join(PROCESSED_DIR, "y_train.pkl")
-Y_TEST = os.path.join(PROCESSED_DIR, "y_test.pkl")
-
+# Columnar tables: one .npy per column + manifest.json (see utils/columnar.py)
+TRAIN_TABLE = os.path.join(PROCESSED_DIR, "train")
+TEST_TABLE = os.path.join(PROCESSED_DIR, "test")
+RATING_TABLE = os.path.join(PROCESSED_DIR, "rating")
+ANIME_TABLE = os.path.join(PROCESSED_DIR, "anime_df")
+SYNOPSIS_TABLE = os.path.join(PROCESSED_DIR, "synopsis_df")
+# Synopses indexed by anime_id: sorted ids + offsets + UTF-8 blob (see utils/synopsis_store.py)
+SYNOPSIS_STORE = os.path.join(PROCESSED_DIR, "synopsis_store")
+# Fingerprinted DataProcessor stage outputs (see utils/stage_cache.py)
+STAGE_CACHE_DIR = os.path.join(PROCESSED_DIR, "stage_cache")
+
+# Legacy CSV layout, still readable by the serving path
 RATING_DF = os.path.join(PROCESSED_DIR, "rating.csv")
 DF = os.path.join(PROCESSED_DIR, "anime_df.csv")
 SYNOPSIS_DF = os.path.join(PROCESSED_DIR, "synopsis_df.csv")
+RATING_INDEX = os.path.join(PROCESSED_DIR, "rating_index.npz")
+RATING_SCALE = os.path.join(PROCESSED_DIR, "rating_scale.json")
 
 USER2USER_ENCODED = os.path.join(PROCESSED_DIR, "user2user_encoded.pkl")
 USER2USER_DECODED = os.path.join(PROCESSED_DIR, "user2user_decoded.pkl")
@@ -34,17 +43,37 @@ USER2USER_DECODED = os.path.join(PROCESSED_DIR, "user2user_decoded.pkl")
 ANIME2ANIME_ENCODED = os.path.join(PROCESSED_DIR, "anime2anime_encoded.pkl")
 ANIME2ANIME_DECODED = os.path.join(PROCESSED_DIR, "anime2anime_decoded.pkl")
 
+# Array-backed encoders (ids by code + sorted ids/codes), memory-mappable
+USER_ENCODER = os.path.join(PROCESSED_DIR, "user_encoder.npy")
+ANIME_ENCODER = os.path.join(PROCESSED_DIR, "anime_encoder.npy")
+
 
 ###################### MODEL TRAINING #########################
 
 MODEL_DIR = os.path.join(PROJECT_ROOT, "model")
 WEIGHTS_DIR = os.path.join(PROJECT_ROOT, "weights")
 MODEL_PATH = os.path.join(MODEL_DIR, "model.h5")
+NUMPY_MODEL_PATH = os.path.join(MODEL_DIR, "model_numpy.npz")
 ANIME_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR,"anime_weights.pkl")
 USER_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR,"user_weights.pkl")
+ANIME_WEIGHTS_NPY = os.path.join(WEIGHTS_DIR, "anime_weights.npy")
+USER_WEIGHTS_NPY = os.path.join(WEIGHTS_DIR, "user_weights.npy")
+ANIME_ANN_INDEX_PATH = os.path.join(WEIGHTS_DIR, "anime_ann_index.npz")
+USER_ANN_INDEX_PATH = os.path.join(WEIGHTS_DIR, "user_ann_index.npz")
+ANIME_NEIGHBOURS_PATH = os.path.join(WEIGHTS_DIR, "anime_neighbours.npz")
+# Dense + BatchNorm parameters of RecommenderNet (see src/numpy_trainer.py)
+MODEL_HEAD_PATH = os.path.join(WEIGHTS_DIR, "model_head.npz")
 CHECKPOINT_FILE_PATH = os.path.join(ARTIFACTS_DIR, "model_checkpoint", "weights.weights.h5")
 
 
+################ SERVING ################
+RESULT_CACHE_PATH = os.path.join(ARTIFACTS_DIR, "cache", "recommendations.sqlite")
+# Single-file, memory-mappable copy of every serving artifact (see utils/serving_bundle.py)
+SERVING_BUNDLE_PATH = os.path.join(ARTIFACTS_DIR, "serving", "bundle.bin")
+# Present while training or fold-in rewrites artifacts; servers don't switch versions meanwhile
+ARTIFACT_UPDATE_MARKER = os.path.join(ARTIFACTS_DIR, "serving", "updating")
+
+
 ################ CONFIG ################
 CONFIG_PATH = os.path.join(PROJECT_ROOT, "config", "config.yaml")
 
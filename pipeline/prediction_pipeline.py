@@ -1,24 +1,146 @@
+import numpy as np
+import pandas as pd
+
 from config.paths_config import *
+from src.numpy_trainer import NORM_EPSILON, head_affine
 from utils.helpers import *
+from utils.artifact_store import get_artifact_store
+from utils.id_encoder import decode_many, encode_many
+from utils.metrics import CACHE_LOOKUPS, STAGE_LATENCY
+from utils.result_cache import cache_key
+from utils.topk import top_k
+from utils.watched_index import WatchedIndex
+
+
+def _vote_scores(user_recommended, content_recommended, user_weight, content_weight):
+    """Vote score of every candidate in the union of both lists, in order of first appearance."""
+    combined_scores = {}
+
+    for anime in user_recommended:
+        combined_scores[anime] = combined_scores.get(anime, 0) + user_weight
+
+    for anime in content_recommended:
+        combined_scores[anime] = combined_scores.get(anime, 0) + content_weight
+
+    return combined_scores
+
+
+def _blend(user_recommended, content_recommended, user_weight, content_weight, n):
+    """Vote-weighted merge of the two candidate lists (ties keep first appearance)."""
+    combined_scores = _vote_scores(user_recommended, content_recommended, user_weight, content_weight)
+
+    sorted_animes = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+
+    return [anime for anime, _ in sorted_animes[:n]]
+
+
+def predict_ratings(user_codes, anime_codes, store):
+    """
+    RecommenderNet's predicted (scaled) rating for each (user code, anime code)
+    pair, in NumPy from the exported head: normalized dot of the embeddings ->
+    Dense -> BatchNorm (moving statistics) -> sigmoid, folded by head_affine.
+    """
+    head = store.model_head
+    if head is None:
+        raise FileNotFoundError(f"{store.paths['model_head']} not found; retrain once to export the model head")
+    scale, shift = head_affine(head)
+
+    u = np.asarray(store.user_weights[user_codes], dtype=np.float32)
+    a = np.asarray(store.anime_weights[anime_codes], dtype=np.float32)
+    u_norm = np.sqrt(np.maximum(np.einsum("ij,ij->i", u, u), NORM_EPSILON))
+    a_norm = np.sqrt(np.maximum(np.einsum("ij,ij->i", a, a), NORM_EPSILON))
+    cos = np.einsum("ij,ij->i", u, a) / (u_norm * a_norm)
+    return 1.0 / (1.0 + np.exp(-(scale * cos + shift)))
 
 
-def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5):
-    similar_users = find_similar_users(
-        user_id,
-        USER_WEIGHTS_PATH,
-        USER2USER_ENCODED,
-        USER2USER_DECODED
-    )
+def _rerank(user_codes, candidate_scores, rerank_weight, n, store):
+    """
+    Top n of each user's candidates ({name: vote score}, one dict per user
+    code) by (1 - rerank_weight) * vote score / best vote score
+    + rerank_weight * predicted rating. Every (user, candidate) pair of the
+    call is scored in one predict_ratings pass; ties keep first appearance.
+    """
+    catalog = store.anime_catalog
+    sizes = [len(scores) for scores in candidate_scores]
+    names = [name for scores in candidate_scores for name in scores]
+    owners = np.repeat(np.asarray(user_codes, dtype=np.int64), sizes)
 
-    user_pref = get_user_preferences(user_id, RATING_DF, DF)
+    positions = catalog.positions_by_name(names)
+    anime_ids = np.where(positions >= 0, catalog.columns["anime_id"][np.maximum(positions, 0)], -1)
+    anime_codes = np.where(positions >= 0, encode_many(store.anime2anime_encoded, anime_ids), -1)
 
-    user_recommended_animes = get_user_recommendations(
-        similar_users,
-        user_pref,
-        DF,
-        SYNOPSIS_DF,
-        RATING_DF
-    )
+    # Candidates without an embedding are ranked on their votes alone
+    predicted = np.zeros(len(names))
+    scored = anime_codes >= 0
+    if scored.any():
+        predicted[scored] = predict_ratings(owners[scored], anime_codes[scored], store)
+
+    results, start = [], 0
+    for scores, size in zip(candidate_scores, sizes):
+        votes = np.fromiter(scores.values(), dtype=np.float64, count=size)
+        best = votes.max() if size else 0.0
+        blended = (1.0 - rerank_weight) * (votes / best if best > 0 else votes) \
+            + rerank_weight * predicted[start:start + size]
+        order = np.argsort(-blended, kind="stable")[:n]
+        candidates = list(scores)
+        results.append([candidates[i] for i in order])
+        start += size
+    return results
+
+
+def hybrid_recommendation(
+    user_id,
+    user_weight=0.5,
+    content_weight=0.5,
+    store=None,
+    n=10,
+    mode="exact",
+    precision="float32",
+    rerank_weight=0.0,
+    n_similar=10,
+):
+    """
+    Top n anime for a user: user-based candidates plus their content-based
+    neighbours, ranked by votes. `n_similar` similar users are asked, and
+    their n_similar favourites each bring n_similar similar anime. Anime the
+    user already rated are dropped from both lists. With rerank_weight > 0 the
+    ranking blends in the model's predicted rating for every candidate (see _rerank).
+    """
+    # Artifacts come from the process-wide store, so nothing is re-read per request;
+    # one snapshot keeps them all on the same artifact version
+    store = (store or get_artifact_store()).snapshot()
+    paths = store.paths
+
+    with STAGE_LATENCY.time("single", "user_similarity"):
+        similar_users = find_similar_users(
+            user_id,
+            paths["user_weights"],
+            paths["user2user_encoded"],
+            paths["user2user_decoded"],
+            n=n_similar,
+            store=store,
+            mode=mode,
+            precision=precision
+        )
+
+    # Everything the user rated, as a bitset over encoded anime indices
+    with STAGE_LATENCY.time("single", "exclusions"):
+        rating_index = store.load_rating_index(paths["rating_df"])
+        watched = store.load_watched_index(paths["rating_df"]).bitsets(rating_index.rows([user_id]))
+
+    # Includes the synopsis lookups (getSynopsis has its own helper timer)
+    with STAGE_LATENCY.time("single", "user_recommendations"):
+        user_recommended_animes = get_user_recommendations(
+            similar_users,
+            None,
+            paths["anime_df"],
+            paths["synopsis_df"],
+            paths["rating_df"],
+            n=n_similar,
+            store=store,
+            watched=watched,
+            path_anime2anime_encoded=paths["anime2anime_encoded"],
+        )
 
     if user_recommended_animes.empty:
         print("No user-based recommendations found.")
@@ -27,28 +149,264 @@ def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5):
     user_recommended_anime_list = user_recommended_animes["anime_name"].tolist()
 
     content_recommended_animes = []
-    for anime in user_recommended_anime_list:
-        similar_animes = find_similar_animes(
-            anime,
-            ANIME_WEIGHTS_PATH,
-            ANIME2ANIME_ENCODED,
-            ANIME2ANIME_DECODED,
-            DF
-        )
+    with STAGE_LATENCY.time("single", "content_expansion"):
+        for anime in user_recommended_anime_list:
+            similar_animes = find_similar_animes(
+                anime,
+                paths["anime_weights"],
+                paths["anime2anime_encoded"],
+                paths["anime2anime_decoded"],
+                paths["anime_df"],
+                n=n_similar,
+                store=store,
+                mode=mode,
+                precision=precision
+            )
 
-        if similar_animes is not None and not similar_animes.empty:
-            content_recommended_animes.extend(similar_animes["name"].tolist())
+            if similar_animes is not None and not similar_animes.empty:
+                codes = encode_many(store.load_encoder(paths["anime2anime_encoded"]), similar_animes["anime_id"].to_numpy())
+                unseen = ~WatchedIndex.contains(watched, np.zeros(len(codes), dtype=np.int64), codes)
+                content_recommended_animes.extend(similar_animes["name"].to_numpy()[unseen].tolist())
 
-    combined_scores = {}
+    if rerank_weight:
+        with STAGE_LATENCY.time("single", "rerank"):
+            scores = _vote_scores(user_recommended_anime_list, content_recommended_animes, user_weight, content_weight)
+            user_code = encode_many(store.user2user_encoded, [user_id])
+            return _rerank(user_code, [scores], rerank_weight, n, store)[0]
 
-    for anime in user_recommended_anime_list:
-        combined_scores[anime] = combined_scores.get(anime, 0) + user_weight
+    with STAGE_LATENCY.time("single", "blend"):
+        return _blend(user_recommended_anime_list, content_recommended_animes, user_weight, content_weight, n)
 
-    for anime in content_recommended_animes:
-        combined_scores[anime] = combined_scores.get(anime, 0) + content_weight
 
-    sorted_animes = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)
+def _content_neighbours(seed_names, store, n_similar, block_size):
+    """
+    Similar anime for every seed name: rows of the precomputed neighbour table
+    when it is deep enough, otherwise one matrix multiply per block of seeds.
+    Returns {seed_name: (neighbour names, their encoded indices)}, most similar first.
+    """
+    catalog = store.anime_catalog
+    neighbour_table = store.anime_neighbours
+    anime_weights = store.anime_weights
+    encoded = store.anime2anime_encoded
+    decoded = store.anime2anime_decoded
+
+    positions = catalog.positions_by_name(seed_names)
+    seed_ids = catalog.columns["anime_id"][positions[positions >= 0]]
+    seed_names = np.asarray(seed_names, dtype=object)[positions >= 0]
+    seed_codes = encode_many(encoded, seed_ids)
+
+    # Seeds without an embedding contribute no content candidates
+    seed_names, seed_codes = seed_names[seed_codes >= 0], seed_codes[seed_codes >= 0]
+
+    neighbours = {}
+    for start in range(0, len(seed_codes), block_size):
+        codes = seed_codes[start:start + block_size]
+        if neighbour_table is not None and n_similar <= neighbour_table.k:
+            closest = neighbour_table.indices[codes, :n_similar]
+        else:
+            closest = top_k(anime_weights[codes] @ anime_weights.T, n_similar, self_index=codes)
+
+        for name, row in zip(seed_names[start:start + block_size], closest):
+            neighbour_codes = row[row >= 0]
+            neighbour_ids = decode_many(decoded, neighbour_codes)
+            neighbour_codes, neighbour_ids = neighbour_codes[neighbour_ids >= 0], neighbour_ids[neighbour_ids >= 0]
+            neighbour_positions = catalog.positions(neighbour_ids)
+            found = neighbour_positions >= 0
+            neighbours[name] = (catalog.columns["eng_version"][neighbour_positions[found]], neighbour_codes[found])
+
+    return neighbours
+
+
+def _unseen_content(content, seed_names, watched, row):
+    """Content candidates of a user's seeds (from _content_neighbours), minus anime set in watched[row]."""
+    found = [content[seed] for seed in seed_names if seed in content]
+    if not found:
+        return []
+    names = np.concatenate([neighbour_names for neighbour_names, _ in found])
+    codes = np.concatenate([neighbour_codes for _, neighbour_codes in found])
+    unseen = ~WatchedIndex.contains(watched, np.full(len(codes), row), codes)
+    return names[unseen].tolist()
+
+
+def _recommend_block(user_ids, user_weight, content_weight, n, store, n_similar, block_size, rerank_weight=0.0):
+    user_weights = store.user_weights
+    encoded = store.user2user_encoded
+    decoded = store.user2user_decoded
+    catalog = store.anime_catalog
+    rating_index = store.rating_index
+
+    codes = encode_many(encoded, user_ids)
+    known = np.flatnonzero(codes >= 0)
+    results = [[] for _ in user_ids]
+    if len(known) == 0:
+        return results
+
+    # User-to-user similarity for the whole block in one matrix multiply
+    with STAGE_LATENCY.time("batch", "user_similarity"):
+        neighbours = top_k(user_weights[codes[known]] @ user_weights.T, n_similar, self_index=codes[known])
+        similar_ids = decode_many(decoded, neighbours.ravel()).reshape(neighbours.shape)
+        similar_ids[neighbours < 0] = -1
+
+    # Similar users' favourites, minus everything the block's users already rated
+    with STAGE_LATENCY.time("batch", "preferences"):
+        watched = store.watched_index.bitsets(rating_index.rows(np.asarray(user_ids)[known]))
+        sim_owner, sim_anime = rating_index.preferences_many(similar_ids.ravel())
+        sim_row = sim_owner // n_similar
+
+        unseen = ~WatchedIndex.contains(watched, sim_row, encode_many(store.anime2anime_encoded, sim_anime))
+        sim_owner, sim_anime, sim_row = sim_owner[unseen], sim_anime[unseen], sim_row[unseen]
+
+    with STAGE_LATENCY.time("batch", "user_recommendations"):
+        user_recommended = {}
+        for row in range(len(known)):
+            mine = sim_row == row
+            names = preference_names(sim_owner[mine], sim_anime[mine], catalog)
+
+            if len(names):
+                user_recommended[row] = rank_by_count(names, n_similar).index.tolist()
+
+    # Content expansion for every seed anime of the block at once
+    with STAGE_LATENCY.time("batch", "content_expansion"):
+        seeds = pd.unique(np.array([name for names in user_recommended.values() for name in names], dtype=object))
+        content = _content_neighbours(seeds, store, n_similar, block_size)
+
+    if rerank_weight:
+        # Candidates of every user in the block are scored together
+        with STAGE_LATENCY.time("batch", "rerank"):
+            rows, scores = list(user_recommended), []
+            for row in rows:
+                seed_names = user_recommended[row]
+                content_recommended = _unseen_content(content, seed_names, watched, row)
+                scores.append(_vote_scores(seed_names, content_recommended, user_weight, content_weight))
+            for row, ranked in zip(rows, _rerank(codes[known[rows]], scores, rerank_weight, n, store)):
+                results[known[row]] = ranked
+        return results
+
+    with STAGE_LATENCY.time("batch", "blend"):
+        for row, seed_names in user_recommended.items():
+            content_recommended = _unseen_content(content, seed_names, watched, row)
+            results[known[row]] = _blend(seed_names, content_recommended, user_weight, content_weight, n)
+
+    return results
+
+
+def hybrid_recommendation_batch(
+    user_ids,
+    user_weight=0.5,
+    content_weight=0.5,
+    n=10,
+    block_size=1024,
+    store=None,
+    rerank_weight=0.0,
+    n_similar=10,
+):
+    """
+    hybrid_recommendation for many users.
+
+    Users are processed in blocks of `block_size`: similarity is a
+    (block x n_users) matrix multiply and content expansion one
+    (block x n_anime) multiply per `block_size` seed anime, so memory stays
+    bounded by the block size.
+    Returns one list per input user, in input order; unknown users get [].
+    """
+    store = (store or get_artifact_store()).snapshot()
+    user_ids = list(user_ids)
+    results = []
+
+    for start in range(0, len(user_ids), block_size):
+        block = user_ids[start:start + block_size]
+        results.extend(_recommend_block(block, user_weight, content_weight, n, store, n_similar, block_size,
+                                        rerank_weight=rerank_weight))
+
+    return results
+
+
+def recommend_requests(requests, n=10, store=None, rerank_weight=0.0):
+    """
+    Handler for MicroBatcher: one result list per (user_id, user_weight,
+    content_weight) request, in input order. A request may carry a fourth
+    element, the ArtifactStore snapshot it must be scored on; the others use
+    one snapshot of `store`. Requests sharing weights and snapshot are scored
+    together by hybrid_recommendation_batch.
+    """
+    store = (store or get_artifact_store()).snapshot()
+    groups = {}
+    for position, (user_id, user_weight, content_weight, *pinned) in enumerate(requests):
+        key = (pinned[0] if pinned else store, user_weight, content_weight)
+        groups.setdefault(key, []).append((position, user_id))
+
+    results = [None] * len(requests)
+    for (snapshot, user_weight, content_weight), members in groups.items():
+        positions, user_ids = zip(*members)
+        batch = hybrid_recommendation_batch(user_ids, user_weight, content_weight, n=n, store=snapshot,
+                                            rerank_weight=rerank_weight)
+        for position, recommendations in zip(positions, batch):
+            results[position] = recommendations
+    return results
+
+
+def cached_recommendation_batch(user_ids, user_weight=0.5, content_weight=0.5, cache=None, store=None,
+                                compute=None, rerank_weight=0.0):
+    """
+    cached_recommendation for many users: cache hits are returned as-is and
+    the misses are scored together by `compute(missing_user_ids)` (default
+    hybrid_recommendation_batch). Unknown users get [] and are not cached.
+
+    A custom `compute` must score on the same snapshot: pass a snapshot
+    (ArtifactStore.snapshot()) as `store` and have `compute` use it.
+    """
+    store = store or get_artifact_store()
+    if cache is not None and store.refresh():
+        cache.clear()
+    store = store.snapshot()
+
+    if compute is None:
+        def compute(ids):
+            return hybrid_recommendation_batch(ids, user_weight, content_weight, store=store,
+                                               rerank_weight=rerank_weight)
+
+    user_ids = list(user_ids)
+    if cache is None:
+        return compute(user_ids)
+
+    keys = [cache_key(user_id, user_weight, content_weight, store.version, rerank_weight) for user_id in user_ids]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, recommendations in enumerate(results) if recommendations is None]
+    CACHE_LOOKUPS.inc("hit", amount=len(keys) - len(missing))
+    CACHE_LOOKUPS.inc("miss", amount=len(missing))
+    if not missing:
+        return results
+
+    computed = compute([user_ids[i] for i in missing])
+    known = encode_many(store.user2user_encoded, [user_ids[i] for i in missing]) >= 0
+    for i, recommendations, is_known in zip(missing, computed, known):
+        results[i] = recommendations
+        if is_known:
+            cache.set(keys[i], recommendations)
+    return results
+
+
+def cached_recommendation(user_id, user_weight=0.5, content_weight=0.5, cache=None, store=None, rerank_weight=0.0):
+    """
+    hybrid_recommendation through a result cache keyed by
+    (user_id, user_weight, content_weight, artifact version, rerank_weight).
 
-    return [anime for anime, _ in sorted_animes[:10]]
+    A new artifact version (retrain, fold-in) swaps in a new store snapshot
+    and empties the cache. Errors (e.g. unknown users) are not cached.
+    """
+    store = store or get_artifact_store()
+    if cache is None:
+        return hybrid_recommendation(user_id, user_weight, content_weight, store=store, rerank_weight=rerank_weight)
 
+    if store.refresh():
+        cache.clear()
+    store = store.snapshot()
 
+    key = cache_key(user_id, user_weight, content_weight, store.version, rerank_weight)
+    recommendations = cache.get(key)
+    CACHE_LOOKUPS.inc("hit" if recommendations is not None else "miss")
+    if recommendations is None:
+        recommendations = hybrid_recommendation(user_id, user_weight, content_weight, store=store,
+                                                rerank_weight=rerank_weight)
+        cache.set(key, recommendations)
+    return recommendations
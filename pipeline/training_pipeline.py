@@ -1,12 +1,43 @@
+import argparse
+import time
+
 from src.data_processing import DataProcessor
 from config.paths_config import *
 from utils.common_functions import read_yaml
 from src.model_training import ModelTraining
+from utils.artifact_store import ArtifactStore, artifact_update, default_paths
+from utils.serving_bundle import build_serving_bundle, check_bundle_sources
 
 
 if __name__ == "__main__":
-    data_processor = DataProcessor(ANIMELIST_CSV,PROCESSED_DIR)
-    data_processor.run()
+    parser = argparse.ArgumentParser(description="Process data, train the model and build the serving bundle")
+    parser.add_argument("--force", action="store_true", help="Recompute every data processing stage, ignoring the stage cache")
+    args = parser.parse_args()
+
+    config = read_yaml(CONFIG_PATH)
+    run_started = time.time()
+
+    # Servers keep their current artifact version until every file below is rewritten
+    with artifact_update():
+        processing_config = config.get("data_processing", {})
+        data_processor = DataProcessor(
+            ANIMELIST_CSV,
+            PROCESSED_DIR,
+            chunksize=processing_config.get("chunksize"),
+            synopsis_compression=processing_config.get("synopsis_compression"),
+            stage_cache_max_mb=processing_config.get("stage_cache_max_mb"),
+        )
+        data_processor.run(force=args.force)
+
+        model_trainer = ModelTraining(PROCESSED_DIR)
+        model_trainer.train_model()
 
-    model_trainer = ModelTraining(PROCESSED_DIR)
-    model_trainer.train_model()
+        # Every serving artifact in one memory-mappable file for fast worker start-up, built
+        # from the files this run wrote (never from legacy pickles/CSVs left next to them)
+        serving_paths = default_paths(legacy=False)
+        build_serving_bundle(SERVING_BUNDLE_PATH, ArtifactStore(paths=serving_paths))
+        try:
+            check_bundle_sources(SERVING_BUNDLE_PATH, serving_paths, since=run_started)
+        except ValueError:
+            os.remove(SERVING_BUNDLE_PATH)
+            raise
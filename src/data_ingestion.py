@@ -1,4 +1,10 @@
-from google.cloud import storage
+import base64
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
@@ -6,28 +12,253 @@ from utils.common_functions import read_yaml
 
 logger = get_logger(__name__)
 
+# Hashes of the files we downloaded, keyed by local name, so an unchanged file
+# is matched against the bucket by its stat instead of re-hashing it
+MANIFEST_FILE = ".ingestion_manifest.json"
+
+
+def _default_client():
+    from google.cloud import storage
+    return storage.Client()
+
+
+def _file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            md5.update(block)
+    return base64.b64encode(md5.digest()).decode("ascii")
+
+
+def _file_crc32c(path):
+    try:
+        import google_crc32c
+    except ImportError:
+        return None
+
+    crc = google_crc32c.Checksum()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            crc.update(block)
+    return base64.b64encode(crc.digest()).decode("ascii")
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+
 class DataIngestion:
-    def __init__(self, config):
+    def __init__(self, config, client=None, raw_dir=RAW_DIR):
         self.config = config["data_ingestion"]
         self.bucket_name = self.config["bucket_name"]
         self.file_names = self.config["bucket_file_names"]
+        # Bucket name -> local name where they differ (e.g. anime-with-synopsis.csv)
+        self.local_file_names = self.config.get("local_file_names") or {}
+        self.max_workers = self.config.get("max_workers", 8)
+        self.chunk_size = int(self.config.get("chunk_size_mb", 32) * 2**20)
+
+        # google.cloud.storage.Client by default; anything with the same
+        # bucket()/get_blob() surface works (see utils/local_bucket.py)
+        self.client = client
+        self.raw_dir = raw_dir
 
         # When data ingestion is triggered it automatically creates our raw directory
-        os.makedirs(RAW_DIR, exist_ok=True)
+        os.makedirs(self.raw_dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.raw_dir, MANIFEST_FILE)
 
         logger.info(f"Data ingestion started.")
 
+    # -----------------------------
+    # Checksums
+    # -----------------------------
+    def _local_hashes(self, path, manifest_entry, blob):
+        """md5/crc32c of a local file, from the manifest while its size and mtime are unchanged."""
+        stat = os.stat(path)
+        if manifest_entry.get("size") == stat.st_size and manifest_entry.get("mtime_ns") == stat.st_mtime_ns:
+            return manifest_entry
+
+        hashes = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if blob.md5_hash:
+            hashes["md5_hash"] = _file_md5(path)
+        elif blob.crc32c:
+            hashes["crc32c"] = _file_crc32c(path)
+        return hashes
+
+    @staticmethod
+    def _matches(hashes, blob):
+        # Composite objects have no md5, only crc32c; with neither we can't tell
+        if hashes.get("size") != blob.size:
+            return False
+        if blob.md5_hash:
+            return hashes.get("md5_hash") == blob.md5_hash
+        if blob.crc32c:
+            return hashes.get("crc32c") == blob.crc32c
+        return False
+
+    # -----------------------------
+    # Ranged downloads
+    # -----------------------------
+    def _plan(self, blob, part_path, state_path):
+        """Chunks still to download, resuming a previous partial download of the same blob generation."""
+        n_chunks = max(1, -(-blob.size // self.chunk_size))
+        state = _read_json(state_path)
+        resumable = (
+            os.path.exists(part_path)
+            and state.get("generation") == blob.generation
+            and state.get("size") == blob.size
+            and state.get("chunk_size") == self.chunk_size
+        )
+        if not resumable:
+            state = {"generation": blob.generation, "size": blob.size, "chunk_size": self.chunk_size, "done": []}
+            with open(part_path, "wb") as f:
+                f.truncate(blob.size)
+            _write_json(state_path, state)
+
+        done = set(state["done"])
+        return state, [chunk for chunk in range(n_chunks) if chunk not in done]
+
+    def _download_chunk(self, blob, part_path, chunk):
+        start = chunk * self.chunk_size
+        end = min(start + self.chunk_size, blob.size) - 1
+        data = blob.download_as_bytes(start=start, end=end) if blob.size else b""
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+        return len(data)
+
+    def _finalize(self, blob, file_path, part_path, state_path):
+        """Check the assembled file against the blob checksum and move it into place."""
+        hashes = self._local_hashes(part_path, {}, blob)
+        # crc32c needs google-crc32c (installed with google-cloud-storage)
+        verifiable = blob.md5_hash or (blob.crc32c and hashes.get("crc32c") is not None)
+        if verifiable and not self._matches(hashes, blob):
+            os.remove(part_path)
+            os.remove(state_path)
+            raise ValueError(f"Checksum mismatch for {blob.name}; the partial download was discarded")
+
+        os.replace(part_path, file_path)
+        os.remove(state_path)
+        stat = os.stat(file_path)
+        return {**hashes, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "generation": blob.generation}
+
     def download_csv_from_gcp(self):
+        """
+        Download the bucket files into the raw directory and return a report.
+
+        Files whose size and md5 (crc32c for composite objects) already match
+        the blob are skipped. The rest are fetched as ranged chunks on a
+        bounded thread pool into "<file>.part" and renamed into place once
+        complete and verified; finished chunks are recorded in
+        "<file>.part.json", so a failed run resumes where it stopped.
+        """
         try:
-            client = storage.Client()
+            client = self.client or _default_client()
             bucket = client.bucket(self.bucket_name)
+            manifest = _read_json(self.manifest_path)
+            start = time.perf_counter()
+
+            report = {"files": {}, "downloaded_bytes": 0, "skipped_bytes": 0, "resumed_bytes": 0}
+            pending = {}    # file_name -> (blob, file_path, part_path, state_path, state, remaining chunks)
 
-            # Get all three files
             for file_name in self.file_names:
-                file_path = os.path.join(RAW_DIR, file_name)
+                local_name = self.local_file_names.get(file_name, file_name)
+                file_path = os.path.join(self.raw_dir, local_name)
+
+                blob = bucket.get_blob(file_name)
+                if blob is None:
+                    raise FileNotFoundError(f"gs://{self.bucket_name}/{file_name} does not exist")
+
+                if os.path.exists(file_path):
+                    hashes = self._local_hashes(file_path, manifest.get(local_name, {}), blob)
+                    if self._matches(hashes, blob):
+                        manifest[local_name] = {**hashes, "generation": blob.generation}
+                        report["files"][file_name] = "skipped"
+                        report["skipped_bytes"] += blob.size
+                        continue
+
+                part_path, state_path = f"{file_path}.part", f"{file_path}.part.json"
+                state, chunks = self._plan(blob, part_path, state_path)
+                resumed = len(state["done"])
+                report["files"][file_name] = "resumed" if resumed else "downloaded"
+                report["resumed_bytes"] += min(resumed * self.chunk_size, blob.size)
+                pending[file_name] = [blob, file_path, part_path, state_path, state, set(chunks)]
+
+            lock = threading.Lock()
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    pool.submit(self._download_chunk, item[0], item[2], chunk): (file_name, chunk)
+                    for file_name, item in pending.items()
+                    for chunk in sorted(item[5])
+                }
+
+                # Files with nothing left to fetch (fully resumed) finish right away
+                finished = [file_name for file_name, item in pending.items() if not item[5]]
+                for future in as_completed(futures):
+                    file_name, chunk = futures[future]
+                    blob, file_path, part_path, state_path, state, remaining = pending[file_name]
+                    try:
+                        n_bytes = future.result()
+                    except Exception as e:
+                        # Keep going so the other chunks are saved for the next run
+                        errors.append((file_name, e))
+                        continue
+
+                    with lock:
+                        report["downloaded_bytes"] += n_bytes
+                        state["done"].append(chunk)
+                        _write_json(state_path, state)
+                        remaining.discard(chunk)
+                        if not remaining:
+                            finished.append(file_name)
 
-                blob = bucket.blob(file_name)
-                blob.download_to_filename(file_path)
+                for file_name in finished:
+                    blob, file_path, part_path, state_path, _, _ = pending[file_name]
+                    local_name = os.path.basename(file_path)
+                    try:
+                        manifest[local_name] = self._finalize(blob, file_path, part_path, state_path)
+                    except ValueError as e:
+                        # Checksum mismatch: finish and record the other files before raising
+                        errors.append((file_name, e))
+
+            elapsed = time.perf_counter() - start
+            if report["downloaded_bytes"]:
+                manifest["_throughput_bps"] = report["downloaded_bytes"] / elapsed
+            _write_json(self.manifest_path, manifest)
+
+            if errors:
+                file_name, e = errors[0]
+                raise RuntimeError(f"{len(errors)} download error(s), first for {file_name}: {e}")
+
+            # Skipped and resumed bytes at this run's (or the last measured) throughput
+            throughput = manifest.get("_throughput_bps")
+            saved_bytes = report["skipped_bytes"] + report["resumed_bytes"]
+            report.update({
+                "seconds": elapsed,
+                "bytes_per_sec": report["downloaded_bytes"] / elapsed if report["downloaded_bytes"] else None,
+                "time_saved_seconds": saved_bytes / throughput if throughput else None,
+            })
+
+            logger.info(
+                f"Downloaded {report['downloaded_bytes'] / 2**20:.1f} MB in {elapsed:.2f}s"
+                + (f" ({report['bytes_per_sec'] / 2**20:.1f} MB/s)" if report["bytes_per_sec"] else "")
+                + f"; skipped {report['skipped_bytes'] / 2**20:.1f} MB, resumed {report['resumed_bytes'] / 2**20:.1f} MB"
+                + (f", ~{report['time_saved_seconds']:.1f}s saved" if report["time_saved_seconds"] else "")
+            )
+            return report
 
         except Exception as e:
             logger.error("Error while downloading data from GCP.")
@@ -51,9 +282,3 @@ class DataIngestion:
 if __name__ == "__main__":
     data_ingestion = DataIngestion(read_yaml(CONFIG_PATH))
     data_ingestion.run()
-
-
-
-
-
-
@@ -1,5 +1,6 @@
+import argparse
+import json
 import os
-import joblib
 import numpy as np
 import pandas as pd
 
@@ -10,37 +11,97 @@ from config.paths_config import (
     ANIME_CSV,
     ANIMESYNOPSIS_CSV,
     PROCESSED_DIR,
-    X_TRAIN_ARRAY,
-    X_TEST_ARRAY,
-    Y_TRAIN,
-    Y_TEST,
-    DF,
-    SYNOPSIS_DF,
+    TRAIN_TABLE,
+    TEST_TABLE,
+    RATING_TABLE,
+    ANIME_TABLE,
+    SYNOPSIS_TABLE,
+    SYNOPSIS_STORE,
+    STAGE_CACHE_DIR,
+    RATING_INDEX,
+    RATING_SCALE,
+    USER_ENCODER,
+    ANIME_ENCODER,
 )
+from utils.columnar import read_table, write_table
+from utils.id_encoder import IdEncoder
+from utils.rating_index import RatingIndex
+from utils.stage_cache import StageCache, code_version
+from utils.synopsis_store import SynopsisStore
 
 logger = get_logger(__name__)
 
 
+class _FirstSeenEncoder:
+    """Contiguous codes in order of first appearance, accumulated across chunks."""
+
+    def __init__(self):
+        self.index = pd.Index([], dtype=np.int64)
+
+    def encode(self, values):
+        uniques = pd.unique(values)
+        new = uniques[self.index.get_indexer(uniques) < 0]
+        if len(new):
+            self.index = self.index.append(pd.Index(new.astype(np.int64)))
+        return self.index.get_indexer(values).astype(np.int32)
+
+    @property
+    def ids(self):
+        return self.index.to_numpy()
+
+
+def _int32_if_fits(values):
+    """int32 when every value of an integer column fits, else the column's own dtype."""
+    info = np.iinfo(np.int32)
+    if values.dtype.kind in "iu" and (len(values) == 0 or (info.min <= values.min() and values.max() <= info.max)):
+        return np.int32
+    return values.dtype
+
+
+def _reduce_groups(series, how):
+    """Combine per-user Series from several chunks into one ("count" adds the counts)."""
+    grouped = pd.concat(series).groupby(level=0)
+    return grouped.sum() if how == "count" else getattr(grouped, how)()
+
+
 class DataProcessor:
-    def __init__(self, input_file: str, output_dir: str):
+    def __init__(self, input_file: str, output_dir: str, chunksize: int = None,
+                 anime_file: str = ANIME_CSV, synopsis_file: str = ANIMESYNOPSIS_CSV,
+                 synopsis_compression: str = None, stage_cache_max_mb: float = None):
         self.input_file = input_file
         self.output_dir = output_dir
+        self.anime_file = anime_file
+        self.synopsis_file = synopsis_file
+        # None or "zlib" (per-block compression of the synopsis store blob)
+        self.synopsis_compression = synopsis_compression
+        # Rows per chunk for the streaming mode; None loads the whole file at once
+        self.chunksize = chunksize
+        # Evict the oldest stage cache entries past this size; None never evicts
+        self.stage_cache_max_mb = stage_cache_max_mb
 
         self.rating_df = None
+        self.rating_index = None
+        # Raw rating range used for min-max scaling (reused by src/fold_in.py)
+        self.rating_scale = None
 
         self.X_train_array = None
         self.X_test_array = None
         self.y_train = None
         self.y_test = None
 
-        self.user2user_encoded = {}
-        self.user2user_decoded = {}
-        self.anime2anime_encoded = {}
-        self.anime2anime_decoded = {}
+        # IdEncoder / IdDecoder pairs (dict-compatible: .get, [], in, len)
+        self.user2user_encoded = None
+        self.user2user_decoded = None
+        self.anime2anime_encoded = None
+        self.anime2anime_decoded = None
 
         os.makedirs(self.output_dir, exist_ok=True)
         logger.info("DataProcessor initialized")
 
+    def _output_path(self, path):
+        """Where an artifact from config.paths_config goes under this processor's output_dir."""
+        return os.path.join(self.output_dir, os.path.relpath(path, PROCESSED_DIR))
+
     def load_data(self, usecols=None):
         """Load ratings data from CSV."""
         try:
@@ -68,6 +129,7 @@ class DataProcessor:
 
             min_r = float(self.rating_df["rating"].min())
             max_r = float(self.rating_df["rating"].max())
+            self.rating_scale = {"min": min_r, "max": max_r}
 
             if max_r == min_r:
                 # Avoid divide-by-zero; all ratings identical
@@ -88,27 +150,147 @@ class DataProcessor:
           - rating_df['anime'] (encoded anime index)
         """
         try:
-            # Users
-            user_ids = self.rating_df["user_id"].unique().tolist()
-            self.user2user_encoded = {x: i for i, x in enumerate(user_ids)}
-            self.user2user_decoded = {i: x for i, x in enumerate(user_ids)}
-            self.rating_df["user"] = self.rating_df["user_id"].map(self.user2user_encoded)
+            # Users (codes in order of first appearance, as unique() gives)
+            user_codes, user_encoder = IdEncoder.factorize(self.rating_df["user_id"])
+            self.rating_df["user"] = user_codes
 
             # Anime
-            anime_ids = self.rating_df["anime_id"].unique().tolist()
-            self.anime2anime_encoded = {x: i for i, x in enumerate(anime_ids)}
-            self.anime2anime_decoded = {i: x for i, x in enumerate(anime_ids)}
-            self.rating_df["anime"] = self.rating_df["anime_id"].map(self.anime2anime_encoded)
+            anime_codes, anime_encoder = IdEncoder.factorize(self.rating_df["anime_id"])
+            self.rating_df["anime"] = anime_codes
+
+            self._set_encoders(user_encoder, anime_encoder)
 
-            # Drop any unexpected NaNs
+            # Drop rows with missing ids (factorize codes them -1)
             before = len(self.rating_df)
-            self.rating_df = self.rating_df.dropna(subset=["user", "anime"]).copy()
+            missing = (self.rating_df["user"] < 0) | (self.rating_df["anime"] < 0)
+            if missing.any():
+                self.rating_df = self.rating_df[~missing].copy()
             after = len(self.rating_df)
 
             logger.info(f"Encoding done for users/anime. Dropped {before - after} rows with missing encodings.")
         except Exception as e:
             raise CustomException("Failed to encode data", e)
 
+    def _set_encoders(self, user_encoder, anime_encoder):
+        self.user2user_encoded = user_encoder
+        self.user2user_decoded = user_encoder.decoder
+        self.anime2anime_encoded = anime_encoder
+        self.anime2anime_decoded = anime_encoder.decoder
+
+    def _read_chunks(self, usecols):
+        return pd.read_csv(self.input_file, usecols=usecols, chunksize=self.chunksize)
+
+    def scan_ratings(self, usecols):
+        """
+        Streaming pass 1: per-user row counts and per-user min/max rating, plus
+        the dtypes the whole file would load with (ids and numeric ratings).
+        Memory is bounded by the chunk size plus a few entries per user.
+        """
+        try:
+            parts = {"count": [], "min": [], "max": []}
+            dtypes = {}
+            pending, reduced = 0, 0
+
+            for chunk in self._read_chunks(usecols):
+                ratings = pd.to_numeric(chunk["rating"], errors="coerce")
+                for column, dtype in (("user_id", chunk["user_id"].dtype), ("anime_id", chunk["anime_id"].dtype),
+                                      ("rating", ratings.dtype)):
+                    dtypes[column] = np.result_type(dtypes.get(column, dtype), dtype)
+
+                grouped = ratings.groupby(chunk["user_id"])
+                parts["count"].append(chunk["user_id"].value_counts())
+                parts["min"].append(grouped.min())
+                parts["max"].append(grouped.max())
+                pending += len(parts["count"][-1])
+
+                # Combine the per-chunk results once they outgrow the running totals:
+                # each entry is reduced O(1) times on average instead of once per chunk
+                if pending >= 2 * max(reduced, self.chunksize or 0):
+                    parts = {how: [_reduce_groups(series, how)] for how, series in parts.items()}
+                    pending = reduced = len(parts["count"][0])
+
+            counts, rating_min, rating_max = (_reduce_groups(parts[how], how) for how in ("count", "min", "max"))
+
+            logger.info(f"Scanned {int(counts.sum())} rating rows for {len(counts)} users")
+            return counts.astype(np.int64), rating_min, rating_max, dtypes
+        except Exception as e:
+            raise CustomException("Failed to scan ratings file", e)
+
+    def stream_ratings(self, usecols, min_rating: int = 400):
+        """
+        Chunked equivalent of load_data + filter_users + scale_ratings + encode_data.
+
+        Pass 1 counts ratings per user and finds the global min/max rating of the
+        kept users; pass 2 filters, encodes and copies each chunk into
+        preallocated arrays: ids in the dtype the file loads with (int64 for the
+        Kaggle files), raw ratings as float64, int32 codes. Encoding order,
+        ids and scaled values match the in-memory path exactly.
+        """
+        try:
+            counts, rating_min, rating_max, dtypes = self.scan_ratings(usecols)
+
+            keep_users = counts[counts >= min_rating].index
+            min_r = float(rating_min.loc[keep_users].min())
+            max_r = float(rating_max.loc[keep_users].max())
+            self.rating_scale = {"min": min_r, "max": max_r}
+            n_rows = int(counts.loc[keep_users].sum())
+            logger.info(f"Filtered users (>= {min_rating} ratings): {len(keep_users)} users, <= {n_rows} rows")
+
+            user_ids = np.empty(n_rows, dtype=dtypes["user_id"])
+            anime_ids = np.empty(n_rows, dtype=dtypes["anime_id"])
+            # float64 holds every integer rating exactly, so scaling matches the in-memory path
+            ratings = np.empty(n_rows, dtype=np.float64)
+            users = np.empty(n_rows, dtype=np.int32)
+            anime = np.empty(n_rows, dtype=np.int32)
+
+            user_encoder, anime_encoder = _FirstSeenEncoder(), _FirstSeenEncoder()
+            keep_index = pd.Index(keep_users)
+            pos = 0
+
+            for chunk in self._read_chunks(usecols):
+                chunk = chunk[keep_index.get_indexer(chunk["user_id"]) >= 0]
+                chunk_ratings = pd.to_numeric(chunk["rating"], errors="coerce")
+                valid = chunk_ratings.notna().to_numpy()
+
+                chunk_users = chunk["user_id"].to_numpy()[valid]
+                chunk_anime = chunk["anime_id"].to_numpy()[valid]
+                end = pos + len(chunk_users)
+
+                user_ids[pos:end] = chunk_users
+                anime_ids[pos:end] = chunk_anime
+                ratings[pos:end] = chunk_ratings.to_numpy()[valid]
+                users[pos:end] = user_encoder.encode(chunk_users)
+                anime[pos:end] = anime_encoder.encode(chunk_anime)
+                pos = end
+
+            if max_r == min_r:
+                scaled = np.zeros(pos)
+                logger.warning("All ratings identical; scaled ratings set to 0.0")
+            else:
+                scaled = (ratings[:pos] - min_r) / (max_r - min_r)
+
+            self.rating_df = pd.DataFrame({
+                "user_id": user_ids[:pos],
+                "anime_id": anime_ids[:pos],
+                "rating": scaled,
+                "user": users[:pos],
+                "anime": anime[:pos],
+            })
+
+            self._set_encoders(IdEncoder.from_ids(user_encoder.ids), IdEncoder.from_ids(anime_encoder.ids))
+
+            logger.info(f"Streamed, scaled and encoded ratings: {self.rating_df.shape}")
+        except Exception as e:
+            raise CustomException("Failed to stream ratings", e)
+
+    def build_rating_index(self):
+        """Build the per-user CSR rating index used at serving time."""
+        try:
+            self.rating_index = RatingIndex.from_frame(self.rating_df)
+            logger.info(f"Rating index built for {len(self.rating_index)} users")
+        except Exception as e:
+            raise CustomException("Failed to build rating index", e)
+
     def split_data(self, test_size: int = 1000, random_state: int = 43):
         """
         Split into train/test sets.
@@ -144,29 +326,45 @@ class DataProcessor:
     def save_artifacts(self):
         """Save encoders, splits, and rating_df."""
         try:
-            # Save mapping dicts
-            artifacts = {
-                "user2user_encoded": self.user2user_encoded,
-                "user2user_decoded": self.user2user_decoded,
-                "anime2anime_encoded": self.anime2anime_encoded,
-                "anime2anime_decoded": self.anime2anime_decoded,
+            # Save encoders as sorted id arrays (memory-mappable, binary-searchable)
+            encoders = {
+                self._output_path(USER_ENCODER): self.user2user_encoded,
+                self._output_path(ANIME_ENCODER): self.anime2anime_encoded,
             }
 
-            for name, data in artifacts.items():
-                path = os.path.join(self.output_dir, f"{name}.pkl")
-                joblib.dump(data, path)
+            for path, encoder in encoders.items():
+                encoder.save(path)
                 logger.info(f"Saved artifact: {path}")
 
-            # Save train/test arrays
-            joblib.dump(self.X_train_array, X_TRAIN_ARRAY)
-            joblib.dump(self.X_test_array, X_TEST_ARRAY)
-            joblib.dump(self.y_train, Y_TRAIN)
-            joblib.dump(self.y_test, Y_TEST)
+            # Save train/test splits as contiguous columns
+            splits = {
+                self._output_path(TRAIN_TABLE): (self.X_train_array, self.y_train),
+                self._output_path(TEST_TABLE): (self.X_test_array, self.y_test),
+            }
 
-            # Save processed rating df
-            rating_path = os.path.join(self.output_dir, "rating_df.csv")
-            self.rating_df.to_csv(rating_path, index=False)
-            logger.info(f"Saved rating_df: {rating_path}")
+            for path, (X, y) in splits.items():
+                write_table(path, {
+                    "user": X[0].astype(np.int32),
+                    "anime": X[1].astype(np.int32),
+                    "rating": y.astype(np.float32),
+                })
+                logger.info(f"Saved split: {path}")
+
+            # Save processed rating df (ids and codes as int32 where they fit)
+            id_columns = ["user_id", "anime_id", "user", "anime"]
+            rating_table = self._output_path(RATING_TABLE)
+            write_table(rating_table, self.rating_df.astype({col: _int32_if_fits(self.rating_df[col]) for col in id_columns}))
+            logger.info(f"Saved rating_df: {rating_table}")
+
+            # Save per-user rating index
+            rating_index = self._output_path(RATING_INDEX)
+            self.rating_index.save(rating_index)
+            logger.info(f"Saved rating index: {rating_index}")
+
+            rating_scale = self._output_path(RATING_SCALE)
+            with open(rating_scale, "w") as f:
+                json.dump(self.rating_scale, f)
+            logger.info(f"Saved rating scale: {rating_scale}")
 
         except Exception as e:
             raise CustomException("Failed to save artifacts", e)
@@ -174,14 +372,15 @@ class DataProcessor:
     def process_anime_data(self):
         """
         Load anime metadata and synopsis data, normalize column names,
-        resolve English anime names, sort by score, and save processed CSVs.
+        resolve English anime names, sort by score, and save processed tables
+        plus the id-indexed synopsis store.
         """
         try:
             # -----------------------------
             # Load data
             # -----------------------------
-            df = pd.read_csv(ANIME_CSV)
-            synopsis_df = pd.read_csv(ANIMESYNOPSIS_CSV)
+            df = pd.read_csv(self.anime_file)
+            synopsis_df = pd.read_csv(self.synopsis_file)
 
             df = df.replace("Unknown", np.nan)
 
@@ -253,31 +452,172 @@ class DataProcessor:
             # -----------------------------
             # Save outputs
             # -----------------------------
-            df.to_csv(DF, index=False)
-            synopsis_df.to_csv(SYNOPSIS_DF, index=False)
+            write_table(self._output_path(ANIME_TABLE), df)
+            write_table(self._output_path(SYNOPSIS_TABLE), synopsis_df)
+            SynopsisStore.from_frame(synopsis_df, compression=self.synopsis_compression).save(
+                self._output_path(SYNOPSIS_STORE)
+            )
 
             logger.info("Processed anime metadata and synopsis data saved successfully.")
 
         except Exception as e:
             raise CustomException("Failed to process anime and synopsis data", e)
 
-    def run(self):
+    # -----------------------------
+    # Stage cache
+    # -----------------------------
+    def _cache_ratings(self, directory):
+        """Save the ratings state a stage leaves behind (rating_df, plus scale/encoders once set)."""
+        write_table(os.path.join(directory, "rating_df"), self.rating_df)
+        if self.rating_scale is not None:
+            with open(os.path.join(directory, "rating_scale.json"), "w") as f:
+                json.dump(self.rating_scale, f)
+        if self.user2user_encoded is not None:
+            self.user2user_encoded.save(os.path.join(directory, "user_encoder.npy"))
+            self.anime2anime_encoded.save(os.path.join(directory, "anime_encoder.npy"))
+
+    def _restore_ratings(self, directory):
+        self.rating_df = pd.DataFrame(read_table(os.path.join(directory, "rating_df"), mmap=False))
+        scale_path = os.path.join(directory, "rating_scale.json")
+        if os.path.exists(scale_path):
+            with open(scale_path) as f:
+                self.rating_scale = json.load(f)
+        encoder_path = os.path.join(directory, "user_encoder.npy")
+        if os.path.exists(encoder_path):
+            self._set_encoders(
+                IdEncoder.load(encoder_path, mmap=False),
+                IdEncoder.load(os.path.join(directory, "anime_encoder.npy"), mmap=False),
+            )
+
+    def _rating_fingerprints(self, cache, usecols, min_rating, test_size, random_state):
+        """Chained fingerprints of the rating stages, in pipeline order."""
+        if self.chunksize:
+            # stream_ratings fuses the first three stages; only its final state is cached
+            streamed = code_version(DataProcessor.scan_ratings, DataProcessor.stream_ratings, _FirstSeenEncoder, IdEncoder)
+            code = {"filter_users": streamed, "scale_ratings": streamed, "encode_data": streamed}
+        else:
+            code = {
+                "filter_users": code_version(DataProcessor.load_data, DataProcessor.filter_users),
+                "scale_ratings": code_version(DataProcessor.scale_ratings),
+                "encode_data": code_version(DataProcessor.encode_data, IdEncoder),
+            }
+        code["split_data"] = code_version(
+            DataProcessor.build_rating_index, DataProcessor.split_data, DataProcessor.save_artifacts, RatingIndex, write_table
+        )
+        params = {
+            "filter_users": {"usecols": usecols, "min_rating": min_rating, "streaming": bool(self.chunksize)},
+            "split_data": {"test_size": test_size, "random_state": random_state},
+        }
+
+        fingerprints, upstream = {}, None
+        for stage in ("filter_users", "scale_ratings", "encode_data", "split_data"):
+            inputs = [self.input_file] if stage == "filter_users" else ()
+            upstream = cache.fingerprint(stage, inputs, params.get(stage), code[stage], upstream)
+            fingerprints[stage] = upstream
+        return fingerprints
+
+    def _run_ratings(self, cache, usecols, min_rating, test_size, random_state):
+        fingerprints = self._rating_fingerprints(cache, usecols, min_rating, test_size, random_state)
+        stages = list(fingerprints)
+        outputs = [
+            self._output_path(path)
+            for path in (USER_ENCODER, ANIME_ENCODER, TRAIN_TABLE, TEST_TABLE, RATING_TABLE, RATING_INDEX, RATING_SCALE)
+        ]
+
+        # Everything up to the saved splits is unchanged
+        if cache.lookup("split_data", fingerprints["split_data"]):
+            for stage in stages:
+                cache.record(stage, reused=True)
+            return fingerprints
+
+        # Resume after the last rating stage whose cached state is still valid
+        start = 0
+        for i in reversed(range(3)):
+            directory = cache.lookup(stages[i], fingerprints[stages[i]])
+            if directory:
+                self._restore_ratings(directory)
+                start = i + 1
+                break
+        for stage in stages[:start]:
+            cache.record(stage, reused=True)
+
+        if self.chunksize and start < 3:
+            self.stream_ratings(usecols, min_rating)
+            cache.store("encode_data", fingerprints["encode_data"], self._cache_ratings)
+            for stage in stages[start:3]:
+                cache.record(stage, reused=False)
+        elif not self.chunksize:
+            for stage in stages[start:3]:
+                if stage == "filter_users":
+                    self.load_data(usecols=usecols)
+                    self.filter_users(min_rating)
+                else:
+                    getattr(self, stage)()
+                cache.store(stage, fingerprints[stage], self._cache_ratings)
+                cache.record(stage, reused=False)
+                # A later stage's state supersedes the earlier ones: keep one copy of rating_df
+                for earlier in stages[:stages.index(stage)]:
+                    cache.discard(earlier)
+
+        self.build_rating_index()
+        self.split_data(test_size, random_state)
+        self.save_artifacts()
+        cache.store("split_data", fingerprints["split_data"], outputs=outputs)
+        cache.record("split_data", reused=False)
+        return fingerprints
+
+    def _run_anime(self, cache):
+        fingerprint = cache.fingerprint(
+            "process_anime_data",
+            inputs=[self.anime_file, self.synopsis_file],
+            params={"synopsis_compression": self.synopsis_compression},
+            code=code_version(DataProcessor.process_anime_data, SynopsisStore, write_table),
+        )
+        if cache.lookup("process_anime_data", fingerprint):
+            cache.record("process_anime_data", reused=True)
+            return fingerprint
+
+        self.process_anime_data()
+        outputs = [self._output_path(path) for path in (ANIME_TABLE, SYNOPSIS_TABLE, SYNOPSIS_STORE)]
+        cache.store("process_anime_data", fingerprint, outputs=outputs)
+        cache.record("process_anime_data", reused=False)
+        return fingerprint
+
+    def run(self, force: bool = False, min_rating: int = 400, test_size: int = 1000, random_state: int = 43):
+        """
+        Run every stage, skipping those whose inputs are unchanged since the last
+        run (see utils/stage_cache.py): filter_users, scale_ratings and
+        encode_data cache their ratings state (only the latest of them is
+        kept), split_data and process_anime_data their saved outputs. Entries
+        this run's fingerprints no longer match are pruned afterwards.
+        force=True recomputes everything. When a stage is reused, the in-memory
+        state it would have produced is not loaded.
+
+        Returns {"reused": [...], "computed": [...]} stage names.
+        """
         try:
+            max_bytes = None if self.stage_cache_max_mb is None else int(self.stage_cache_max_mb * 2**20)
+            cache = StageCache(self._output_path(STAGE_CACHE_DIR), force=force, max_bytes=max_bytes)
+
             # Correct columns
-            self.load_data(usecols=["user_id", "anime_id", "rating"])
-            self.filter_users()
-            self.scale_ratings()
-            self.encode_data()
-            self.split_data()
-            self.save_artifacts()
-
-            self.process_anime_data()
+            usecols = ["user_id", "anime_id", "rating"]
+            current = self._run_ratings(cache, usecols, min_rating, test_size, random_state)
+            current["process_anime_data"] = self._run_anime(cache)
+            cache.prune(current)
+
+            summary = cache.summary()
+            logger.info(f"Stages reused: {summary['reused'] or 'none'}; recomputed: {summary['computed'] or 'none'}")
             logger.info("Data processing pipeline ran successfully.")
+            return summary
         except CustomException as e:
             logger.error(str(e))
             raise
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process raw ratings and anime metadata into training artifacts")
+    parser.add_argument("--force", action="store_true", help="Recompute every stage, ignoring the stage cache")
+    args = parser.parse_args()
+
     data_processor = DataProcessor(ANIMELIST_CSV, PROCESSED_DIR)
-    data_processor.run()
+    data_processor.run(force=args.force)
@@ -0,0 +1,361 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.paths_config import *
+from src.custom_exception import CustomException
+from src.data_processing import DataProcessor
+from src.logger import get_logger
+from src.numpy_trainer import _sigmoid, head_affine, load_head
+from utils.ann_index import IVFIndex
+from utils.artifact_store import ArtifactStore, artifact_update, default_paths
+from utils.columnar import read_table
+from utils.common_functions import read_yaml, save_array
+from utils.id_encoder import IdEncoder
+from utils.neighbour_table import NeighbourTable
+from utils.quantization import export_quantized
+from utils.rating_index import RatingIndex
+from utils.serving_bundle import build_serving_bundle, check_bundle_sources
+
+logger = get_logger(__name__)
+
+# Rating range of animelist.csv, used when rating_scale.json predates this module
+DEFAULT_RATING_SCALE = {"min": 0.0, "max": 10.0}
+
+
+def _normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def fit_embeddings(init, items, targets, mask, scale, shift, steps=50, learning_rate=0.05):
+    """
+    Fit one vector per owner against frozen, L2-normalized item vectors.
+
+    items[i, j] is the j-th vector owner i rated (padded; mask marks real
+    entries) and targets[i, j] its scaled rating. Minimizes each owner's mean
+    binary cross-entropy of sigmoid(scale * cos(vector, item) + shift) with
+    full-batch Adam, all owners at once. Returns the vectors, L2-normalized.
+    """
+    vectors = np.array(init, dtype=np.float32)
+    weight = mask / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+
+    m = np.zeros_like(vectors)
+    v = np.zeros_like(vectors)
+    beta_1, beta_2, epsilon = 0.9, 0.999, 1e-7
+
+    for step in range(1, steps + 1):
+        norm = np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        un = vectors / norm
+
+        cos = np.matmul(items, un[:, :, None])[:, :, 0]
+        d_cos = ((_sigmoid(scale * cos + shift) - targets) * scale * weight).astype(np.float32)
+
+        # d cos / d u = (item - cos * un) / |u|
+        g_items = np.matmul(d_cos[:, None, :], items)[:, 0, :]
+        g_cos = np.sum(d_cos * cos, axis=1, keepdims=True)
+        grad = (g_items - g_cos * un) / norm
+
+        m = beta_1 * m + (1 - beta_1) * grad
+        v = beta_2 * v + (1 - beta_2) * grad * grad
+        step_size = learning_rate * np.sqrt(1 - beta_2 ** step) / (1 - beta_1 ** step)
+        vectors -= step_size * m / (np.sqrt(v) + epsilon)
+
+    return _normalize(vectors)
+
+
+def initial_vectors(items, targets, mask):
+    """Rating-weighted sum of the rated item vectors, as a starting point for new owners."""
+    weights = ((targets + 1e-3) * mask).astype(np.float32)
+    return _normalize(np.matmul(weights[:, None, :], items)[:, 0, :])
+
+
+class FoldIn:
+    """
+    Incremental update for new users, new ratings and (optionally) new anime.
+
+    New ids are appended to the encoders. Embeddings of new or changed users,
+    and of new anime when enabled, are fitted against the frozen embeddings of
+    the other side using the trained model head. The weight artifacts, rating
+    index and the indexes built on top of them are then updated in place.
+
+    New anime get names, genres and synopses only if the raw anime CSVs list
+    them (see refresh_metadata). Otherwise they are embedding-only: they count
+    towards user embeddings and the neighbour table, but results that go
+    through the anime catalog leave them out.
+    """
+
+    def __init__(self, ratings_file: str, fit_new_anime: bool = None):
+        self.ratings_file = ratings_file
+        self.config = read_yaml(CONFIG_PATH).get("fold_in", {})
+        self.fit_new_anime = self.config.get("fit_new_anime", False) if fit_new_anime is None else fit_new_anime
+
+        self.steps = self.config.get("steps", 50)
+        self.learning_rate = self.config.get("learning_rate", 0.05)
+        self.max_block_ratings = self.config.get("max_block_ratings", 262144)
+
+        self.new_ratings = None
+        self.changed_users = None
+        self.changed_codes = None
+        self.new_anime_codes = np.zeros(0, dtype=np.int64)
+
+        logger.info("FoldIn initialized")
+
+    def load_artifacts(self):
+        try:
+            self.user_encoder = IdEncoder.load(USER_ENCODER, mmap=False)
+            self.anime_encoder = IdEncoder.load(ANIME_ENCODER, mmap=False)
+            self.user_weights = np.load(USER_WEIGHTS_NPY).astype(np.float32)
+            self.anime_weights = np.load(ANIME_WEIGHTS_NPY).astype(np.float32)
+            self.rating_index = RatingIndex.load(RATING_INDEX)
+
+            if not os.path.exists(MODEL_HEAD_PATH):
+                raise FileNotFoundError(f"{MODEL_HEAD_PATH} not found; retrain once to export the model head")
+            self.scale, self.shift = head_affine(load_head(MODEL_HEAD_PATH))
+
+            self.rating_scale = DEFAULT_RATING_SCALE
+            if os.path.exists(RATING_SCALE):
+                with open(RATING_SCALE) as f:
+                    self.rating_scale = json.load(f)
+            else:
+                logger.warning(f"{RATING_SCALE} not found; assuming ratings in {DEFAULT_RATING_SCALE}")
+
+            logger.info(f"Loaded {len(self.user_encoder)} users and {len(self.anime_encoder)} anime")
+        except Exception as e:
+            raise CustomException("Failed to load artifacts for fold-in", e)
+
+    def load_ratings(self):
+        """Read the new ratings and scale them like DataProcessor.scale_ratings."""
+        try:
+            df = pd.read_csv(self.ratings_file, usecols=["user_id", "anime_id", "rating"])
+            df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
+            df = df.dropna()
+
+            min_r, max_r = self.rating_scale["min"], self.rating_scale["max"]
+            scaled = (df["rating"] - min_r) / (max_r - min_r) if max_r > min_r else df["rating"] * 0.0
+            df["rating"] = scaled.clip(0.0, 1.0)
+
+            df = df.astype({"user_id": np.int64, "anime_id": np.int64})
+            if not self.fit_new_anime:
+                known = self.anime_encoder.encode_many(df["anime_id"]) >= 0
+                if not known.all():
+                    logger.info(f"Dropped {int((~known).sum())} ratings on unseen anime (fit_new_anime is off)")
+                df = df[known]
+
+            self.new_ratings = df
+            logger.info(f"Loaded {len(df)} new ratings for {df['user_id'].nunique()} users")
+        except Exception as e:
+            raise CustomException("Failed to load new ratings", e)
+
+    def _blocks(self, counts):
+        """
+        Owners grouped by rating count (ascending) into blocks whose padded
+        size (owners x largest count) stays under max_block_ratings.
+        """
+        order = np.argsort(counts, kind="stable")
+        sorted_counts = counts[order]
+        start = 0
+        while start < len(order):
+            # Padded size of [start, stop) grows with stop, so binary search the largest fit
+            sizes = np.arange(1, len(order) - start + 1) * sorted_counts[start:]
+            stop = start + max(1, int(np.searchsorted(sizes, self.max_block_ratings, side="right")))
+            yield order[start:stop]
+            start = stop
+
+    def _fit(self, weights, codes, owner, item_codes, item_weights, targets, new_owners):
+        """
+        Fit the rows `codes` of `weights` in place. owner[j] (sorted) is the
+        position in `codes` that rating j (item_codes[j], targets[j]) belongs to;
+        rows flagged in `new_owners` start from the rating-weighted item mean.
+        """
+        counts = np.bincount(owner, minlength=len(codes))
+        starts = np.cumsum(counts) - counts
+
+        for block in self._blocks(counts):
+            slots = np.arange(counts[block].max())
+            mask = slots[None, :] < counts[block][:, None]
+            rows = np.where(mask, starts[block][:, None] + slots, 0)
+
+            items = item_weights[item_codes[rows]]
+            block_targets = targets[rows]
+            init = weights[codes[block]]
+            fresh = new_owners[block]
+            init[fresh] = initial_vectors(items[fresh], block_targets[fresh], mask[fresh])
+
+            weights[codes[block]] = fit_embeddings(
+                init,
+                items,
+                block_targets,
+                mask,
+                self.scale,
+                self.shift,
+                steps=self.steps,
+                learning_rate=self.learning_rate,
+            )
+
+    @staticmethod
+    def _append(encoder, weights, ids):
+        """Encoder and weight matrix with `ids` appended (zero rows until fitted)."""
+        encoder = IdEncoder.from_ids(np.concatenate([encoder.ids, ids]))
+        weights = np.concatenate([weights, np.zeros((len(ids), weights.shape[1]), dtype=weights.dtype)])
+        return encoder, weights
+
+    def fold_in_users(self):
+        """Append unseen users and refit every user with new ratings on all of their ratings."""
+        try:
+            self.rating_index = self.rating_index.update(self.new_ratings)
+            changed = np.unique(self.new_ratings["user_id"].to_numpy())
+
+            # Every rating of the changed users on anime with an embedding, grouped by user
+            history = self.rating_index.take(self.rating_index.rows(changed))
+            owner = np.repeat(np.arange(len(changed)), np.diff(history.offsets))
+            anime_codes = self.anime_encoder.encode_many(history.anime_ids)
+            rated = anime_codes >= 0
+            owner, anime_codes = owner[rated], anime_codes[rated]
+            targets = history.ratings[rated].astype(np.float32)
+
+            # Users left without any usable rating keep their current state
+            has_ratings = np.bincount(owner, minlength=len(changed)) > 0
+            self.changed_users = changed[has_ratings]
+            owner = (np.cumsum(has_ratings) - 1)[owner]
+
+            codes = self.user_encoder.encode_many(self.changed_users)
+            new_users = codes < 0
+            if new_users.any():
+                n_old = len(self.user_encoder)
+                self.user_encoder, self.user_weights = self._append(
+                    self.user_encoder, self.user_weights, self.changed_users[new_users]
+                )
+                codes[new_users] = np.arange(n_old, len(self.user_encoder))
+
+            self._fit(self.user_weights, codes, owner, anime_codes, self.anime_weights, targets, new_users)
+            self.changed_codes = codes
+            logger.info(f"Folded in {len(codes)} users ({int(new_users.sum())} new)")
+        except Exception as e:
+            raise CustomException("Failed to fold in users", e)
+
+    def fold_in_anime(self):
+        """Append anime not seen in training and fit them against the (updated) user embeddings."""
+        try:
+            anime_codes = self.anime_encoder.encode_many(self.new_ratings["anime_id"])
+            user_codes = self.user_encoder.encode_many(self.new_ratings["user_id"])
+            raters = self.new_ratings.assign(user=user_codes)[(anime_codes < 0) & (user_codes >= 0)]
+            if raters.empty:
+                return
+
+            new_ids = np.unique(raters["anime_id"].to_numpy())
+            n_old = len(self.anime_encoder)
+            self.anime_encoder, self.anime_weights = self._append(self.anime_encoder, self.anime_weights, new_ids)
+            self.new_anime_codes = np.arange(n_old, len(self.anime_encoder))
+
+            raters = raters.sort_values("anime_id", kind="stable")
+            owner = np.searchsorted(new_ids, raters["anime_id"].to_numpy())
+            self._fit(
+                self.anime_weights,
+                self.new_anime_codes,
+                owner,
+                raters["user"].to_numpy(),
+                self.user_weights,
+                raters["rating"].to_numpy(dtype=np.float32),
+                np.ones(len(new_ids), dtype=bool),
+            )
+            logger.info(f"Folded in {len(new_ids)} new anime")
+        except Exception as e:
+            raise CustomException("Failed to fold in new anime", e)
+
+    def _catalog_ids(self):
+        if not os.path.exists(ANIME_TABLE):
+            return np.zeros(0, dtype=np.int64)
+        return read_table(ANIME_TABLE, ["anime_id"])["anime_id"]
+
+    def refresh_metadata(self):
+        """
+        Reprocess the raw anime and synopsis CSVs when folded-in anime are
+        missing from the processed anime table, so the catalog and the
+        synopsis store can find them. Anime the CSVs don't list either stay
+        embedding-only.
+        """
+        try:
+            new_ids = self.anime_encoder.ids[self.new_anime_codes]
+            missing = new_ids[~np.isin(new_ids, self._catalog_ids())]
+            if not len(missing):
+                return
+
+            if os.path.exists(ANIME_CSV) and os.path.exists(ANIMESYNOPSIS_CSV):
+                DataProcessor(
+                    self.ratings_file, PROCESSED_DIR, anime_file=ANIME_CSV, synopsis_file=ANIMESYNOPSIS_CSV
+                ).process_anime_data()
+                missing = missing[~np.isin(missing, self._catalog_ids())]
+                logger.info(f"Anime metadata reprocessed for {len(new_ids) - len(missing)} new anime")
+
+            if len(missing):
+                logger.warning(
+                    f"{len(missing)} new anime are not in {ANIME_CSV} and stay embedding-only "
+                    f"(left out of catalog results), e.g. {missing[:5].tolist()}"
+                )
+        except Exception as e:
+            raise CustomException("Failed to refresh anime metadata", e)
+
+    def save_artifacts(self):
+        try:
+            self.user_encoder.save(USER_ENCODER)
+            self.anime_encoder.save(ANIME_ENCODER)
+            self.rating_index.save(RATING_INDEX)
+
+            precisions = read_yaml(CONFIG_PATH).get("quantization", {}).get("precisions", ["float16", "int8"])
+            save_array(USER_WEIGHTS_NPY, self.user_weights)
+            export_quantized(self.user_weights, USER_WEIGHTS_NPY, precisions)
+            if os.path.exists(USER_ANN_INDEX_PATH):
+                IVFIndex.load(USER_ANN_INDEX_PATH).update(self.user_weights, self.changed_codes).save(USER_ANN_INDEX_PATH)
+
+            if len(self.new_anime_codes):
+                save_array(ANIME_WEIGHTS_NPY, self.anime_weights)
+                export_quantized(self.anime_weights, ANIME_WEIGHTS_NPY, precisions)
+                if os.path.exists(ANIME_ANN_INDEX_PATH):
+                    IVFIndex.load(ANIME_ANN_INDEX_PATH).update(self.anime_weights, self.new_anime_codes).save(ANIME_ANN_INDEX_PATH)
+
+                # New anime can enter any row's top-k, so the table is rebuilt
+                table_config = read_yaml(CONFIG_PATH).get("neighbour_table", {})
+                NeighbourTable.build(
+                    self.anime_weights,
+                    k=table_config.get("k", 50),
+                    block_size=table_config.get("block_size", 1024),
+                ).save(ANIME_NEIGHBOURS_PATH)
+
+            # Workers serving from the bundle only see the fold-in once it is rebuilt
+            if os.path.exists(SERVING_BUNDLE_PATH):
+                serving_paths = default_paths(legacy=False)
+                build_serving_bundle(SERVING_BUNDLE_PATH, ArtifactStore(paths=serving_paths))
+                check_bundle_sources(SERVING_BUNDLE_PATH, serving_paths)
+                logger.info(f"Serving bundle rebuilt: {SERVING_BUNDLE_PATH}")
+
+            logger.info("Fold-in artifacts saved")
+        except Exception as e:
+            raise CustomException("Failed to save fold-in artifacts", e)
+
+    def run(self):
+        try:
+            start = time.perf_counter()
+            with artifact_update():
+                self.load_artifacts()
+                self.load_ratings()
+                self.fold_in_users()
+                if self.fit_new_anime:
+                    self.fold_in_anime()
+                    self.refresh_metadata()
+                self.save_artifacts()
+            logger.info(f"Fold-in finished in {time.perf_counter() - start:.2f}s")
+        except CustomException as e:
+            logger.error(str(e))
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold new users/ratings into the trained artifacts")
+    parser.add_argument("ratings_file", help="CSV with user_id, anime_id, rating columns")
+    parser.add_argument("--fit-new-anime", action="store_true", default=None)
+    args = parser.parse_args()
+
+    FoldIn(args.ratings_file, fit_new_anime=args.fit_new_anime).run()
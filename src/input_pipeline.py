@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.callbacks import Callback
+
+from src.custom_exception import CustomException
+from src.logger import get_logger
+from utils.columnar import read_table
+
+logger = get_logger(__name__)
+
+COLUMNS = ["user", "anime", "rating"]
+
+
+def _setting(value):
+    """-1 / None in config.yaml means tf.data.AUTOTUNE."""
+    return tf.data.AUTOTUNE if value in (None, -1) else int(value)
+
+
+class RatingDataset:
+    """
+    tf.data pipeline over a memory-mapped train/test table.
+
+    Rows are read in contiguous blocks straight from the mmap'd columns, so only
+    the blocks in flight are resident. Each block is permuted in NumPy and cut
+    into whole batches, so tf.data handles one element per batch instead of one
+    per row; split_data writes the table already shuffled, so a batch drawn
+    from one block is still a random sample. Each epoch the block order and the
+    rows within every block are reshuffled, `cycle_length` blocks are
+    interleaved in parallel, and batches are mixed through a shuffle buffer of
+    about `shuffle_buffer` rows, then prefetched.
+    """
+
+    def __init__(self, table_path, config: dict):
+        self.columns = read_table(table_path, COLUMNS)
+        self.n_rows = len(self.columns["rating"])
+
+        self.batch_size = int(config.get("batch_size", 10000))
+        # Whole batches per block, so only the table's last batch is short
+        self.block_rows = -(-int(config.get("block_rows", 65536)) // self.batch_size) * self.batch_size
+        self.shuffle_buffer = int(config.get("shuffle_buffer", 1_000_000))
+        self.cycle_length = int(config.get("interleave_cycle_length", 4))
+        self.num_parallel_calls = _setting(config.get("num_parallel_calls"))
+        self.prefetch = _setting(config.get("prefetch"))
+        self.seed = config.get("seed")
+        self._rng = np.random.default_rng(self.seed)
+
+    def __len__(self):
+        """Batches per epoch."""
+        return -(-self.n_rows // self.batch_size)
+
+    def _read_block(self, start, shuffle):
+        start = int(start)
+        stop = min(start + self.block_rows, self.n_rows)
+        block = [np.asarray(self.columns[name][start:stop]) for name in COLUMNS]
+        if shuffle:
+            order = self._rng.permutation(stop - start)
+            block = [column[order] for column in block]
+        return tuple(block)
+
+    def _block_dataset(self, start, shuffle):
+        user, anime, rating = tf.numpy_function(
+            lambda s: self._read_block(s, shuffle), [start], (tf.int32, tf.int32, tf.float32)
+        )
+        for tensor in (user, anime, rating):
+            tensor.set_shape([None])
+
+        size = self.batch_size
+        batch_starts = tf.range(0, tf.shape(rating)[0], size)
+        return tf.data.Dataset.from_tensor_slices(batch_starts).map(
+            lambda i: (user[i:i + size], anime[i:i + size], rating[i:i + size])
+        )
+
+    @staticmethod
+    def _to_inputs(user, anime, rating):
+        # Named like the RecommenderNet inputs, shape (batch, 1)
+        return {"user": tf.expand_dims(user, -1), "anime": tf.expand_dims(anime, -1)}, rating
+
+    def build(self, shuffle=True):
+        try:
+            starts = np.arange(0, self.n_rows, self.block_rows, dtype=np.int64)
+            dataset = tf.data.Dataset.from_tensor_slices(starts)
+
+            if shuffle:
+                dataset = dataset.shuffle(len(starts), seed=self.seed, reshuffle_each_iteration=True)
+
+            dataset = dataset.interleave(
+                lambda start: self._block_dataset(start, shuffle),
+                cycle_length=self.cycle_length,
+                num_parallel_calls=self.num_parallel_calls,
+                deterministic=not shuffle,
+            )
+
+            if shuffle:
+                buffer_batches = max(1, self.shuffle_buffer // self.batch_size)
+                dataset = dataset.shuffle(buffer_batches, seed=self.seed, reshuffle_each_iteration=True)
+
+            dataset = (
+                dataset.map(self._to_inputs, num_parallel_calls=self.num_parallel_calls)
+                # Tell Keras the epoch length (numpy_function hides it)
+                .apply(tf.data.experimental.assert_cardinality(len(self)))
+                .prefetch(self.prefetch)
+            )
+
+            logger.info(
+                f"tf.data pipeline: {self.n_rows} rows, {len(starts)} blocks of {self.block_rows}, "
+                f"batch={self.batch_size}, shuffle_buffer={self.shuffle_buffer}, cycle_length={self.cycle_length}"
+            )
+            return dataset
+
+        except Exception as e:
+            raise CustomException("Failed to build tf.data input pipeline", e)
+
+
+class ThroughputLogger(Callback):
+    """Logs training samples/sec per epoch (validation time excluded)."""
+
+    def __init__(self, n_samples, experiment=None):
+        super().__init__()
+        self.n_samples = n_samples
+        self.experiment = experiment
+        self.samples_per_sec = []
+        self._start = None
+        self._last_batch = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._last_batch = self._start
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._last_batch = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = max(self._last_batch - self._start, 1e-9)
+        rate = self.n_samples / elapsed
+        self.samples_per_sec.append(rate)
+
+        logger.info(f"Epoch {epoch + 1}: {rate:,.0f} samples/sec ({elapsed:.1f}s)")
+        if self.experiment is not None:
+            self.experiment.log_metric("samples_per_sec", rate, step=epoch)
@@ -1,14 +1,18 @@
 import json
 
 import comet_ml
-import joblib
 import numpy as np
-from tensorflow.keras.callbacks import ModelCheckpoint, LearningRateScheduler, EarlyStopping
 
 from config.paths_config import *
-from src.base_model import BaseModel
 from src.custom_exception import CustomException
 from src.logger import get_logger
+from src.numpy_trainer import NumpyRecommenderNet, save_head
+from utils.ann_index import IVFIndex
+from utils.columnar import read_table
+from utils.id_encoder import IdEncoder
+from utils.neighbour_table import NeighbourTable
+from utils.quantization import export_quantized
+from utils.common_functions import read_yaml, save_array
 
 logger = get_logger(__name__)
 
@@ -19,9 +23,23 @@ with open(COMET_API_PATH, "r") as file:
 api_key_comet= secret["api_key_comet"]
 
 
+def lrfn(epoch, start_lr=1e-5, max_lr=5e-4, min_lr=1e-6, ramup_epochs=5, sustain_epochs=0, exp_decay=0.8):
+    if epoch < ramup_epochs:
+        return (max_lr - start_lr) / ramup_epochs * epoch + start_lr
+    elif epoch < ramup_epochs + sustain_epochs:
+        return max_lr
+    else:
+        return (max_lr - min_lr) * exp_decay ** (epoch - ramup_epochs - sustain_epochs) + min_lr
+
+
+def normalize_weights(weights):
+    return weights/np.linalg.norm(weights,axis=1).reshape((-1,1))
+
+
 class ModelTraining:
     def __init__(self, data_path):
         self.data_path = data_path
+        self.config = read_yaml(CONFIG_PATH)
 
         self.experiment = comet_ml.Experiment(
             api_key = api_key_comet,
@@ -33,10 +51,14 @@ class ModelTraining:
 
     def load_data(self):
         try:
-            X_train_array = joblib.load(X_TRAIN_ARRAY)
-            X_test_array = joblib.load(X_TEST_ARRAY)
-            y_train = joblib.load(Y_TRAIN)
-            y_test = joblib.load(Y_TEST)
+            train = read_table(TRAIN_TABLE, ["user", "anime", "rating"])
+            test = read_table(TEST_TABLE, ["user", "anime", "rating"])
+
+            # Keras expects [user_array, anime_array]
+            X_train_array = [train["user"], train["anime"]]
+            X_test_array = [test["user"], test["anime"]]
+            y_train = train["rating"]
+            y_test = test["rating"]
 
             logger.info("Data loaded successfully for model training")
             return X_train_array, X_test_array, y_train, y_test
@@ -44,82 +66,139 @@ class ModelTraining:
         except Exception as e:
             raise CustomException("Failed to load data", e)
 
-    def train_model(self):
+    def fit_inputs(self, training_config):
+        """
+        (fit kwargs, number of training samples) for the configured input pipeline:
+        in-memory arrays ("numpy") or batches streamed through tf.data ("tf_data").
+        """
         try:
+            if training_config.get("input_pipeline", "numpy") == "tf_data":
+                from src.input_pipeline import RatingDataset
+
+                train = RatingDataset(TRAIN_TABLE, training_config)
+                test = RatingDataset(TEST_TABLE, training_config)
+                inputs = {"x": train.build(shuffle=True), "validation_data": test.build(shuffle=False)}
+                return inputs, train.n_rows
+
             X_train_array, X_test_array, y_train, y_test = self.load_data()
+            inputs = {
+                "x": X_train_array,
+                "y": y_train,
+                "batch_size": training_config.get("batch_size", 10000),
+                "validation_data": (X_test_array, y_test),
+            }
+            return inputs, len(y_train)
 
-            n_users = len(joblib.load(USER2USER_ENCODED))
-            n_anime = len(joblib.load(ANIME2ANIME_ENCODED))
+        except Exception as e:
+            raise CustomException("Failed to prepare training inputs", e)
 
-            base_model = BaseModel(config_path=CONFIG_PATH)
+    def train_model(self):
+        try:
+            training_config = self.config.get("training", {})
+            backend = training_config.get("backend", "keras")
+            logger.info(f"Training backend: {backend}")
 
-            model = base_model.RecommenderNet(n_users=n_users, n_anime=n_anime)
+            os.makedirs(MODEL_DIR, exist_ok=True)
+            os.makedirs(WEIGHTS_DIR, exist_ok=True)
+
+            if backend == "numpy":
+                self.train_numpy(training_config)
+            elif backend == "keras":
+                self.train_keras(training_config)
+            else:
+                raise ValueError(f"Unknown training backend: {backend}")
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during Model Trainig Process", e)
 
-            start_lr = 1e-5
-            max_lr = 5e-4
-            min_lr = 1e-6
-            batch_size = 10000
 
-            ramup_epochs = 5
-            sustain_epochs = 0
-            exp_decay = 0.8
+    def train_keras(self, training_config):
+        # TensorFlow is imported here so the numpy backend never pays its startup cost
+        from tensorflow.keras.callbacks import ModelCheckpoint, LearningRateScheduler, EarlyStopping
 
-            def lrfn(epoch):
-                if epoch < ramup_epochs:
-                    return (max_lr - start_lr) / ramup_epochs * epoch + start_lr
-                elif epoch < ramup_epochs + sustain_epochs:
-                    return max_lr
-                else:
-                    return (max_lr - min_lr) * exp_decay ** (epoch - ramup_epochs - sustain_epochs) + min_lr
+        from src.base_model import BaseModel
+        from src.input_pipeline import ThroughputLogger
 
-            lr_callback = LearningRateScheduler(lambda epoch: lrfn(epoch), verbose=0)
+        fit_inputs, n_samples = self.fit_inputs(training_config)
 
-            model_checkpoint = ModelCheckpoint(filepath=CHECKPOINT_FILE_PATH, save_weights_only=True,
-                                               monitor="val_loss", mode="min", save_best_only=True)
+        n_users = len(IdEncoder.load(USER_ENCODER))
+        n_anime = len(IdEncoder.load(ANIME_ENCODER))
 
-            early_stopping = EarlyStopping(patience=3, monitor="val_loss", mode="min", restore_best_weights=True)
+        base_model = BaseModel(config_path=CONFIG_PATH)
 
-            my_callbacks = [model_checkpoint, lr_callback, early_stopping]
+        model = base_model.RecommenderNet(n_users=n_users, n_anime=n_anime)
 
-            os.makedirs(os.path.dirname(CHECKPOINT_FILE_PATH), exist_ok=True)
-            os.makedirs(MODEL_DIR, exist_ok=True)
-            os.makedirs(WEIGHTS_DIR, exist_ok=True)
+        lr_callback = LearningRateScheduler(lambda epoch: lrfn(epoch), verbose=0)
 
-            try:
-                history = model.fit(
-                    x=X_train_array,
-                    y=y_train,
-                    batch_size=batch_size,
-                    epochs=20,
-                    verbose=1,
-                    validation_data=(X_test_array, y_test),
-                    callbacks=my_callbacks
-                )
-                model.load_weights(CHECKPOINT_FILE_PATH)
-                logger.info("Model training Completedd.....")
+        model_checkpoint = ModelCheckpoint(filepath=CHECKPOINT_FILE_PATH, save_weights_only=True,
+                                           monitor="val_loss", mode="min", save_best_only=True)
 
-                for epoch in range(len(history.history['loss'])):
-                    train_loss = history.history["loss"][epoch]
-                    val_loss = history.history["val_loss"][epoch]
+        early_stopping = EarlyStopping(patience=3, monitor="val_loss", mode="min", restore_best_weights=True)
 
-                    self.experiment.log_metric('train_loss', train_loss, step=epoch)
-                    self.experiment.log_metric('val_loss', val_loss, step=epoch)
+        throughput = ThroughputLogger(n_samples, experiment=self.experiment)
 
-            except Exception as e:
-                raise CustomException("Model training failedd.....")
+        my_callbacks = [model_checkpoint, lr_callback, early_stopping, throughput]
 
-            self.save_model_weights(model)
+        os.makedirs(os.path.dirname(CHECKPOINT_FILE_PATH), exist_ok=True)
+
+        try:
+            history = model.fit(
+                **fit_inputs,
+                epochs=training_config.get("epochs", 20),
+                verbose=1,
+                callbacks=my_callbacks
+            )
+            model.load_weights(CHECKPOINT_FILE_PATH)
+            logger.info("Model training Completedd.....")
+
+            self.log_history(history.history)
 
         except Exception as e:
-            logger.error(str(e))
-            raise CustomException("Error during Model Trainig Process", e)
+            raise CustomException("Model training failedd.....")
+
+        self.save_model_weights(model)
+
+
+    def train_numpy(self, training_config):
+        X_train_array, X_test_array, y_train, y_test = self.load_data()
+
+        model = NumpyRecommenderNet(
+            n_users=len(IdEncoder.load(USER_ENCODER)),
+            n_anime=len(IdEncoder.load(ANIME_ENCODER)),
+            embedding_size=self.config["model"]["embedding_size"],
+            seed=training_config.get("seed") or 42,
+        )
+
+        history = model.fit(
+            X_train_array,
+            y_train,
+            validation_data=(X_test_array, y_test),
+            batch_size=training_config.get("batch_size", 10000),
+            epochs=training_config.get("epochs", 20),
+            learning_rate=lrfn,
+            patience=3,
+            experiment=self.experiment,
+        )
+        logger.info("NumPy model training completed")
+
+        self.log_history(history)
+        self.save_numpy_model(model)
+
+
+    def log_history(self, history):
+        for epoch in range(len(history['loss'])):
+            train_loss = history["loss"][epoch]
+            val_loss = history["val_loss"][epoch]
+
+            self.experiment.log_metric('train_loss', train_loss, step=epoch)
+            self.experiment.log_metric('val_loss', val_loss, step=epoch)
 
 
     def extract_weights(self, layer_name, model):
         try:
             weight_layer = model.get_layer(name=layer_name)
-            weights = weight_layer.get_weights()[0]
-            weights = weights/np.linalg.norm(weights,axis=1).reshape((-1,1))
+            weights = normalize_weights(weight_layer.get_weights()[0])
             logger.info(f"Extracting weights for {layer_name}")
             return weights
 
@@ -128,6 +207,72 @@ class ModelTraining:
             raise CustomException("Error during weight extraction process", e)
 
 
+    def extract_head(self, model):
+        """Scalar Dense + BatchNorm parameters of the Keras model, keyed like numpy_trainer.HEAD."""
+        try:
+            layers = {layer.__class__.__name__: layer for layer in model.layers}
+            kernel, bias = layers["Dense"].get_weights()
+            gamma, beta, moving_mean, moving_var = layers["BatchNormalization"].get_weights()
+            return {
+                "dense_kernel": kernel.item(),
+                "dense_bias": bias.item(),
+                "bn_gamma": gamma.item(),
+                "bn_beta": beta.item(),
+                "bn_moving_mean": moving_mean.item(),
+                "bn_moving_var": moving_var.item(),
+            }
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during head extraction process", e)
+
+
+    def export_quantized_weights(self, user_weights, anime_weights):
+        try:
+            precisions = self.config.get("quantization", {}).get("precisions", ["float16", "int8"])
+            for weights, path in [(user_weights, USER_WEIGHTS_NPY), (anime_weights, ANIME_WEIGHTS_NPY)]:
+                for quantized_path in export_quantized(weights, path, precisions):
+                    logger.info(f"Quantized weights saved to {quantized_path}")
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error while exporting quantized weights", e)
+
+
+    def build_ann_indexes(self, user_weights, anime_weights):
+        try:
+            ann_config = self.config.get("ann_index", {})
+            for weights, path in [(user_weights, USER_ANN_INDEX_PATH), (anime_weights, ANIME_ANN_INDEX_PATH)]:
+                index = IVFIndex.build(
+                    weights,
+                    n_lists=ann_config.get("n_lists"),
+                    n_iter=ann_config.get("n_iter", 10),
+                    seed=ann_config.get("seed", 42),
+                )
+                index.save(path)
+                logger.info(f"ANN index with {index.n_lists} lists saved to {path}")
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error while building ANN indexes", e)
+
+
+    def build_neighbour_table(self, anime_weights):
+        try:
+            table_config = self.config.get("neighbour_table", {})
+            table = NeighbourTable.build(
+                anime_weights,
+                k=table_config.get("k", 50),
+                block_size=table_config.get("block_size", 1024),
+            )
+            table.save(ANIME_NEIGHBOURS_PATH)
+            logger.info(f"Anime neighbour table (k={table.k}) saved to {ANIME_NEIGHBOURS_PATH}")
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error while building anime neighbour table", e)
+
+
     def save_model_weights(self, model):
         try:
             model.save(MODEL_PATH)
@@ -136,20 +281,56 @@ class ModelTraining:
             user_weights = self.extract_weights("user_embedding", model)
             anime_weights = self.extract_weights("anime_embedding", model)
 
-            joblib.dump(user_weights, USER_WEIGHTS_PATH)
-            joblib.dump(anime_weights, ANIME_WEIGHTS_PATH)
-
+            self.save_embeddings(user_weights, anime_weights, self.extract_head(model))
             self.experiment.log_asset(MODEL_PATH)
-            self.experiment.log_asset(ANIME_WEIGHTS_PATH)
-            self.experiment.log_asset(USER_WEIGHTS_PATH)
 
-            logger.info("User and anime weights saved successfully.")
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during model saving", e)
+
+
+    def save_numpy_model(self, model):
+        try:
+            model.save(NUMPY_MODEL_PATH)
+            logger.info(f"Model saved to {NUMPY_MODEL_PATH}")
+
+            self.save_embeddings(
+                normalize_weights(model.user_embedding), normalize_weights(model.anime_embedding), model.head()
+            )
+            self.experiment.log_asset(NUMPY_MODEL_PATH)
 
         except Exception as e:
             logger.error(str(e))
             raise CustomException("Error during model saving", e)
 
 
+    def save_embeddings(self, user_weights, anime_weights, head):
+        """Write the normalized embeddings, the model head and everything derived from them."""
+        try:
+            save_head(MODEL_HEAD_PATH, head)
+            logger.info(f"Model head saved to {MODEL_HEAD_PATH}")
+
+            # Plain .npy so serving processes can memory-map and share them
+            save_array(USER_WEIGHTS_NPY, user_weights.astype(np.float32))
+            save_array(ANIME_WEIGHTS_NPY, anime_weights.astype(np.float32))
+
+            self.export_quantized_weights(user_weights, anime_weights)
+
+            self.build_ann_indexes(user_weights, anime_weights)
+            self.build_neighbour_table(anime_weights)
+
+            self.experiment.log_asset(ANIME_WEIGHTS_NPY)
+            self.experiment.log_asset(USER_WEIGHTS_NPY)
+            self.experiment.log_asset(ANIME_NEIGHBOURS_PATH)
+            self.experiment.log_asset(MODEL_HEAD_PATH)
+
+            logger.info("User and anime weights saved successfully.")
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error while saving embeddings", e)
+
+
 if __name__ == "__main__":
     model_trainer = ModelTraining(PROCESSED_DIR)
     model_trainer.train_model()
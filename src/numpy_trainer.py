@@ -0,0 +1,278 @@
+import time
+
+import numpy as np
+
+from src.custom_exception import CustomException
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keras defaults used by BaseModel.RecommenderNet
+NORM_EPSILON = 1e-12      # tf.math.l2_normalize in Dot(normalize=True)
+BN_EPSILON = 1e-3         # BatchNormalization
+BN_MOMENTUM = 0.99
+PROB_EPSILON = 1e-7       # binary_crossentropy clipping
+
+
+HEAD = ("dense_kernel", "dense_bias", "bn_gamma", "bn_beta", "bn_moving_mean", "bn_moving_var")
+
+
+def save_head(path, head):
+    """Write the scalar Dense + BatchNorm parameters (dict keyed by HEAD)."""
+    np.savez(path, **{name: np.float32(head[name]) for name in HEAD})
+
+
+def load_head(path):
+    with np.load(path) as data:
+        return {name: float(data[name]) for name in HEAD}
+
+
+def head_affine(head):
+    """
+    Inference-mode head folded into one affine map of the embedding cosine:
+    predicted rating = sigmoid(scale * cos + shift).
+    """
+    bn_scale = head["bn_gamma"] / np.sqrt(head["bn_moving_var"] + BN_EPSILON)
+    scale = head["dense_kernel"] * bn_scale
+    shift = (head["dense_bias"] - head["bn_moving_mean"]) * bn_scale + head["bn_beta"]
+    return float(scale), float(shift)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def binary_crossentropy(ratings, probs):
+    probs = np.clip(probs, PROB_EPSILON, 1.0 - PROB_EPSILON)
+    return -(ratings * np.log(probs) + (1.0 - ratings) * np.log(1.0 - probs))
+
+
+class NumpyRecommenderNet:
+    """
+    NumPy implementation of BaseModel.RecommenderNet and its training loop.
+
+    Forward pass: cosine of the user and anime embeddings -> Dense(1) ->
+    BatchNormalization -> sigmoid, trained on binary cross-entropy like the
+    Keras model. Each mini-batch touches only its own embedding rows, so
+    gradients are scattered onto the unique rows of the batch and Adam updates
+    only those rows (lazy Adam); the scalar head uses dense Adam. Keras sums
+    the squares of repeated rows' gradients into Adam's second moment rather
+    than squaring their sum, so steps match Keras exactly only when a batch
+    has no repeated users or anime.
+    """
+
+    def __init__(self, n_users, n_anime, embedding_size, seed=42):
+        rng = np.random.default_rng(seed)
+        # Keras initializers: Embedding uniform(-0.05, 0.05), Dense he_normal (fan_in = 1)
+        self.user_embedding = rng.uniform(-0.05, 0.05, (n_users, embedding_size)).astype(np.float32)
+        self.anime_embedding = rng.uniform(-0.05, 0.05, (n_anime, embedding_size)).astype(np.float32)
+        self.dense_kernel = np.float32(np.clip(rng.normal(0.0, np.sqrt(2.0)), -2 * np.sqrt(2.0), 2 * np.sqrt(2.0)))
+        self.dense_bias = np.float32(0.0)
+        self.bn_gamma = np.float32(1.0)
+        self.bn_beta = np.float32(0.0)
+        self.bn_moving_mean = np.float32(0.0)
+        self.bn_moving_var = np.float32(1.0)
+
+        self._adam_state = {}
+        self._step = 0
+
+    # ------------------------------------------------------------------
+    # Forward
+    # ------------------------------------------------------------------
+    def _cosine(self, users, anime):
+        u = self.user_embedding[users]
+        a = self.anime_embedding[anime]
+        u_norm = np.sqrt(np.maximum(np.einsum("ij,ij->i", u, u), NORM_EPSILON))
+        a_norm = np.sqrt(np.maximum(np.einsum("ij,ij->i", a, a), NORM_EPSILON))
+        un = u / u_norm[:, None]
+        an = a / a_norm[:, None]
+        return np.einsum("ij,ij->i", un, an), un, an, u_norm, a_norm
+
+    def predict(self, users, anime, batch_size=100_000):
+        """Inference-mode predictions (BatchNorm moving statistics)."""
+        users, anime = np.asarray(users).ravel(), np.asarray(anime).ravel()
+        out = np.empty(len(users), dtype=np.float32)
+        scale = self.bn_gamma / np.sqrt(self.bn_moving_var + BN_EPSILON)
+
+        for start in range(0, len(users), batch_size):
+            batch = slice(start, start + batch_size)
+            cos = self._cosine(users[batch], anime[batch])[0]
+            z = self.dense_kernel * cos + self.dense_bias
+            out[batch] = _sigmoid((z - self.bn_moving_mean) * scale + self.bn_beta)
+        return out
+
+    def evaluate(self, users, anime, ratings):
+        """Mean binary cross-entropy, as Keras reports val_loss."""
+        probs = self.predict(users, anime)
+        return float(binary_crossentropy(np.asarray(ratings, dtype=np.float32), probs).mean())
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+    def _adam(self, name, param, grad, lr, rows=None, beta_1=0.9, beta_2=0.999, epsilon=1e-7):
+        """Adam step on `param` (in place for arrays); `rows` restricts it to those rows."""
+        if name not in self._adam_state:
+            self._adam_state[name] = (np.zeros_like(param), np.zeros_like(param))
+        m, v = self._adam_state[name]
+
+        step_size = float(lr * np.sqrt(1 - beta_2 ** self._step) / (1 - beta_1 ** self._step))
+
+        if rows is None:
+            m[...] = beta_1 * m + (1 - beta_1) * grad
+            v[...] = beta_2 * v + (1 - beta_2) * grad * grad
+            return param - step_size * m / (np.sqrt(v) + epsilon)
+
+        m_rows, v_rows = m[rows], v[rows]
+        m_rows *= beta_1
+        m_rows += (1 - beta_1) * grad
+        v_rows *= beta_2
+        grad *= grad
+        v_rows += (1 - beta_2) * grad
+        m[rows], v[rows] = m_rows, v_rows
+
+        # Reuse the buffers for step_size * m / (sqrt(v) + epsilon)
+        np.sqrt(v_rows, out=v_rows)
+        v_rows += epsilon
+        np.divide(m_rows, v_rows, out=m_rows)
+        m_rows *= step_size
+        param[rows] -= m_rows
+        return param
+
+    @staticmethod
+    def _scatter(index, grads):
+        """Sum per-sample gradient rows onto the unique embedding rows."""
+        order = np.argsort(index, kind="stable")
+        sorted_index = index[order]
+        first = np.r_[True, sorted_index[1:] != sorted_index[:-1]]
+
+        # Most rows appear once per batch: copy those, add only the repeats
+        summed = grads[order[first]]
+        repeats = ~first
+        if repeats.any():
+            np.add.at(summed, np.cumsum(first)[repeats] - 1, grads[order[repeats]])
+        return sorted_index[first], summed
+
+    def train_step(self, users, anime, ratings, lr):
+        """One mini-batch update; returns the batch loss."""
+        self._step += 1
+        n = len(users)
+
+        cos, un, an, u_norm, a_norm = self._cosine(users, anime)
+        z = self.dense_kernel * cos + self.dense_bias
+
+        mean, var = z.mean(), z.var()
+        inv_std = 1.0 / np.sqrt(var + BN_EPSILON)
+        z_hat = (z - mean) * inv_std
+        probs = _sigmoid(self.bn_gamma * z_hat + self.bn_beta)
+        loss = float(binary_crossentropy(ratings, probs).mean())
+
+        # Backward (sigmoid + cross-entropy, then batch-statistics BatchNorm)
+        d_out = (probs - ratings) / n
+        d_gamma = np.sum(d_out * z_hat)
+        d_beta = np.sum(d_out)
+        d_zhat = d_out * self.bn_gamma
+        d_z = inv_std * (d_zhat - d_zhat.mean() - z_hat * np.mean(d_zhat * z_hat))
+
+        d_kernel = np.sum(d_z * cos)
+        d_bias = np.sum(d_z)
+        d_cos = (d_z * self.dense_kernel).astype(np.float32)
+
+        grad_u = d_cos[:, None] * (an - cos[:, None] * un) / u_norm[:, None]
+        grad_a = d_cos[:, None] * (un - cos[:, None] * an) / a_norm[:, None]
+
+        user_rows, user_grads = self._scatter(users, grad_u)
+        anime_rows, anime_grads = self._scatter(anime, grad_a)
+        self._adam("user_embedding", self.user_embedding, user_grads, lr, rows=user_rows)
+        self._adam("anime_embedding", self.anime_embedding, anime_grads, lr, rows=anime_rows)
+
+        head = np.array([self.dense_kernel, self.dense_bias, self.bn_gamma, self.bn_beta], dtype=np.float32)
+        head_grad = np.array([d_kernel, d_bias, d_gamma, d_beta], dtype=np.float32)
+        self.dense_kernel, self.dense_bias, self.bn_gamma, self.bn_beta = self._adam("head", head, head_grad, lr)
+
+        self.bn_moving_mean = np.float32(BN_MOMENTUM * self.bn_moving_mean + (1 - BN_MOMENTUM) * mean)
+        self.bn_moving_var = np.float32(BN_MOMENTUM * self.bn_moving_var + (1 - BN_MOMENTUM) * var)
+        return loss
+
+    def fit(self, X_train, y_train, validation_data, batch_size, epochs, learning_rate,
+            patience=3, seed=42, experiment=None):
+        """
+        Keras-like fit: per-epoch learning rate from `learning_rate(epoch)`,
+        early stopping on val_loss with the best weights restored.
+        Returns a history dict (loss, val_loss, samples_per_sec).
+        """
+        try:
+            users, anime = (np.asarray(x).ravel() for x in X_train)
+            ratings = np.asarray(y_train, dtype=np.float32)
+            (val_users, val_anime), val_ratings = validation_data
+
+            rng = np.random.default_rng(seed)
+            history = {"loss": [], "val_loss": [], "samples_per_sec": []}
+            best_loss, best_state, wait = np.inf, None, 0
+
+            for epoch in range(epochs):
+                lr = learning_rate(epoch)
+                order = rng.permutation(len(ratings))
+                start_time = time.perf_counter()
+
+                batch_losses = []
+                for start in range(0, len(order), batch_size):
+                    batch = order[start:start + batch_size]
+                    batch_losses.append(self.train_step(users[batch], anime[batch], ratings[batch], lr))
+
+                elapsed = time.perf_counter() - start_time
+                val_loss = self.evaluate(val_users, val_anime, val_ratings)
+
+                history["loss"].append(float(np.mean(batch_losses)))
+                history["val_loss"].append(val_loss)
+                history["samples_per_sec"].append(len(ratings) / max(elapsed, 1e-9))
+                logger.info(
+                    f"Epoch {epoch + 1}/{epochs}: loss={history['loss'][-1]:.4f} val_loss={val_loss:.4f} "
+                    f"lr={lr:.2e} {history['samples_per_sec'][-1]:,.0f} samples/sec"
+                )
+                if experiment is not None:
+                    experiment.log_metric("samples_per_sec", history["samples_per_sec"][-1], step=epoch)
+
+                if val_loss < best_loss:
+                    best_loss, best_state, wait = val_loss, self.get_state(), 0
+                else:
+                    wait += 1
+                    if wait >= patience:
+                        logger.info(f"Early stopping after epoch {epoch + 1}")
+                        break
+
+            if best_state is not None:
+                self.set_state(best_state)
+            return history
+
+        except Exception as e:
+            raise CustomException("NumPy model training failed", e)
+
+    # ------------------------------------------------------------------
+    # Parameters
+    # ------------------------------------------------------------------
+    def get_state(self):
+        state = {name: np.array(getattr(self, name)) for name in HEAD}
+        state["user_embedding"] = self.user_embedding.copy()
+        state["anime_embedding"] = self.anime_embedding.copy()
+        return state
+
+    def set_state(self, state):
+        self.user_embedding = np.array(state["user_embedding"], dtype=np.float32)
+        self.anime_embedding = np.array(state["anime_embedding"], dtype=np.float32)
+        for name in HEAD:
+            setattr(self, name, np.float32(state[name]))
+
+    def head(self):
+        return {name: float(getattr(self, name)) for name in HEAD}
+
+    def save(self, path):
+        np.savez(path, **self.get_state())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            state = {name: data[name] for name in data.files}
+        n_users, embedding_size = state["user_embedding"].shape
+        model = cls(n_users, len(state["anime_embedding"]), embedding_size)
+        model.set_state(state)
+        return model
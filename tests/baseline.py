@@ -0,0 +1,27 @@
+"""
+The baseline pandas implementations the optimized code paths must agree with.
+"""
+import numpy as np
+import pandas as pd
+
+
+def user_preferences(rating_df, user_id):
+    """anime_ids get_user_preferences selected: rated at or above the user's 75th percentile."""
+    user_df = rating_df[rating_df.user_id == user_id]
+    ratings = user_df["rating"].dropna()
+    if ratings.empty:
+        return np.array([], dtype=np.int64)
+
+    threshold = np.percentile(ratings, 75)
+    return user_df[user_df.rating >= threshold].anime_id.to_numpy()
+
+
+
+def synopsis(synopsis_df, anime):
+    """getSynopsis: text of the first row matching an id (int) or a name (str); None when absent."""
+    id_col = "MAL_ID" if "MAL_ID" in synopsis_df.columns else "anime_id"
+    text_col = "sypnopsis" if "sypnopsis" in synopsis_df.columns else "synopsis"
+    row = synopsis_df[synopsis_df["Name"] == anime] if isinstance(anime, str) else synopsis_df[synopsis_df[id_col] == anime]
+    if row.empty or pd.isna(row[text_col].values[0]):
+        return None
+    return row[text_col].values[0]
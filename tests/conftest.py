@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_data import anime_table, animelist_table, generate
+from config.paths_config import *
+from src.data_processing import DataProcessor
+from src.numpy_trainer import NumpyRecommenderNet, save_head
+from utils.artifact_store import ArtifactStore
+from utils.columnar import read_table
+from utils.common_functions import save_array
+from utils.id_encoder import IdEncoder
+from utils.neighbour_table import NeighbourTable
+
+
+@pytest.fixture(scope="session")
+def rating_frame():
+    """Small user_id / anime_id / rating frame: scaled ratings with ties and repeated (user, anime) pairs."""
+    rng = np.random.default_rng(7)
+    anime = anime_table(80, rng)
+    df = animelist_table(60, anime["MAL_ID"].to_numpy(), anime["Members"].to_numpy().astype(np.float64), 25, rng)
+    df = df[["user_id", "anime_id", "rating"]].copy()
+    df["rating"] = df["rating"] / 10.0
+    return df.sample(frac=1, random_state=0).reset_index(drop=True)
+
+
+def _serving_paths(processed_dir, weights_dir):
+    def processed(path):
+        return os.path.join(processed_dir, os.path.relpath(path, PROCESSED_DIR))
+
+    def weights(path):
+        return os.path.join(weights_dir, os.path.relpath(path, WEIGHTS_DIR))
+
+    return {
+        "user_weights": weights(USER_WEIGHTS_NPY),
+        "anime_weights": weights(ANIME_WEIGHTS_NPY),
+        "user_ann_index": weights(USER_ANN_INDEX_PATH),
+        "anime_ann_index": weights(ANIME_ANN_INDEX_PATH),
+        "anime_neighbours": weights(ANIME_NEIGHBOURS_PATH),
+        "model_head": weights(MODEL_HEAD_PATH),
+        "user2user_encoded": processed(USER_ENCODER),
+        "user2user_decoded": processed(USER_ENCODER),
+        "anime2anime_encoded": processed(ANIME_ENCODER),
+        "anime2anime_decoded": processed(ANIME_ENCODER),
+        "rating_df": processed(RATING_TABLE),
+        "rating_index": processed(RATING_INDEX),
+        "anime_df": processed(ANIME_TABLE),
+        "synopsis_df": processed(SYNOPSIS_TABLE),
+        "synopsis_store": processed(SYNOPSIS_STORE),
+    }
+
+
+@pytest.fixture(scope="session")
+def serving_paths(tmp_path_factory):
+    """
+    Artifact paths of a small trained tree: synthetic raw CSVs through
+    DataProcessor, one NumPy training epoch, normalized embeddings, the
+    model head and the anime neighbour table.
+    """
+    workdir = tmp_path_factory.mktemp("serving")
+    raw = generate(str(workdir / "raw"), n_users=150, n_anime=120, ratings_per_user=40, seed=3)
+    processed_dir, weights_dir = str(workdir / "processed"), str(workdir / "weights")
+
+    DataProcessor(raw["animelist"], processed_dir, anime_file=raw["anime"], synopsis_file=raw["synopsis"]).run(
+        min_rating=20, test_size=200
+    )
+    paths = _serving_paths(processed_dir, weights_dir)
+
+    train = read_table(os.path.join(processed_dir, "train"), ["user", "anime", "rating"])
+    test = read_table(os.path.join(processed_dir, "test"), ["user", "anime", "rating"])
+    model = NumpyRecommenderNet(len(IdEncoder.load(paths["user2user_encoded"])),
+                                len(IdEncoder.load(paths["anime2anime_encoded"])), embedding_size=16)
+    model.fit([train["user"], train["anime"]], train["rating"], ([test["user"], test["anime"]], test["rating"]),
+              batch_size=512, epochs=1, learning_rate=lambda epoch: 1e-2, patience=1)
+
+    # As ModelTraining.save_embeddings (src/model_training needs comet_ml at import)
+    def normalize_weights(weights):
+        return weights / np.linalg.norm(weights, axis=1, keepdims=True)
+
+    os.makedirs(weights_dir)
+    anime_weights = normalize_weights(model.anime_embedding).astype(np.float32)
+    save_array(paths["user_weights"], normalize_weights(model.user_embedding).astype(np.float32))
+    save_array(paths["anime_weights"], anime_weights)
+    save_head(paths["model_head"], model.head())
+    NeighbourTable.build(anime_weights, k=20).save(paths["anime_neighbours"])
+    return paths
+
+
+@pytest.fixture
+def serving_store(serving_paths):
+    return ArtifactStore(paths=serving_paths)
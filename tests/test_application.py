@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import application
+from utils.artifact_store import ArtifactStore
+from utils.id_encoder import IdEncoder
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture
+def client(serving_paths, monkeypatch):
+    monkeypatch.setattr(application, "artifact_store", ArtifactStore(paths=serving_paths))
+    monkeypatch.setattr(application, "result_cache", ResultCache())
+    return application.app.test_client()
+
+
+@pytest.fixture
+def user_ids(serving_paths):
+    return IdEncoder.load(serving_paths["user2user_encoded"]).ids[:2].tolist()
+
+
+def test_unknown_user_skips_the_batcher_and_the_cache(client):
+    items = application.recommendation_batcher.stats()["items"]
+    response = client.get("/api/recommendations?user_id=-5")
+
+    assert response.status_code == 404 and response.get_json() == {"error": "User not found: -5"}
+    assert application.recommendation_batcher.stats()["items"] == items
+    assert application.result_cache.stats()["entries"] == 0
+
+
+def test_known_user_is_scored(client, user_ids):
+    response = client.get(f"/api/recommendations?user_id={user_ids[0]}")
+    assert response.status_code == 200 and response.get_json()["user_id"] == user_ids[0]
+    assert application.result_cache.stats()["entries"] == 1
+
+
+def test_bulk_scores_only_known_users(client, user_ids):
+    response = client.post("/api/recommendations/bulk", json={"user_ids": [user_ids[0], -5, user_ids[1]]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result["user_id"] for result in body["results"]] == user_ids
+    assert body["unknown_user_ids"] == [-5]
+    assert application.result_cache.stats()["entries"] == 2
+
+
+def test_missing_artifacts_return_json_errors(client, serving_paths, tmp_path, monkeypatch):
+    missing = {name: str(tmp_path / "missing" / name) for name in serving_paths}
+    monkeypatch.setattr(application, "artifact_store", ArtifactStore(paths=missing))
+
+    response = client.get("/api/recommendations?user_id=5")
+    assert response.status_code == 500 and "error" in response.get_json()
+    response = client.post("/api/recommendations/bulk", json={"user_ids": [5]})
+    assert response.status_code == 500 and "error" in response.get_json()
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from utils.artifact_store import ArtifactStore, artifact_update
+from utils.common_functions import save_array
+
+
+@pytest.fixture
+def artifact_tree(serving_paths, tmp_path):
+    """Private copy of the serving artifacts, so tests can rewrite them."""
+    root = os.path.commonpath(list(serving_paths.values()))
+    shutil.copytree(root, tmp_path / "tree")
+    return {name: os.path.join(tmp_path / "tree", os.path.relpath(path, root)) for name, path in serving_paths.items()}
+
+
+@pytest.fixture
+def store(artifact_tree, tmp_path):
+    return ArtifactStore(paths=artifact_tree, version_check_interval=0, update_marker=str(tmp_path / "updating"))
+
+
+def test_snapshot_keeps_its_version_across_refresh(store, artifact_tree):
+    before = store.snapshot()
+    weights = np.array(before.user_weights)
+    assert store.snapshot() is before
+
+    save_array(artifact_tree["user_weights"], -weights)
+    assert not store.refresh()  # first sighting of the new fingerprint
+    assert store.refresh()
+
+    after = store.snapshot()
+    assert after is not before and after.version != before.version
+    assert np.array_equal(before.user_weights, weights)
+    assert np.array_equal(after.user_weights, -weights)
+    # Swapped in complete: serving artifacts were loaded before the switch
+    assert {kind for kind, _ in after._generation.cache} >= {"array", "encoder", "catalog", "rating_index"}
+    assert not before.refresh() and before.snapshot() is before
+
+
+def test_refresh_waits_for_the_update_marker(store, artifact_tree):
+    before = store.snapshot()
+    with artifact_update(store.update_marker):
+        save_array(artifact_tree["user_weights"], -np.array(before.user_weights))
+        assert not store.refresh() and not store.refresh()
+        assert store.snapshot() is before
+
+    assert not os.path.exists(store.update_marker)
+    assert not store.refresh()
+    assert store.refresh()
+    assert store.snapshot() is not before
@@ -0,0 +1,107 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.custom_exception import CustomException
+from src.data_ingestion import MANIFEST_FILE, DataIngestion
+from utils.local_bucket import LocalBlob, LocalBucketClient
+
+CHUNK = 1024
+FILES = {"animelist.csv": 5 * CHUNK + 100, "anime.csv": 3 * CHUNK, "anime-with-synopsis.csv": 2 * CHUNK + 7}
+
+
+@pytest.fixture
+def bucket(tmp_path):
+    directory = tmp_path / "bucket"
+    directory.mkdir()
+    rng = np.random.default_rng(0)
+    for name, size in FILES.items():
+        (directory / name).write_bytes(rng.integers(0, 256, size, dtype=np.uint8).tobytes())
+    return directory
+
+
+@pytest.fixture
+def ingestion(bucket, tmp_path):
+    config = {"data_ingestion": {
+        "bucket_name": "test-bucket",
+        "bucket_file_names": list(FILES),
+        "chunk_size_mb": CHUNK / 2**20,
+        "max_workers": 4,
+    }}
+    return DataIngestion(config, client=LocalBucketClient(str(bucket)), raw_dir=str(tmp_path / "raw"))
+
+
+def _downloaded(ingestion, bucket):
+    """Which bucket files sit byte-identical under their final name in raw_dir."""
+    raw_dir = Path(ingestion.raw_dir)
+    return {name: (raw_dir / name).exists() and (raw_dir / name).read_bytes() == (bucket / name).read_bytes()
+            for name in FILES}
+
+
+def _leftovers(ingestion):
+    return sorted(name for name in os.listdir(ingestion.raw_dir) if ".part" in name)
+
+
+def test_download_then_skip(ingestion, bucket):
+    report = ingestion.download_csv_from_gcp()
+    assert set(report["files"].values()) == {"downloaded"}
+    assert report["downloaded_bytes"] == sum(FILES.values())
+    assert all(_downloaded(ingestion, bucket).values())
+    assert _leftovers(ingestion) == []
+
+    report = ingestion.download_csv_from_gcp()
+    assert set(report["files"].values()) == {"skipped"}
+    assert report["downloaded_bytes"] == 0
+
+
+def test_failed_chunks_resume(ingestion, bucket, monkeypatch):
+    download = LocalBlob.download_as_bytes
+
+    def failing(blob, start=None, end=None):
+        if blob.name == "animelist.csv" and start >= 3 * CHUNK:
+            raise ConnectionError("connection reset")
+        return download(blob, start, end)
+
+    monkeypatch.setattr(LocalBlob, "download_as_bytes", failing)
+    with pytest.raises(CustomException):
+        ingestion.download_csv_from_gcp()
+
+    # Nothing half-written under the final name; finished chunks are recorded
+    assert not os.path.exists(os.path.join(ingestion.raw_dir, "animelist.csv"))
+    with open(os.path.join(ingestion.raw_dir, "animelist.csv.part.json")) as f:
+        assert sorted(json.load(f)["done"]) == [0, 1, 2]
+
+    monkeypatch.setattr(LocalBlob, "download_as_bytes", download)
+    report = ingestion.download_csv_from_gcp()
+    assert report["files"] == {"animelist.csv": "resumed", "anime.csv": "skipped", "anime-with-synopsis.csv": "skipped"}
+    assert report["downloaded_bytes"] == FILES["animelist.csv"] - 3 * CHUNK
+    assert all(_downloaded(ingestion, bucket).values())
+    assert _leftovers(ingestion) == []
+
+
+def test_checksum_mismatch_keeps_the_other_files(ingestion, bucket, monkeypatch):
+    reload = LocalBlob.reload
+
+    def wrong_md5(blob):
+        reload(blob)
+        if blob.name == "anime.csv":
+            blob.md5_hash = "AAAAAAAAAAAAAAAAAAAAAA=="
+
+    monkeypatch.setattr(LocalBlob, "reload", wrong_md5)
+    with pytest.raises(CustomException):
+        ingestion.download_csv_from_gcp()
+
+    with open(ingestion.manifest_path) as f:
+        assert sorted(name for name in json.load(f) if not name.startswith("_")) == [
+            "anime-with-synopsis.csv", "animelist.csv"]
+    assert _downloaded(ingestion, bucket) == {"animelist.csv": True, "anime.csv": False, "anime-with-synopsis.csv": True}
+    assert not os.path.exists(os.path.join(ingestion.raw_dir, "anime.csv"))
+    assert _leftovers(ingestion) == []  # the mismatched download is discarded, not resumed
+
+    monkeypatch.setattr(LocalBlob, "reload", reload)
+    report = ingestion.download_csv_from_gcp()
+    assert report["files"] == {"animelist.csv": "skipped", "anime.csv": "downloaded", "anime-with-synopsis.csv": "skipped"}
+    assert all(_downloaded(ingestion, bucket).values())
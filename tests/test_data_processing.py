@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processing import DataProcessor
+
+USECOLS = ["user_id", "anime_id", "rating"]
+
+
+@pytest.fixture
+def ratings_csv(rating_frame, tmp_path):
+    """Ratings with fractional values and ids beyond int32, in file order mixing users across chunks."""
+    df = rating_frame.copy()
+    df["user_id"] = df["user_id"] + 3 * 2**31
+    df["anime_id"] = df["anime_id"] * 7
+    df["rating"] = df["rating"] * 9.7
+    path = tmp_path / "animelist.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _in_memory(path, output_dir, min_rating):
+    processor = DataProcessor(path, output_dir)
+    processor.load_data(usecols=USECOLS)
+    processor.filter_users(min_rating)
+    processor.scale_ratings()
+    processor.encode_data()
+    return processor
+
+
+def test_streaming_matches_in_memory(ratings_csv, tmp_path):
+    expected = _in_memory(ratings_csv, str(tmp_path / "memory"), min_rating=15)
+
+    for chunksize in (37, 500, 10**6):
+        streamed = DataProcessor(ratings_csv, str(tmp_path / "stream"), chunksize=chunksize)
+        streamed.stream_ratings(USECOLS, min_rating=15)
+
+        pd.testing.assert_frame_equal(
+            streamed.rating_df.reset_index(drop=True),
+            expected.rating_df[["user_id", "anime_id", "rating", "user", "anime"]].reset_index(drop=True),
+        )
+        assert streamed.rating_scale == expected.rating_scale
+        assert streamed.user2user_encoded.ids.tolist() == expected.user2user_encoded.ids.tolist()
+        assert streamed.anime2anime_encoded.ids.tolist() == expected.anime2anime_encoded.ids.tolist()
+
+
+def test_scan_matches_groupby(ratings_csv, tmp_path):
+    df = pd.read_csv(ratings_csv)
+    counts, rating_min, rating_max, dtypes = DataProcessor(ratings_csv, str(tmp_path), chunksize=50).scan_ratings(USECOLS)
+
+    grouped = df.groupby("user_id")["rating"]
+    pd.testing.assert_series_equal(counts.sort_index(), grouped.size().astype(np.int64), check_names=False)
+    pd.testing.assert_series_equal(rating_min.sort_index(), grouped.min(), check_names=False)
+    pd.testing.assert_series_equal(rating_max.sort_index(), grouped.max(), check_names=False)
+    assert dtypes == {"user_id": np.int64, "anime_id": np.int64, "rating": np.float64}
@@ -0,0 +1,115 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.fold_in as fold_in
+from benchmarks.synthetic_data import generate
+from src.fold_in import FoldIn
+from utils.artifact_store import ArtifactStore, artifact_update
+from utils.columnar import read_table
+from utils.helpers import find_similar_users
+from utils.id_encoder import IdEncoder
+from utils.rating_index import RatingIndex
+from utils.synopsis_store import SynopsisStore
+
+
+@pytest.fixture
+def raw_anime(tmp_path, monkeypatch):
+    """Synthetic raw CSVs, with FoldIn's processed directory pointed at an empty one."""
+    raw = generate(str(tmp_path / "raw"), n_users=5, n_anime=30, ratings_per_user=5, seed=1)
+    processed = tmp_path / "processed"
+    monkeypatch.setattr(fold_in, "PROCESSED_DIR", str(processed))
+    monkeypatch.setattr(fold_in, "ANIME_TABLE", str(processed / "anime_df"))
+    monkeypatch.setattr(fold_in, "ANIME_CSV", raw["anime"])
+    monkeypatch.setattr(fold_in, "ANIMESYNOPSIS_CSV", raw["synopsis"])
+    return pd.read_csv(raw["anime"])["MAL_ID"].to_numpy(), processed
+
+
+def _fold_in(trained_ids, new_ids):
+    fold = FoldIn("new_ratings.csv", fit_new_anime=True)
+    fold.anime_encoder = IdEncoder.from_ids(np.concatenate([trained_ids, new_ids]))
+    fold.new_anime_codes = np.arange(len(trained_ids), len(fold.anime_encoder))
+    return fold
+
+
+def test_new_anime_reach_the_catalog_and_synopses(raw_anime):
+    ids, processed = raw_anime
+    _fold_in(ids[:20], ids[20:]).refresh_metadata()
+
+    catalog_ids = read_table(str(processed / "anime_df"), ["anime_id"])["anime_id"]
+    assert set(ids[20:]) <= set(catalog_ids.tolist())
+    synopses = SynopsisStore.load(str(processed / "synopsis_store"))
+    assert all(synopses.get(int(anime_id)) is not None for anime_id in ids[20:])
+
+
+def test_anime_missing_from_the_csv_stay_embedding_only(raw_anime, caplog):
+    ids, processed = raw_anime
+    _fold_in(ids, np.array([10**7])).refresh_metadata()
+
+    assert 10**7 not in read_table(str(processed / "anime_df"), ["anime_id"])["anime_id"]
+    assert "embedding-only" in caplog.text
+
+
+@pytest.fixture
+def trained_tree(serving_paths, tmp_path, monkeypatch):
+    """Private copy of the serving artifacts, with FoldIn's paths pointed at it."""
+    root = os.path.commonpath(list(serving_paths.values()))
+    shutil.copytree(root, tmp_path / "tree")
+    paths = {name: os.path.join(tmp_path / "tree", os.path.relpath(path, root)) for name, path in serving_paths.items()}
+
+    for name, key in [("USER_ENCODER", "user2user_encoded"), ("ANIME_ENCODER", "anime2anime_encoded"),
+                      ("USER_WEIGHTS_NPY", "user_weights"), ("ANIME_WEIGHTS_NPY", "anime_weights"),
+                      ("RATING_INDEX", "rating_index"), ("MODEL_HEAD_PATH", "model_head"),
+                      ("USER_ANN_INDEX_PATH", "user_ann_index"), ("ANIME_ANN_INDEX_PATH", "anime_ann_index"),
+                      ("ANIME_NEIGHBOURS_PATH", "anime_neighbours")]:
+        monkeypatch.setattr(fold_in, name, paths[key])
+    monkeypatch.setattr(fold_in, "RATING_SCALE", os.path.join(os.path.dirname(paths["rating_index"]), "rating_scale.json"))
+    monkeypatch.setattr(fold_in, "SERVING_BUNDLE_PATH", str(tmp_path / "no_bundle.bin"))
+    monkeypatch.setattr(fold_in, "artifact_update", lambda: artifact_update(str(tmp_path / "updating")))
+    return paths
+
+
+def test_fold_in_new_and_changed_users(trained_tree, tmp_path):
+    users = IdEncoder.load(trained_tree["user2user_encoded"], mmap=False)
+    anime = IdEncoder.load(trained_tree["anime2anime_encoded"], mmap=False)
+    weights = np.load(trained_tree["user_weights"])
+    rating_index = RatingIndex.load(trained_tree["rating_index"])
+
+    # A new user, and an existing one rating anime they have not rated yet
+    new_user, changed_user = int(users.ids.max()) + 1, int(users.ids[0])
+    rated = set(rating_index.take(rating_index.rows([changed_user])).anime_ids.tolist())
+    unrated = [int(anime_id) for anime_id in anime.ids if anime_id not in rated][:3]
+    ratings = pd.DataFrame({
+        "user_id": [new_user] * 5 + [changed_user] * len(unrated),
+        "anime_id": anime.ids[:5].tolist() + unrated,
+        "rating": [9, 8, 7, 3, 10] + [6] * len(unrated),
+    })
+    ratings.to_csv(tmp_path / "new_ratings.csv", index=False)
+
+    FoldIn(str(tmp_path / "new_ratings.csv"), fit_new_anime=False).run()
+
+    folded_users = IdEncoder.load(trained_tree["user2user_encoded"], mmap=False)
+    folded = np.load(trained_tree["user_weights"])
+    n_old = len(users)
+    assert folded_users.ids[:n_old].tolist() == users.ids.tolist()
+    assert folded_users.ids[n_old:].tolist() == [new_user]
+    assert folded.shape == (n_old + 1, weights.shape[1])
+
+    changed_rows = [n_old, users.encode_many([changed_user])[0]]
+    assert not np.isnan(folded[changed_rows]).any()
+    assert np.allclose(np.linalg.norm(folded[changed_rows], axis=1), 1.0, atol=1e-5)
+    assert not np.allclose(folded[changed_rows[1]], weights[changed_rows[1]])
+    untouched = np.setdiff1d(np.arange(n_old), changed_rows)
+    assert np.array_equal(folded[untouched], weights[untouched])
+
+    folded_index = RatingIndex.load(trained_tree["rating_index"])
+    assert sorted(folded_index.take(folded_index.rows([new_user])).anime_ids.tolist()) == sorted(anime.ids[:5].tolist())
+
+    store = ArtifactStore(paths=trained_tree)
+    similar = find_similar_users(new_user, trained_tree["user_weights"], trained_tree["user2user_encoded"],
+                                 trained_tree["user2user_decoded"], n=5, store=store)
+    assert len(similar) >= 4 and new_user not in similar["similar_users"].tolist()
+    assert set(similar["similar_users"]) <= set(users.ids.tolist())
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from utils.id_encoder import IdEncoder, decode_many, encode_many
+
+
+def _baseline_dicts(values):
+    """The user2user_encoded / user2user_decoded dicts DataProcessor used to pickle."""
+    ids = pd.Series(values).unique().tolist()
+    return {x: i for i, x in enumerate(ids)}, {i: x for i, x in enumerate(ids)}
+
+
+def test_factorize_matches_unique_and_map():
+    values = np.random.default_rng(0).choice([5, 17, 3, 900, 42, 8], 200)
+    encoded, decoded = _baseline_dicts(values)
+
+    codes, encoder = IdEncoder.factorize(values)
+
+    assert codes.tolist() == [encoded[x] for x in values]
+    assert dict(encoder.items()) == encoded
+    assert dict(encoder.decoder.items()) == decoded
+
+
+def test_factorize_sparse_ids_takes_the_hashing_path():
+    values = np.array([10**12, 7, 10**12, -3, 7])
+    codes, encoder = IdEncoder.factorize(values)
+    assert codes.tolist() == [0, 1, 0, 2, 1]
+    assert encoder.ids.tolist() == [10**12, 7, -3]
+
+
+def test_round_trip_through_save_and_load(tmp_path):
+    ids = np.random.default_rng(1).choice(10**6, 300, replace=False)
+    encoder = IdEncoder.from_ids(ids)
+    encoder.save(str(tmp_path / "encoder.npy"))
+
+    for mmap in (True, False):
+        loaded = IdEncoder.load(str(tmp_path / "encoder.npy"), mmap=mmap)
+        codes = encode_many(loaded, ids)
+        assert codes.tolist() == list(range(len(ids)))
+        assert decode_many(loaded.decoder, codes).tolist() == ids.tolist()
+        assert loaded.get(int(ids[42])) == 42 and loaded.decoder[42] == ids[42]
+
+
+def test_unknown_ids_and_codes():
+    encoder = IdEncoder.from_ids([30, 10, 20])
+
+    assert encode_many(encoder, [10, 15, 40, 30]).tolist() == [1, -1, -1, 0]
+    assert decode_many(encoder.decoder, [2, 3, -1]).tolist() == [20, -1, -1]
+    assert encoder.get(15) is None and encoder.get("x") is None and 15 not in encoder
+    assert encoder.decoder.get(3) is None
+
+    empty = IdEncoder.from_ids([])
+    assert encode_many(empty, [1]).tolist() == [-1]
+    assert decode_many(empty.decoder, [0]).tolist() == [-1]
+
+
+def test_helpers_accept_legacy_dicts():
+    encoded, decoded = _baseline_dicts([30, 10, 20])
+    assert encode_many(encoded, [10, 15]).tolist() == [1, -1]
+    assert decode_many(decoded, [2, 5]).tolist() == [20, -1]
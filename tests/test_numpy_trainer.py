@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from config.paths_config import CONFIG_PATH
+from src.base_model import BaseModel
+from src.numpy_trainer import NumpyRecommenderNet
+
+N_USERS, N_ANIME, BATCH = 300, 280, 256
+LR = 1e-2
+
+
+@pytest.fixture
+def models():
+    """A Keras RecommenderNet and a NumpyRecommenderNet holding the same weights."""
+    keras_model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(n_users=N_USERS, n_anime=N_ANIME)
+    keras_model.optimizer.learning_rate = LR
+    embedding_size = keras_model.get_layer("user_embedding").output_dim
+
+    numpy_model = NumpyRecommenderNet(N_USERS, N_ANIME, embedding_size, seed=5)
+    numpy_model.bn_moving_mean, numpy_model.bn_moving_var = np.float32(0.1), np.float32(0.8)
+    _copy_weights(numpy_model, keras_model)
+    return keras_model, numpy_model
+
+
+def _layer(keras_model, class_name):
+    # Dense and BatchNormalization are unnamed, so their names change with every model built
+    return next(layer for layer in keras_model.layers if layer.__class__.__name__ == class_name)
+
+
+def _copy_weights(numpy_model, keras_model):
+    keras_model.get_layer("user_embedding").set_weights([numpy_model.user_embedding])
+    keras_model.get_layer("anime_embedding").set_weights([numpy_model.anime_embedding])
+    _layer(keras_model, "Dense").set_weights([np.full((1, 1), numpy_model.dense_kernel),
+                                              np.full(1, numpy_model.dense_bias)])
+    _layer(keras_model, "BatchNormalization").set_weights([
+        np.full(1, getattr(numpy_model, name), dtype=np.float32)
+        for name in ("bn_gamma", "bn_beta", "bn_moving_mean", "bn_moving_var")
+    ])
+
+
+def _batch(seed=0):
+    """
+    Batch without repeated users or anime: Keras squares the per-sample
+    gradient slices before summing repeats into Adam's second moment, so
+    only batches of distinct rows give the same update as the NumPy trainer.
+    """
+    rng = np.random.default_rng(seed)
+    users = rng.permutation(N_USERS)[:BATCH].astype(np.int32)
+    anime = rng.permutation(N_ANIME)[:BATCH].astype(np.int32)
+    return users, anime, rng.random(BATCH).astype(np.float32)
+
+
+def test_predict_matches_keras(models):
+    keras_model, numpy_model = models
+    users, anime, _ = _batch()
+
+    expected = keras_model.predict([users, anime], batch_size=BATCH, verbose=0).ravel()
+    np.testing.assert_allclose(numpy_model.predict(users, anime), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_train_step_matches_keras(models):
+    keras_model, numpy_model = models
+    users, anime, ratings = _batch()
+
+    keras_loss = keras_model.train_on_batch([users, anime], ratings, return_dict=True)["loss"]
+    numpy_loss = numpy_model.train_step(users, anime, ratings, LR)
+
+    assert numpy_loss == pytest.approx(float(keras_loss), rel=1e-5)
+    # Rows outside the batch have a zero gradient, so dense Adam leaves them unchanged too
+    np.testing.assert_allclose(numpy_model.user_embedding, keras_model.get_layer("user_embedding").get_weights()[0],
+                               rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(numpy_model.anime_embedding, keras_model.get_layer("anime_embedding").get_weights()[0],
+                               rtol=1e-4, atol=1e-6)
+
+    # dense_bias is left out: BatchNorm cancels it, so its gradient is round-off
+    # that Adam normalizes to a step of either sign in both implementations
+    dense = _layer(keras_model, "Dense").get_weights()
+    batch_norm = _layer(keras_model, "BatchNormalization").get_weights()
+    expected = dict(zip(("dense_kernel", "bn_gamma", "bn_beta", "bn_moving_mean", "bn_moving_var"),
+                        [w.item() for w in (dense[0], *batch_norm)]))
+    head = numpy_model.head()
+    assert {name: head[name] for name in expected} == pytest.approx(expected, rel=1e-5, abs=1e-7)
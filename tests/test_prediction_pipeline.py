@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from pipeline.prediction_pipeline import (
+    cached_recommendation,
+    cached_recommendation_batch,
+    hybrid_recommendation,
+    hybrid_recommendation_batch,
+)
+from utils.helpers import find_similar_users
+from utils.result_cache import ResultCache
+
+UNKNOWN_USER = 10**9
+
+
+def _single(user_id, store, **kwargs):
+    try:
+        return hybrid_recommendation(user_id, store=store, **kwargs)
+    except ValueError:
+        return []
+
+
+def _user_ids(store):
+    return [int(user_id) for user_id in store.user2user_encoded.ids] + [UNKNOWN_USER]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"user_weight": 0.8, "content_weight": 0.2},
+    {"rerank_weight": 0.3},
+])
+def test_batch_matches_single(serving_store, kwargs):
+    user_ids = _user_ids(serving_store)
+
+    batch = hybrid_recommendation_batch(user_ids, block_size=16, store=serving_store, **kwargs)
+
+    assert len(batch) == len(user_ids)
+    assert sum(bool(recommendations) for recommendations in batch) > len(user_ids) // 2
+    assert batch == [_single(user_id, serving_store, **kwargs) for user_id in user_ids]
+
+
+@pytest.mark.parametrize("n_similar", [5, 25])  # 25 is deeper than the neighbour table: live content scoring
+def test_small_blocks_match_single(serving_store, n_similar):
+    user_ids = _user_ids(serving_store)[:40]
+    block_size = 3  # fewer than the users and than each block's seed anime
+
+    batch = hybrid_recommendation_batch(user_ids, block_size=block_size, store=serving_store, n_similar=n_similar)
+
+    assert any(batch)
+    assert batch == [_single(user_id, serving_store, n_similar=n_similar) for user_id in user_ids]
+
+
+def test_recommendations_exclude_watched_anime(serving_store):
+    catalog = serving_store.anime_catalog
+    for user_id in _user_ids(serving_store)[:40]:
+        positions = catalog.positions(serving_store.rating_index.user_ratings(user_id)[0])
+        rated = set(catalog.take(positions[positions >= 0], ["eng_version"])["eng_version"])
+        assert not rated & set(_single(user_id, serving_store))
+
+
+def test_single_and_batch_share_the_result_cache(serving_store):
+    user_ids = _user_ids(serving_store)[:29] + [UNKNOWN_USER]
+    cache = ResultCache()
+
+    batch = cached_recommendation_batch(user_ids, cache=cache, store=serving_store)
+    stored = cache.stats()["entries"]
+    assert stored == len(user_ids) - 1
+
+    # Every known user is now a hit, with the batch's answer
+    for user_id, recommendations in zip(user_ids[:-1], batch):
+        assert cached_recommendation(user_id, cache=cache, store=serving_store) == recommendations
+    assert cache.stats()["entries"] == stored
+
+
+def test_similar_users_exclude_the_query(serving_store):
+    paths = serving_store.paths
+    for user_id in _user_ids(serving_store)[:20]:
+        similar = find_similar_users(user_id, paths["user_weights"], paths["user2user_encoded"],
+                                     paths["user2user_decoded"], store=serving_store)
+        assert len(similar) == 10
+        assert user_id not in similar["similar_users"].tolist()
+        assert np.all(np.diff(similar["similarity"].to_numpy()) <= 0)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from utils.quantization import QuantizedMatrix, export_quantized, load_quantized, quantize_int8
+
+
+def _weights(rows=3000, dim=32, seed=0):
+    weights = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return weights / np.linalg.norm(weights, axis=1, keepdims=True)
+
+
+def test_int8_scores_match_the_dequantized_matrix():
+    weights = _weights()
+    values, scale = quantize_int8(weights)
+    matrix = QuantizedMatrix(values, scale, block_size=1000)
+
+    dequantized = values.astype(np.float32) * scale[:, None]
+    assert np.allclose(matrix[[3, 7]], dequantized[[3, 7]])
+    assert np.allclose(matrix @ weights[5], dequantized @ weights[5], atol=1e-5)
+    assert np.abs(matrix @ weights[5] - weights @ weights[5]).max() < 0.02
+
+
+def test_export_and_load(tmp_path):
+    weights = _weights()
+    path = str(tmp_path / "user_weights.npy")
+    assert export_quantized(weights, path, ["int8"]) == [str(tmp_path / "user_weights_int8.npy"),
+                                                           str(tmp_path / "user_weights_int8_scale.npy")]
+
+    export_quantized(weights, path)
+    float16 = load_quantized(path, "float16")
+    assert float16.dtype == np.float32 and np.allclose(float16, weights, atol=1e-3)
+    assert isinstance(load_quantized(path, "int8"), QuantizedMatrix)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from tests.baseline import user_preferences
+from utils.rating_index import RatingIndex
+
+
+def test_preferences_match_pandas_percentile(rating_frame):
+    index = RatingIndex.from_frame(rating_frame)
+
+    for user_id in rating_frame["user_id"].unique():
+        expected = user_preferences(rating_frame, user_id)
+        assert sorted(index.preferences(user_id).tolist()) == sorted(expected.tolist())
+
+
+def test_preferences_are_a_prefix_of_the_sorted_slice(rating_frame):
+    index = RatingIndex.from_frame(rating_frame)
+
+    for user_id in rating_frame["user_id"].unique():
+        anime_ids, ratings = index.user_ratings(user_id)
+        assert np.all(np.diff(ratings) <= 0)
+        assert np.array_equal(index.preferences(user_id), anime_ids[:len(index.preferences(user_id))])
+
+
+def test_preferences_many_matches_single_lookups(rating_frame):
+    index = RatingIndex.from_frame(rating_frame)
+    user_ids = list(rating_frame["user_id"].unique()[:20]) + [10**9]
+
+    owner, anime_ids = index.preferences_many(user_ids)
+    for position, user_id in enumerate(user_ids):
+        assert np.array_equal(anime_ids[owner == position], index.preferences(user_id))
+
+
+def test_save_load_round_trip(rating_frame, tmp_path):
+    index = RatingIndex.from_frame(rating_frame)
+    index.save(tmp_path / "rating_index.npz")
+    loaded = RatingIndex.load(tmp_path / "rating_index.npz")
+
+    for name in RatingIndex.FIELDS:
+        assert np.array_equal(getattr(loaded, name), getattr(index, name))
+
+
+def test_missing_users_and_empty_index():
+    index = RatingIndex.from_frame(pd.DataFrame({"user_id": [3, 3, 8], "anime_id": [1, 2, 1], "rating": [0.5, 0.2, 1.0]}))
+    assert index.rows([1, 3, 5, 8, 9]).tolist() == [-1, 0, -1, 1, -1]
+
+    empty = RatingIndex.from_frame(pd.DataFrame({"user_id": [], "anime_id": [], "rating": []}))
+    assert empty.rows([1, 2]).tolist() == [-1, -1]
+    assert empty.row(1) == -1
+    assert len(empty.preferences(1)) == 0
+
+
+def test_update_replaces_re_rated_pairs(rating_frame):
+    old, new = rating_frame.iloc[:1200], rating_frame.iloc[1200:1300].copy()
+    existing = old.iloc[[3, 17, 17]].assign(rating=[0.05, 0.15, 0.95])  # re-rated, pair repeated
+    fresh = pd.DataFrame({"user_id": [10**6, 10**6], "anime_id": [1, 1], "rating": [0.3, 0.6]})  # new user
+    new = pd.concat([new, existing, fresh], ignore_index=True)
+
+    updated = RatingIndex.from_frame(old).update(new)
+
+    # Reference: drop every earlier rating of a re-rated pair, keep the last new one
+    keys = ["user_id", "anime_id"]
+    latest = new.drop_duplicates(keys, keep="last")
+    re_rated = pd.MultiIndex.from_frame(old[keys]).isin(pd.MultiIndex.from_frame(latest[keys]))
+    expected = RatingIndex.from_frame(pd.concat([old[~re_rated], latest]))
+    for name in RatingIndex.FIELDS:
+        assert np.array_equal(getattr(updated, name), getattr(expected, name))
+
+    anime_ids, ratings = updated.user_ratings(existing["user_id"].iloc[1])
+    assert ratings[anime_ids == existing["anime_id"].iloc[1]].tolist() == [0.95]
+    assert updated.user_ratings(10**6)[1].tolist() == [0.6]
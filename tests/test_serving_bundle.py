@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pytest
+
+import utils.artifact_store as artifact_store
+from utils.artifact_store import ArtifactStore, default_paths
+from utils.common_functions import save_array
+from utils.serving_bundle import ServingBundle, build_serving_bundle, check_bundle_sources
+
+
+@pytest.fixture
+def bundle_path(serving_paths, tmp_path):
+    path = str(tmp_path / "bundle.bin")
+    build_serving_bundle(path, ArtifactStore(paths=serving_paths))
+    return path
+
+
+def test_default_paths_resolve_when_called(tmp_path, monkeypatch):
+    new, legacy = tmp_path / "user_weights.npy", tmp_path / "user_weights.pkl"
+    monkeypatch.setattr(artifact_store, "USER_WEIGHTS_NPY", str(new))
+    monkeypatch.setattr(artifact_store, "USER_WEIGHTS_PATH", str(legacy))
+
+    legacy.write_bytes(b"")
+    assert default_paths()["user_weights"] == str(legacy)
+    assert default_paths(legacy=False)["user_weights"] == str(new)
+
+    # Retraining writes the new format next to the old pickle
+    new.write_bytes(b"")
+    assert default_paths()["user_weights"] == str(new)
+
+
+def test_bundle_matches_its_sources(bundle_path, serving_paths):
+    check_bundle_sources(bundle_path, serving_paths)
+
+    bundle = ServingBundle.open(bundle_path, verify=True)
+    assert np.array_equal(bundle.array("user_weights"), np.load(serving_paths["user_weights"]))
+
+
+def test_bundle_from_other_files_is_rejected(bundle_path, serving_paths, tmp_path):
+    weights = np.load(serving_paths["user_weights"])
+    other = dict(serving_paths, user_weights=str(tmp_path / "user_weights.npy"))
+    save_array(other["user_weights"], weights[::-1].copy())
+
+    with pytest.raises(ValueError, match="user_weights"):
+        check_bundle_sources(bundle_path, other)
+    with pytest.raises(ValueError, match="predates this run"):
+        check_bundle_sources(bundle_path, serving_paths, since=time.time() + 60)
+
+
+def _flip_byte(path, position):
+    with open(path, "r+b") as f:
+        f.seek(position)
+        byte = f.read(1)
+        f.seek(position)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_checksums_catch_corruption(bundle_path):
+    bundle = ServingBundle.open(bundle_path, verify=True)
+    spec = bundle.header["arrays"]["synopsis_store/blob"]
+    data_position = bundle._data_start + spec["offset"] + spec["shape"][0] // 2
+    del bundle
+
+    _flip_byte(bundle_path, data_position)
+    ServingBundle.open(bundle_path)  # arrays are only checked on verify
+    with pytest.raises(ValueError, match="checksum mismatch for synopsis_store/blob"):
+        ServingBundle.open(bundle_path, verify=True)
+
+    _flip_byte(bundle_path, 40)  # inside the JSON header
+    with pytest.raises(ValueError, match="header checksum mismatch"):
+        ServingBundle.open(bundle_path)
+
+
+def test_bundled_synopses_match_the_store(bundle_path, serving_store):
+    bundled = ServingBundle.open(bundle_path).synopsis_store()
+    anime_ids = serving_store.synopsis_df["MAL_ID"].tolist() + [10**9]
+    assert bundled.get_many(anime_ids) == serving_store.synopses.get_many(anime_ids)
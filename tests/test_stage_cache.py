@@ -0,0 +1,89 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate
+from src.data_processing import DataProcessor
+from utils.columnar import read_table
+from utils.stage_cache import StageCache
+
+RATING_STAGES = ["filter_users", "scale_ratings", "encode_data"]
+ALL_STAGES = RATING_STAGES + ["split_data", "process_anime_data"]
+
+
+@pytest.fixture
+def raw(tmp_path):
+    return generate(str(tmp_path / "raw"), n_users=60, n_anime=40, ratings_per_user=20, seed=5)
+
+
+def _run(raw, output_dir, **kwargs):
+    processor = DataProcessor(raw["animelist"], str(output_dir), anime_file=raw["anime"], synopsis_file=raw["synopsis"])
+    return processor.run(**{"min_rating": 5, "test_size": 50, **kwargs})
+
+
+def _cached_stages(output_dir):
+    directory = output_dir / "stage_cache"
+    return sorted(name for name in os.listdir(directory) if os.path.isdir(directory / name))
+
+
+def test_second_run_reuses_every_stage(raw, tmp_path):
+    output_dir = tmp_path / "processed"
+    assert _run(raw, output_dir) == {"reused": [], "computed": ALL_STAGES}
+    train = pd.DataFrame(read_table(str(output_dir / "train")))
+
+    assert _run(raw, output_dir) == {"reused": ALL_STAGES, "computed": []}
+    pd.testing.assert_frame_equal(pd.DataFrame(read_table(str(output_dir / "train"))), train)
+    # One copy of the ratings state, not one per rating stage
+    assert _cached_stages(output_dir) == ["encode_data", "process_anime_data", "split_data"]
+
+    assert _run(raw, output_dir, force=True) == {"reused": [], "computed": ALL_STAGES}
+
+
+def test_changed_params_or_inputs_recompute(raw, tmp_path):
+    output_dir = tmp_path / "processed"
+    _run(raw, output_dir)
+
+    summary = _run(raw, output_dir, test_size=80, random_state=1)
+    assert summary == {"reused": RATING_STAGES + ["process_anime_data"], "computed": ["split_data"]}
+
+    ratings = pd.read_csv(raw["animelist"])
+    ratings.iloc[:-5].to_csv(raw["animelist"], index=False)
+    summary = _run(raw, output_dir)
+    assert summary == {"reused": ["process_anime_data"], "computed": RATING_STAGES + ["split_data"]}
+
+    # A deleted output invalidates the stage that wrote it
+    os.remove(output_dir / "anime_df" / os.listdir(output_dir / "anime_df")[0])
+    assert _run(raw, output_dir)["computed"] == ["process_anime_data"]
+
+
+def test_prune_drops_stale_entries(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"))
+    source = tmp_path / "source.txt"
+    source.write_text("a")
+    fingerprints = {stage: cache.fingerprint(stage, [str(source)], code=stage) for stage in ("one", "two", "gone")}
+    for stage, fingerprint in fingerprints.items():
+        cache.store(stage, fingerprint)
+    os.makedirs(cache.path("two") + ".tmp")
+
+    source.unlink()
+    cache.prune({"one": fingerprints["one"], "two": "another fingerprint"})
+    assert sorted(os.listdir(cache.directory)) == ["file_digests.json", "one"]
+    assert cache.lookup("one", fingerprints["one"])
+    assert StageCache(cache.directory)._digests == {}
+
+
+def test_size_cap_evicts_the_oldest_entries(tmp_path):
+    cache = StageCache(str(tmp_path / "cache"), max_bytes=2500)
+
+    def write(directory):
+        with open(os.path.join(directory, "state.bin"), "wb") as f:
+            f.write(b"x" * 1000)
+
+    for stage in ("first", "second", "third"):
+        cache.store(stage, stage, write)
+        time.sleep(0.01)
+    assert cache.nbytes() <= 2500
+    assert not cache.lookup("first", "first")
+    assert cache.lookup("second", "second") and cache.lookup("third", "third")
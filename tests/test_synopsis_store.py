@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import anime_table, synopsis_table
+from tests.baseline import synopsis
+from utils.helpers import getSynopsis
+from utils.synopsis_store import SynopsisStore
+
+
+@pytest.fixture(scope="module")
+def synopsis_frame():
+    """Synthetic synopses plus a repeated id, a repeated name, a missing text and non-ASCII text."""
+    df = synopsis_table(anime_table(50, np.random.default_rng(11)), np.random.default_rng(12))
+    extra = df.iloc[[4, 9]].assign(sypnopsis=["Second row, never returned.", "Another duplicate."])
+    extra.iloc[1, extra.columns.get_loc("MAL_ID")] = 10**6
+    df = pd.concat([df, extra], ignore_index=True)
+    df.loc[7, "sypnopsis"] = np.nan
+    df.loc[3, "sypnopsis"] = "Rêve — 夢の物語"
+    return df.sample(frac=1, random_state=1).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("compression", [None, "zlib"])
+def test_lookups_match_pandas(synopsis_frame, compression):
+    store = SynopsisStore.from_frame(synopsis_frame, compression=compression, block_rows=4)
+    ids = synopsis_frame["MAL_ID"].tolist() + [-5, 10**9]
+    names = synopsis_frame["Name"].tolist() + ["No such anime"]
+
+    for anime in ids + names:
+        assert store.get(anime) == synopsis(synopsis_frame, anime)
+    assert store.get_many(ids) == [synopsis(synopsis_frame, anime_id) for anime_id in ids]
+
+
+def test_save_load_round_trip(synopsis_frame, tmp_path):
+    store = SynopsisStore.from_frame(synopsis_frame, compression="zlib", block_rows=4)
+    store.save(str(tmp_path / "store"))
+    loaded = SynopsisStore.load(str(tmp_path / "store"))
+
+    assert SynopsisStore.exists(str(tmp_path / "store"))
+    assert (loaded.compression, loaded.block_rows) == ("zlib", 4)
+    ids = synopsis_frame["MAL_ID"].tolist()
+    assert loaded.get_many(ids) == store.get_many(ids)
+
+
+def test_get_synopsis_accepts_numpy_ids(serving_store):
+    anime_id = serving_store.anime_catalog.columns["anime_id"][0]
+    path = serving_store.paths["synopsis_df"]
+
+    assert isinstance(anime_id, np.integer)
+    assert getSynopsis(anime_id, path, store=serving_store) == getSynopsis(int(anime_id), path, store=serving_store)
+    assert getSynopsis(anime_id, path, store=serving_store) is not None
+    assert getSynopsis(float(anime_id), path, store=serving_store) is None
@@ -0,0 +1,49 @@
+import numpy as np
+
+from utils.topk import top_k
+
+
+def _argsort_top(scores, k, neg=False, skip=()):
+    order = np.argsort(scores) if neg else np.argsort(scores)[::-1]
+    return [int(i) for i in order if i not in skip][:k]
+
+
+def test_matches_full_argsort():
+    scores = np.random.default_rng(0).normal(size=500)
+
+    for neg in (False, True):
+        assert top_k(scores, 10, neg=neg).tolist() == _argsort_top(scores, 10, neg)
+
+
+def test_self_index_is_never_returned():
+    weights = np.random.default_rng(1).normal(size=(200, 16))
+    weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+
+    for index in (0, 57, 199):
+        scores = weights @ weights[index]
+        closest = top_k(scores, 10, self_index=index)
+        assert index not in closest
+        assert len(closest) == 10
+        assert closest.tolist() == _argsort_top(scores, 10, skip={index})
+
+
+def test_rows_with_self_and_excluded_columns():
+    rng = np.random.default_rng(2)
+    scores = rng.normal(size=(5, 30))
+    self_index = np.array([0, 3, -1, 29, 7])
+    excluded = np.zeros(30, dtype=bool)
+    excluded[[1, 2, 3]] = True
+
+    result = top_k(scores, 6, self_index=self_index, excluded=excluded)
+    for row, index in enumerate(self_index):
+        skip = {1, 2, 3} | ({int(index)} if index >= 0 else set())
+        assert result[row].tolist() == _argsort_top(scores[row], 6, skip=skip)
+
+
+def test_rows_short_of_k_are_padded():
+    scores = np.arange(8, dtype=np.float64).reshape(2, 4)
+    excluded = np.array([[False, True, True, True], [False, False, False, False]])
+
+    result = top_k(scores, 3, self_index=np.array([-1, 3]), excluded=excluded)
+    assert result.tolist() == [[0, -1, -1], [2, 1, 0]]
+    assert top_k(scores[0], 10, self_index=0).tolist() == [3, 2, 1]
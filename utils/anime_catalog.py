@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+class AnimeCatalog:
+    """
+    In-memory, hash-indexed view of the processed anime metadata (anime_df.csv).
+
+    Rows keep the order of the source frame (sorted by score). Lookups by
+    anime_id or eng_version are O(1); bulk lookups gather whole columns at once.
+    When an id or name appears more than once, the first row wins.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df.reset_index(drop=True)
+        self.columns = {col: self.df[col].to_numpy() for col in self.df.columns}
+
+        self._id_index, self._id_rows = self._build_index(self.df["anime_id"])
+        self._name_index, self._name_rows = self._build_index(self.df["eng_version"])
+
+    @staticmethod
+    def _build_index(values: pd.Series):
+        rows = np.flatnonzero(~values.duplicated(keep="first").to_numpy())
+        return pd.Index(values.to_numpy()[rows]), rows
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, anime):
+        return self.position(anime) >= 0
+
+    # -----------------------------
+    # Scalar lookups
+    # -----------------------------
+    def position(self, anime):
+        """Row position of an anime by id (int) or English name (str), or -1."""
+        if isinstance(anime, str):
+            index, rows = self._name_index, self._name_rows
+        elif isinstance(anime, (int, np.integer)):
+            index, rows = self._id_index, self._id_rows
+        else:
+            return -1
+
+        try:
+            return int(rows[index.get_loc(anime)])
+        except KeyError:
+            return -1
+
+    def frame(self, anime):
+        """Single-row DataFrame for an anime id or name (same shape as getAnimeFrame)."""
+        pos = self.position(anime)
+        if pos < 0:
+            raise ValueError(f"Anime not found: {anime}")
+        return self.df.iloc[[pos]]
+
+    # -----------------------------
+    # Bulk lookups
+    # -----------------------------
+    def positions(self, ids):
+        """Vectorized row positions for a sequence of anime ids (-1 where missing)."""
+        indexer = self._id_index.get_indexer(np.asarray(ids))
+        return np.where(indexer >= 0, self._id_rows[indexer], -1)
+
+    def positions_by_name(self, names):
+        """Vectorized row positions for a sequence of English names (-1 where missing)."""
+        indexer = self._name_index.get_indexer(np.asarray(names, dtype=object))
+        return np.where(indexer >= 0, self._name_rows[indexer], -1)
+
+    def take(self, positions, columns=None):
+        """Gather the given row positions into a dict of column arrays."""
+        positions = np.asarray(positions, dtype=np.int64)
+        columns = columns or list(self.columns)
+        return {col: self.columns[col][positions] for col in columns}
+
+    def get_many(self, ids, columns=None):
+        """
+        Columnar lookup for many anime ids.
+        Missing ids are dropped; the order of the remaining ids is preserved.
+        """
+        positions = self.positions(ids)
+        return self.take(positions[positions >= 0], columns)
@@ -0,0 +1,114 @@
+import numpy as np
+
+from utils.topk import top_k
+
+
+def _assign(vectors, centroids, block_size=65536):
+    """Nearest centroid (by inner product) of every vector, in blocks."""
+    assign = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start:start + block_size]
+        assign[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def _group(assign, n_lists):
+    """Member ids grouped by list, plus CSR offsets into them."""
+    order = np.argsort(assign, kind="stable")
+    counts = np.bincount(assign, minlength=n_lists)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return order, offsets
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalized embeddings.
+
+    Spherical k-means splits the rows into `n_lists` clusters. A query scores
+    the centroids, then only the rows of the `n_probe` closest clusters, so
+    latency grows with n_probe / n_lists instead of with the table size.
+    The index stores ids only; the embedding matrix is passed in at search time.
+    """
+
+    FIELDS = ("centroids", "list_offsets", "list_ids")
+
+    def __init__(self, centroids, list_offsets, list_ids):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_iter=10, sample_size=100_000, seed=42):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_rows = len(vectors)
+        n_lists = min(n_lists or max(1, int(4 * np.sqrt(n_rows))), n_rows)
+        rng = np.random.default_rng(seed)
+
+        # Train centroids on a sample, then assign every row once
+        sample = vectors
+        if n_rows > sample_size:
+            sample = vectors[rng.choice(n_rows, sample_size, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = _assign(sample, centroids)
+            order, offsets = _group(assign, n_lists)
+            counts = np.diff(offsets)
+            nonempty = counts > 0
+
+            sums = np.add.reduceat(sample[order], offsets[:-1][nonempty], axis=0)
+            centroids[nonempty] = sums
+            # Re-seed empty clusters with random sample points
+            centroids[~nonempty] = sample[rng.choice(len(sample), (~nonempty).sum())]
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+        list_ids, list_offsets = _group(_assign(vectors, centroids), n_lists)
+        return cls(centroids, list_offsets, list_ids)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.FIELDS}
+        for arr in arrays.values():
+            arr.setflags(write=False)
+        return cls(**arrays)
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name) for name in self.FIELDS})
+
+    def update(self, vectors, ids):
+        """
+        Index with rows `ids` of `vectors` (re)assigned to their nearest
+        centroid; ids beyond the current size are added. Centroids are kept.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        n_rows = max(len(self.list_ids), int(ids.max()) + 1 if len(ids) else 0)
+
+        assign = np.empty(n_rows, dtype=np.int64)
+        assign[self.list_ids] = np.repeat(np.arange(self.n_lists), np.diff(self.list_offsets))
+        assign[ids] = _assign(np.asarray(vectors[ids], dtype=np.float32), self.centroids)
+
+        list_ids, list_offsets = _group(assign, self.n_lists)
+        return IVFIndex(self.centroids, list_offsets, list_ids)
+
+    def candidates(self, query, n_probe):
+        """Row ids in the n_probe lists closest to the query."""
+        lists = top_k(self.centroids @ query, n_probe)
+        return np.concatenate([
+            self.list_ids[self.list_offsets[i]:self.list_offsets[i + 1]] for i in lists
+        ])
+
+    def search(self, vectors, query, k, n_probe=8, self_index=None):
+        """
+        Approximate top-k rows of `vectors` by inner product with `query`.
+        Returns (ids, scores), best first.
+        """
+        ids = self.candidates(query, n_probe)
+        scores = vectors[ids] @ query
+        excluded = ids == self_index if self_index is not None else None
+        best = top_k(scores, k, excluded=excluded)
+        return ids[best], scores[best]
@@ -0,0 +1,564 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config.paths_config import *
+from src.custom_exception import CustomException
+from src.logger import get_logger
+from src.numpy_trainer import load_head
+from utils.anime_catalog import AnimeCatalog
+from utils.ann_index import IVFIndex
+from utils.columnar import read_frame
+from utils.id_encoder import IdEncoder
+from utils.metrics import ARTIFACT_LOADS, ARTIFACT_LOAD_LATENCY, ARTIFACT_RELOADS
+from utils.neighbour_table import NeighbourTable
+from utils.quantization import load_quantized
+from utils.rating_index import RatingIndex
+from utils.serving_bundle import ServingBundle
+from utils.synopsis_store import SynopsisStore
+from utils.watched_index import WatchedIndex
+
+logger = get_logger(__name__)
+
+
+def _prefer(path, legacy):
+    """The new-format artifact when it exists, else the legacy pickle/CSV (older artifact dirs)."""
+    return path if os.path.exists(path) or not os.path.exists(legacy) else legacy
+
+
+def default_paths(legacy=True):
+    """
+    Default artifact locations used by the serving path, resolved now rather
+    than at import: a legacy pickle/CSV is only used where its new-format
+    replacement doesn't exist yet. legacy=False always gives the new-format
+    files (what training and fold-in write).
+    """
+    prefer = _prefer if legacy else (lambda path, _: path)
+    return {
+        "user_weights": prefer(USER_WEIGHTS_NPY, USER_WEIGHTS_PATH),
+        "anime_weights": prefer(ANIME_WEIGHTS_NPY, ANIME_WEIGHTS_PATH),
+        "user_ann_index": USER_ANN_INDEX_PATH,
+        "anime_ann_index": ANIME_ANN_INDEX_PATH,
+        "anime_neighbours": ANIME_NEIGHBOURS_PATH,
+        "user2user_encoded": prefer(USER_ENCODER, USER2USER_ENCODED),
+        "user2user_decoded": prefer(USER_ENCODER, USER2USER_DECODED),
+        "anime2anime_encoded": prefer(ANIME_ENCODER, ANIME2ANIME_ENCODED),
+        "anime2anime_decoded": prefer(ANIME_ENCODER, ANIME2ANIME_DECODED),
+        "rating_df": prefer(RATING_TABLE, RATING_DF),
+        "rating_index": RATING_INDEX,
+        "anime_df": prefer(ANIME_TABLE, DF),
+        "synopsis_df": prefer(SYNOPSIS_TABLE, SYNOPSIS_DF),
+        "synopsis_store": SYNOPSIS_STORE,
+        "model_head": MODEL_HEAD_PATH,
+    }
+
+
+# Artifacts the prediction pipeline touches per request
+SERVING_ARTIFACTS = (
+    "user_weights",
+    "anime_weights",
+    "user2user_encoded",
+    "user2user_decoded",
+    "anime2anime_encoded",
+    "anime2anime_decoded",
+    "anime_catalog",
+    "anime_neighbours",
+    "rating_index",
+    "watched_index",
+    "synopses",
+    "model_head",
+)
+
+# Serving artifacts built from another entry of `paths`
+ARTIFACT_SOURCES = {
+    "anime_catalog": "anime_df",
+    "rating_index": "rating_df",
+    "watched_index": "rating_df",
+    "synopses": "synopsis_df",
+}
+
+
+def _read_only(obj):
+    """Wrap a loaded artifact so callers can't mutate the shared copy."""
+    if isinstance(obj, np.ndarray):
+        obj.setflags(write=False)
+        return obj
+    if isinstance(obj, dict):
+        return MappingProxyType(obj)
+    return obj
+
+
+@contextmanager
+def artifact_update(marker=ARTIFACT_UPDATE_MARKER):
+    """
+    Mark the artifacts as being rewritten for the duration of the block.
+    ArtifactStore.refresh() doesn't switch to a new version while the marker
+    exists, so servers never load half of a retrain.
+    """
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    with open(marker, "w") as f:
+        f.write(f"{os.getpid()}\n")
+    try:
+        yield
+    finally:
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+
+
+class _Generation:
+    """One artifact version: its fingerprint and everything loaded from it."""
+
+    def __init__(self, version):
+        self.version = version
+        self.cache = {}
+        self.lock = threading.RLock()
+        self.snapshot = None
+
+
+class ArtifactStore:
+    """
+    Process-wide cache of the serving artifacts.
+
+    Every artifact is read from disk at most once per artifact version and
+    handed out as a shared, read-only object. Lookups are keyed by absolute
+    path, so the path-based helper signatures reuse the same loaded copy.
+
+    A request should call snapshot() once and use only that: it stays on one
+    version while refresh() swaps in the next one.
+    """
+
+    def __init__(self, paths=None, version_check_interval=1.0, update_marker=ARTIFACT_UPDATE_MARKER):
+        self.paths = {**default_paths(), **(paths or {})}
+        self._refresh_lock = threading.Lock()
+        self._pinned = False
+
+        # Artifact version: fingerprint of the artifact files, re-checked at most every interval
+        self.version_check_interval = version_check_interval
+        self.update_marker = update_marker
+        self._generation = self._new_generation(self._fingerprint())
+        self._pending_version = None
+        self._version_checked = time.monotonic()
+
+    def _new_generation(self, version):
+        return _Generation(version)
+
+    def _get(self, kind, path, loader):
+        generation = self._generation
+        key = (kind, os.path.abspath(path))
+        try:
+            return generation.cache[key]
+        except KeyError:
+            pass
+
+        with generation.lock:
+            if key not in generation.cache:
+                logger.info(f"Loading {kind} artifact: {path}")
+                with ARTIFACT_LOAD_LATENCY.time(kind):
+                    generation.cache[key] = _read_only(loader(path))
+                ARTIFACT_LOADS.inc(kind)
+            return generation.cache[key]
+
+    def load_pickle(self, path):
+        return self._get("pickle", path, joblib.load)
+
+    def load_array(self, path):
+        """Embedding matrix: memory-mapped .npy (pages shared across workers) or a legacy pickle."""
+        if path.endswith(".npy"):
+            return self._get("array", path, lambda p: np.load(p, mmap_mode="r"))
+        return self.load_pickle(path)
+
+    def load_weights(self, path, precision="float32"):
+        """Embedding matrix at the requested precision (quantized copies sit next to `path`)."""
+        if precision == "float32":
+            return self.load_array(path)
+        return self._get(f"weights_{precision}", path, lambda p: load_quantized(p, precision))
+
+    def load_encoder(self, path):
+        """id -> code mapping: IdEncoder for .npy, dict for a legacy pickle."""
+        if path.endswith(".npy"):
+            return self._get("encoder", path, IdEncoder.load)
+        return self.load_pickle(path)
+
+    def load_decoder(self, path):
+        """code -> id mapping; a .npy encoder file serves both directions."""
+        if path.endswith(".npy"):
+            return self.load_encoder(path).decoder
+        return self.load_pickle(path)
+
+    def load_frame(self, path, columns=None):
+        """
+        Processed table from a columnar directory or a legacy CSV, optionally
+        projected to `columns`. DataFrames are shared between requests: treat
+        them as read-only.
+        """
+        kind = f"frame:{','.join(columns)}" if columns else "frame"
+        if os.path.isdir(path):
+            return self._get(kind, path, lambda p: read_frame(p, columns))
+        return self._get(kind, path, lambda p: pd.read_csv(p, usecols=columns))
+
+    def load_catalog(self, path):
+        return self._get("catalog", path, lambda p: AnimeCatalog(self.load_frame(p)))
+
+    def load_ann_index(self, path):
+        return self._get("ann_index", path, IVFIndex.load)
+
+    def load_neighbour_table(self, path):
+        """Precomputed neighbour table, or None when training didn't produce one."""
+        return self._get("neighbour_table", path, lambda p: NeighbourTable.load(p) if os.path.exists(p) else None)
+
+    def load_watched_index(self, path):
+        """Encoded anime indices of everything each user rated, parallel to load_rating_index(path)."""
+        return self._get(
+            "watched_index", path,
+            lambda p: WatchedIndex.from_rating_index(self.load_rating_index(p), self.anime2anime_encoded),
+        )
+
+    def load_model_head(self, path):
+        """RecommenderNet Dense + BatchNorm parameters, or None when training didn't export them."""
+        return self._get("model_head", path, lambda p: load_head(p) if os.path.exists(p) else None)
+
+    def load_synopsis_store(self, path):
+        """Synopsis store from its directory, or built from a synopsis table/CSV."""
+        return self._get("synopsis_store", path, self._read_synopsis_store)
+
+    def _read_synopsis_store(self, path):
+        if SynopsisStore.exists(path):
+            return SynopsisStore.load(path)
+
+        # Prefer the store DataProcessor saved next to the synopsis table
+        prebuilt = self.paths["synopsis_store"]
+        if path == self.paths["synopsis_df"] and SynopsisStore.exists(prebuilt):
+            return SynopsisStore.load(prebuilt)
+
+        return SynopsisStore.from_frame(self.load_frame(path))
+
+    def load_rating_index(self, path):
+        """Per-user rating index from a saved .npz or a ratings table/CSV."""
+        return self._get("rating_index", path, self._read_rating_index)
+
+    def _read_rating_index(self, path):
+        if path.endswith(".npz"):
+            return RatingIndex.load(path)
+
+        # Prefer the index DataProcessor saved next to the ratings table
+        prebuilt = self.paths["rating_index"]
+        if path == self.paths["rating_df"] and os.path.exists(prebuilt):
+            return RatingIndex.load(prebuilt)
+
+        return RatingIndex.from_frame(self.load_frame(path, ["user_id", "anime_id", "rating"]))
+
+    # -----------------------------
+    # Named artifacts
+    # -----------------------------
+    @property
+    def user_weights(self):
+        return self.load_array(self.paths["user_weights"])
+
+    @property
+    def anime_weights(self):
+        return self.load_array(self.paths["anime_weights"])
+
+    @property
+    def user2user_encoded(self):
+        return self.load_encoder(self.paths["user2user_encoded"])
+
+    @property
+    def user2user_decoded(self):
+        return self.load_decoder(self.paths["user2user_decoded"])
+
+    @property
+    def anime2anime_encoded(self):
+        return self.load_encoder(self.paths["anime2anime_encoded"])
+
+    @property
+    def anime2anime_decoded(self):
+        return self.load_decoder(self.paths["anime2anime_decoded"])
+
+    @property
+    def rating_df(self):
+        return self.load_frame(self.paths["rating_df"])
+
+    @property
+    def anime_df(self):
+        return self.load_frame(self.paths["anime_df"])
+
+    @property
+    def synopsis_df(self):
+        return self.load_frame(self.paths["synopsis_df"])
+
+    @property
+    def synopses(self):
+        return self.load_synopsis_store(self.paths["synopsis_df"])
+
+    @property
+    def watched_index(self):
+        return self.load_watched_index(self.paths["rating_df"])
+
+    @property
+    def model_head(self):
+        return self.load_model_head(self.paths["model_head"])
+
+    @property
+    def anime_catalog(self):
+        return self.load_catalog(self.paths["anime_df"])
+
+    @property
+    def anime_neighbours(self):
+        return self.load_neighbour_table(self.paths["anime_neighbours"])
+
+    @property
+    def rating_index(self):
+        return self.load_rating_index(self.paths["rating_df"])
+
+    def warm_up(self):
+        """
+        Eagerly load every artifact so the first request pays no I/O. Raises
+        CustomException naming the first artifact that fails to load.
+        """
+        for name in SERVING_ARTIFACTS:
+            try:
+                getattr(self, name)
+            except Exception as e:
+                path = self.paths.get(ARTIFACT_SOURCES.get(name, name))
+                logger.error(f"Failed to load serving artifact {name} from {path}: {e}")
+                raise CustomException(f"Failed to load serving artifact {name} from {path}: {e}", e)
+        logger.info("Artifact store warmed up")
+        return self
+
+    def clear(self):
+        """Drop every artifact loaded for the current version."""
+        generation = self._generation
+        with generation.lock:
+            generation.cache.clear()
+
+    def snapshot(self):
+        """
+        This store pinned to the current artifact version: everything it
+        returns comes from that version, whatever refresh() does meanwhile.
+        Every caller gets the same snapshot object until the version changes.
+        """
+        generation = self._generation
+        if self._pinned:
+            return self
+        if generation.snapshot is None:
+            with generation.lock:
+                if generation.snapshot is None:
+                    generation.snapshot = self._pin(generation)
+        return generation.snapshot
+
+    def _pin(self, generation):
+        pinned = copy.copy(self)
+        pinned._generation = generation
+        pinned._pinned = True
+        return pinned
+
+    def _fingerprint(self):
+        """
+        Short hash of (path, size, mtime) of every artifact plus the weights and
+        processed directories. Training, fold-in and DVC pulls all replace files,
+        which changes it; every worker on the host computes the same value.
+        """
+        paths = sorted({WEIGHTS_DIR, PROCESSED_DIR, *self.paths.values()})
+        digest = hashlib.sha1()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+            except FileNotFoundError:
+                digest.update(f"{path}:missing;".encode())
+        return digest.hexdigest()[:12]
+
+    @property
+    def version(self):
+        return self._generation.version
+
+    def refresh(self):
+        """
+        Re-check the artifact version (throttled). A new version is adopted
+        only once no update marker is present and two checks in a row see the
+        same fingerprint. Its serving artifacts are then loaded into a new
+        snapshot on the side, which replaces the current one in a single
+        assignment; requests holding the old snapshot finish on it. Returns
+        True when a new version was swapped in. Snapshots never refresh.
+        """
+        now = time.monotonic()
+        if self._pinned or now - self._version_checked < self.version_check_interval:
+            return False
+        # Another thread is already checking or loading the next version
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._version_checked = now
+            if os.path.exists(self.update_marker):
+                return False
+
+            version = self._fingerprint()
+            if version == self.version:
+                self._pending_version = None
+                return False
+            if version != self._pending_version:
+                # Files may still be changing: confirm on the next check
+                self._pending_version = version
+                return False
+
+            generation = self._load_generation(version)
+            if generation is None:
+                return False
+
+            logger.info(f"Artifact version changed {self.version} -> {version}; serving the new snapshot")
+            self._generation = generation
+            self._pending_version = None
+            ARTIFACT_RELOADS.inc()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _load_generation(self, version):
+        """New generation with every serving artifact loaded, or None if the files changed meanwhile."""
+        try:
+            generation = self._new_generation(version)
+        except Exception as e:
+            logger.error(f"Could not open artifact version {version}; retrying on the next check: {e}")
+            self._pending_version = None
+            return None
+        generation.snapshot = self._pin(generation)
+        try:
+            generation.snapshot.warm_up()
+        except CustomException as e:
+            # Missing in this version for good; requests needing it fail as they would on startup
+            logger.error(f"Artifact version {version} is incomplete: {e}")
+
+        if self._fingerprint() != version or os.path.exists(self.update_marker):
+            logger.info(f"Artifacts changed while loading version {version}; retrying on the next check")
+            self._pending_version = None
+            return None
+        return generation
+
+
+BUNDLE_PREFIX = "bundle:"
+
+# Artifact name -> what the serving bundle holds for it
+BUNDLED_ARTIFACTS = {
+    "user_weights": "user_weights",
+    "anime_weights": "anime_weights",
+    "user2user_encoded": "user_encoder",
+    "user2user_decoded": "user_encoder",
+    "anime2anime_encoded": "anime_encoder",
+    "anime2anime_decoded": "anime_encoder",
+    "rating_df": "rating_index",
+    "rating_index": "rating_index",
+    "anime_neighbours": "anime_neighbours",
+    "anime_df": "anime_df",
+    "synopsis_df": "synopsis_df",
+    "synopsis_store": "synopsis_store",
+    "model_head": "model_head",
+}
+
+
+class BundleArtifactStore(ArtifactStore):
+    """
+    ArtifactStore served from a single serving bundle (utils/serving_bundle.py).
+
+    Bundled artifacts get virtual "bundle:<name>" paths, so the path-based
+    helpers work unchanged; loading one is a zero-copy view into the mapped
+    file. Artifacts the bundle doesn't hold (ANN indexes, quantized copies)
+    are still read from their usual files. A replaced bundle file changes the
+    version, and each snapshot keeps the bundle it was loaded from.
+    """
+
+    def __init__(self, bundle_path, paths=None, version_check_interval=1.0, verify=False,
+                 update_marker=ARTIFACT_UPDATE_MARKER):
+        self.bundle_path = bundle_path
+        self.verify = verify
+        self._opened = ServingBundle.open(bundle_path, verify=verify)
+
+        bundled = {name: f"{BUNDLE_PREFIX}{name}" for name, key in BUNDLED_ARTIFACTS.items() if key in self._opened}
+        super().__init__({**bundled, **(paths or {})}, version_check_interval, update_marker)
+
+    def _new_generation(self, version):
+        generation = super()._new_generation(version)
+        # The bundle opened for the paths serves the first version
+        generation.bundle, self._opened = self._opened or ServingBundle.open(self.bundle_path, verify=self.verify), None
+        return generation
+
+    @property
+    def bundle(self):
+        return self._generation.bundle
+
+    def _get(self, kind, path, loader):
+        if path.startswith(BUNDLE_PREFIX):
+            name = path[len(BUNDLE_PREFIX):]
+            return super()._get(kind, path, lambda p: self._load_bundled(kind, name))
+        return super()._get(kind, path, loader)
+
+    def _load_bundled(self, kind, name):
+        bundle = self.bundle
+        if name in ("user_weights", "anime_weights"):
+            if kind.startswith("weights_"):
+                raise ValueError(f"{kind[len('weights_'):]} weights are not in the serving bundle")
+            return bundle.array(name)
+        if name.endswith("_encoded"):
+            return bundle.encoder(BUNDLED_ARTIFACTS[name])
+        if name.endswith("_decoded"):
+            return bundle.encoder(BUNDLED_ARTIFACTS[name]).decoder
+        if kind == "rating_index":
+            return bundle.rating_index()
+        if kind == "watched_index":
+            if "watched_index" in bundle:
+                return bundle.watched_index()
+            return WatchedIndex.from_rating_index(bundle.rating_index(), bundle.encoder("anime_encoder"))
+        if kind == "neighbour_table":
+            return bundle.neighbour_table()
+        if kind == "model_head":
+            return bundle.model_head()
+        if kind == "catalog":
+            return AnimeCatalog(self.load_frame(self.paths[name]))
+        if kind == "synopsis_store":
+            if "synopsis_store" in bundle:
+                return bundle.synopsis_store()
+            return SynopsisStore.from_frame(bundle.frame("synopsis_df"))
+        if kind.startswith("frame") and name in ("anime_df", "synopsis_df"):
+            columns = kind.split(":", 1)[1].split(",") if ":" in kind else None
+            return bundle.frame(name, columns)
+        raise ValueError(f"{name} ({kind}) is not in the serving bundle {self.bundle_path}")
+
+    def _fingerprint(self):
+        try:
+            stat = os.stat(self.bundle_path)
+            bundle = f"{self.bundle_path}:{stat.st_size}:{stat.st_mtime_ns}"
+        except FileNotFoundError:
+            bundle = f"{self.bundle_path}:missing"
+        return hashlib.sha1(f"{super()._fingerprint()};{bundle}".encode()).hexdigest()[:12]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Return the process-wide ArtifactStore."""
+    global _default_store
+    if _default_store is None:
+        with _default_lock:
+            if _default_store is None:
+                _default_store = ArtifactStore()
+    return _default_store
+
+
+def set_artifact_store(store):
+    """Replace the process-wide ArtifactStore (e.g. with a BundleArtifactStore at startup)."""
+    global _default_store
+    with _default_lock:
+        _default_store = store
+    return store
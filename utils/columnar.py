@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def column_kind(values: pd.Series):
+    """'numeric' or 'string'; object columns that parse as numbers become numeric (as read_csv would)."""
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return "numeric", values.to_numpy()
+    try:
+        return "numeric", pd.to_numeric(values).to_numpy()
+    except (ValueError, TypeError):
+        return "string", values.to_numpy(dtype=object)
+
+
+def encode_strings(values):
+    """UTF-8 blob + int64 offsets (+ null mask) for an object array of strings."""
+    nulls = pd.isna(values)
+    encoded = [b"" if null else str(value).encode("utf-8") for value, null in zip(values, nulls)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets, nulls
+
+
+def decode_strings(blob, offsets, nulls=None):
+    """Inverse of the string encoding: object array of str (None where null)."""
+    data = bytes(blob)
+    bounds = np.asarray(offsets).tolist()
+    values = np.empty(len(bounds) - 1, dtype=object)
+    if data.isascii():
+        # Byte offsets are character offsets: decode once, then slice
+        text = data.decode("ascii")
+        values[:] = [text[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    else:
+        values[:] = [data[start:end].decode("utf-8") for start, end in zip(bounds[:-1], bounds[1:])]
+    if nulls is not None:
+        values[nulls] = None
+    return values
+
+
+def write_table(directory, table):
+    """
+    Write a DataFrame (or dict of arrays) as one .npy per column plus a JSON
+    manifest. Numeric columns can be memory-mapped on read; string columns are
+    stored as a UTF-8 blob with offsets.
+    """
+    if not isinstance(table, pd.DataFrame):
+        table = pd.DataFrame(table)
+
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    columns = []
+    for i, name in enumerate(table.columns):
+        kind, values = column_kind(table[name])
+        stem = os.path.join(directory, f"{i:03d}")
+
+        if kind == "numeric":
+            np.save(f"{stem}.npy", np.ascontiguousarray(values))
+            dtype = values.dtype.str
+        else:
+            blob, offsets, nulls = encode_strings(values)
+            np.save(f"{stem}.blob.npy", blob)
+            np.save(f"{stem}.offsets.npy", offsets)
+            np.save(f"{stem}.nulls.npy", nulls)
+            dtype = "utf8"
+
+        columns.append({"name": str(name), "file": f"{i:03d}", "kind": kind, "dtype": dtype})
+
+    manifest = {"format_version": FORMAT_VERSION, "rows": len(table), "columns": columns}
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        return json.load(f)
+
+
+def read_table(directory, columns=None, mmap=True):
+    """Read the requested columns (all by default) into a dict of arrays."""
+    manifest = read_manifest(directory)
+    by_name = {col["name"]: col for col in manifest["columns"]}
+    names = columns or list(by_name)
+    mode = "r" if mmap else None
+
+    missing = [name for name in names if name not in by_name]
+    if missing:
+        raise KeyError(f"Columns {missing} not in table {directory}")
+
+    result = {}
+    for name in names:
+        col = by_name[name]
+        stem = os.path.join(directory, col["file"])
+        if col["kind"] == "numeric":
+            result[name] = np.load(f"{stem}.npy", mmap_mode=mode)
+        else:
+            result[name] = decode_strings(
+                np.load(f"{stem}.blob.npy", mmap_mode=mode),
+                np.load(f"{stem}.offsets.npy"),
+                np.load(f"{stem}.nulls.npy"),
+            )
+    return result
+
+
+def read_frame(directory, columns=None):
+    """read_table as a DataFrame (numeric columns are copied out of the mmap)."""
+    return pd.DataFrame({name: np.asarray(values) for name, values in read_table(directory, columns).items()})
+
+
+def table_nbytes(directory):
+    return sum(
+        os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+    )
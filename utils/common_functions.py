@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 import sys
 import yaml
@@ -32,5 +33,12 @@ def load_data(file_path):
         raise CustomException(f"Error while loading the file: {e}")
 
 
-
-
+def save_array(file_path, array):
+    """
+    np.save through a temp file and an atomic rename, so processes that have
+    the old file memory-mapped keep reading a consistent copy.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, file_path)
@@ -1,50 +1,65 @@
 import pandas as pd
 import numpy as np
-import joblib
+
+from utils.artifact_store import get_artifact_store
+from utils.id_encoder import decode_many, encode_many
+from utils.metrics import HELPER_LATENCY
+from utils.topk import top_k
+from utils.watched_index import WatchedIndex
 
 
 ############# 1. GET_ANIME_FRAME
 
-def getAnimeFrame(anime, path_df):
-    df = pd.read_csv(path_df)
+@HELPER_LATENCY.timed()
+def getAnimeFrame(anime, path_df, store=None):
+    catalog = (store or get_artifact_store()).load_catalog(path_df)
 
-    if isinstance(anime, int):
-        frame = df[df["anime_id"] == anime]
-    elif isinstance(anime, str):
-        frame = df[df["eng_version"] == anime]
-    else:
+    if not isinstance(anime, (int, np.integer, str)):
         return pd.DataFrame()
 
-    if frame.empty:
-        raise ValueError(f"Anime not found: {anime}")
-
-    return frame
+    return catalog.frame(anime)
 
 
 ########## 2. GET_SYNOPSIS
 
-def getSynopsis(anime, path_synopsis_df):
-    synopsis_df = pd.read_csv(path_synopsis_df)
-
-    # Robust column detection
-    id_col = "MAL_ID" if "MAL_ID" in synopsis_df.columns else "anime_id"
-    text_col = "sypnopsis" if "sypnopsis" in synopsis_df.columns else "synopsis"
+@HELPER_LATENCY.timed()
+def getSynopsis(anime, path_synopsis_df, store=None):
+    synopses = (store or get_artifact_store()).load_synopsis_store(path_synopsis_df)
 
-    if isinstance(anime, int):
-        row = synopsis_df[synopsis_df[id_col] == anime]
-    elif isinstance(anime, str):
-        row = synopsis_df[synopsis_df["Name"] == anime]
-    else:
+    # Ids straight from numpy arrays (e.g. catalog columns) are np.integer
+    if not isinstance(anime, (int, np.integer, str)):
         return None
 
-    if row.empty:
-        return None
+    return synopses.get(anime)
+
 
-    return row[text_col].values[0]
+########## 3. NEAREST NEIGHBOURS
 
+def _nearest(weights, encoded_index, n, neg, mode, store, path_ann_index, n_probe):
+    """
+    Top-n rows of `weights` closest to row `encoded_index`, excluding itself.
+    Returns (dists, closest, similarity); in "ann" mode dists only covers the
+    returned neighbours. Farthest-neighbour queries (neg=True) are always exact.
+    """
+    if mode not in ("exact", "ann"):
+        raise ValueError(f"Unknown similarity mode: {mode}")
+
+    # FIX: ensure correct shape
+    target_vec = weights[encoded_index].squeeze()
+
+    if mode == "ann" and not neg:
+        ann_index = store.load_ann_index(path_ann_index)
+        closest, similarity = ann_index.search(weights, target_vec, n, n_probe, self_index=encoded_index)
+        return similarity, closest, similarity
+
+    dists = weights @ target_vec
+    closest = top_k(dists, n, neg=neg, self_index=encoded_index)
+    return dists, closest, dists[closest]
 
-########## 3. CONTENT RECOMMENDATION
 
+########## 4. CONTENT RECOMMENDATION
+
+@HELPER_LATENCY.timed()
 def find_similar_animes(
     name,
     path_anime_weights,
@@ -54,48 +69,66 @@ def find_similar_animes(
     n=10,
     return_dist=False,
     neg=False,
+    store=None,
+    mode="exact",
+    path_ann_index=None,
+    n_probe=8,
+    path_neighbour_table=None,
+    precision="float32",
 ):
-    anime_weights = joblib.load(path_anime_weights)
-    anime2anime_encoded = joblib.load(path_anime2anime_encoded)
-    anime2anime_decoded = joblib.load(path_anime2anime_decoded)
+    store = store or get_artifact_store()
+    anime_weights = store.load_weights(path_anime_weights, precision)
+    anime2anime_encoded = store.load_encoder(path_anime2anime_encoded)
+    anime2anime_decoded = store.load_decoder(path_anime2anime_decoded)
+    catalog = store.load_catalog(path_anime_df)
 
-    frame = getAnimeFrame(name, path_anime_df)
-    index = frame["anime_id"].values[0]
+    position = catalog.position(name)
+    if position < 0:
+        raise ValueError(f"Anime not found: {name}")
+    index = catalog.columns["anime_id"][position]
 
     encoded_index = anime2anime_encoded.get(index)
     if encoded_index is None:
         raise ValueError(f"Encoded index not found for anime ID: {index}")
 
-    # FIX: ensure correct shape
-    target_vec = anime_weights[encoded_index].squeeze()
-    dists = np.dot(anime_weights, target_vec)
-    sorted_dists = np.argsort(dists)
+    neighbour_table = None
+    if mode == "exact" and precision == "float32" and not neg and not return_dist:
+        neighbour_table = store.load_neighbour_table(path_neighbour_table or store.paths["anime_neighbours"])
 
-    n += 1
-    closest = sorted_dists[:n] if neg else sorted_dists[-n:]
+    if neighbour_table is not None and n <= neighbour_table.k:
+        # Precomputed at training time: a single row lookup
+        closest, similarity = neighbour_table.lookup(encoded_index, n)
+    else:
+        dists, closest, similarity = _nearest(
+            anime_weights, encoded_index, n, neg, mode, store,
+            path_ann_index or store.paths["anime_ann_index"], n_probe,
+        )
 
-    if return_dist:
-        return dists, closest
+        if return_dist:
+            return dists, closest
 
-    results = []
-    for close in closest:
-        decoded_id = anime2anime_decoded.get(close)
-        if decoded_id is None or decoded_id == index:
-            continue
+    decoded_ids = decode_many(anime2anime_decoded, closest)
+    keep = (decoded_ids != -1) & (decoded_ids != index)
+    similarity, decoded_ids = similarity[keep], decoded_ids[keep]
 
-        anime_frame = getAnimeFrame(decoded_id, path_anime_df)
+    # One gather against the catalog instead of a lookup per neighbour
+    positions = catalog.positions(decoded_ids)
+    found = positions >= 0
+    rows = catalog.take(positions[found], ["eng_version", "Genres"])
 
-        results.append({
-            "name": anime_frame.eng_version.values[0],
-            "genre": anime_frame.Genres.values[0],
-            "similarity": dists[close],
-        })
+    results = pd.DataFrame({
+        "name": rows["eng_version"],
+        "genre": rows["Genres"],
+        "similarity": similarity[found],
+        "anime_id": decoded_ids[found],
+    })
 
-    return pd.DataFrame(results).sort_values("similarity", ascending=False)
+    return results.sort_values("similarity", ascending=False, kind="stable")
 
 
-######## 4. FIND_SIMILAR_USERS
+######## 5. FIND_SIMILAR_USERS
 
+@HELPER_LATENCY.timed()
 def find_similar_users(
     item_input,
     path_user_weights,
@@ -104,64 +137,89 @@ def find_similar_users(
     n=10,
     return_dist=False,
     neg=False,
+    store=None,
+    mode="exact",
+    path_ann_index=None,
+    n_probe=8,
+    precision="float32",
 ):
-    user_weights = joblib.load(path_user_weights)
-    user2user_encoded = joblib.load(path_user2user_encoded)
-    user2user_decoded = joblib.load(path_user2user_decoded)
+    store = store or get_artifact_store()
+    user_weights = store.load_weights(path_user_weights, precision)
+    user2user_encoded = store.load_encoder(path_user2user_encoded)
+    user2user_decoded = store.load_decoder(path_user2user_decoded)
 
     encoded_index = user2user_encoded.get(item_input)
     if encoded_index is None:
         raise ValueError(f"User not found: {item_input}")
 
-    target_vec = user_weights[encoded_index].squeeze()
-    dists = np.dot(user_weights, target_vec)
-    sorted_dists = np.argsort(dists)
-
-    n += 1
-    closest = sorted_dists[:n] if neg else sorted_dists[-n:]
+    dists, closest, similarity = _nearest(
+        user_weights, encoded_index, n, neg, mode, store,
+        path_ann_index or store.paths["user_ann_index"], n_probe,
+    )
 
     if return_dist:
         return dists, closest
 
     results = []
-    for close in closest:
+    for close, sim in zip(closest, similarity):
         decoded_id = user2user_decoded.get(close)
         if decoded_id is None or decoded_id == item_input:
             continue
 
         results.append({
             "similar_users": decoded_id,
-            "similarity": dists[close],
+            "similarity": sim,
         })
 
     return pd.DataFrame(results).sort_values("similarity", ascending=False)
 
 
-################## 5. GET USER PREF
+################## 6. GET USER PREF
+
+@HELPER_LATENCY.timed()
+def get_user_preferences(user_id, path_rating_df, path_anime_df, store=None):
+    store = store or get_artifact_store()
+    rating_index = store.load_rating_index(path_rating_df)
+    catalog = store.load_catalog(path_anime_df)
+
+    # Ratings at or above the user's 75th percentile are a prefix of their slice
+    top_animes = rating_index.preferences(user_id)
 
-def get_user_preferences(user_id, path_rating_df, path_anime_df):
-    rating_df = pd.read_csv(path_rating_df)
-    df = pd.read_csv(path_anime_df)
+    # Catalog order, as a filter over anime_df would give
+    positions = np.unique(catalog.positions(top_animes))
+    positions = positions[positions >= 0]
 
-    user_df = rating_df[rating_df.user_id == user_id]
+    return pd.DataFrame(catalog.take(positions, ["eng_version", "Genres"]), index=positions)
 
-    if user_df.empty:
-        return pd.DataFrame(columns=["eng_version", "Genres"])
 
-    ratings = user_df["rating"].dropna()
-    if ratings.empty:
-        return pd.DataFrame(columns=["eng_version", "Genres"])
+######## 7. USER RECOMMENDATION
 
-    threshold = np.percentile(ratings, 75)
+def preference_names(owner, anime_ids, catalog):
+    """
+    English names of (owner, anime_id) preference pairs, grouped by owner and
+    in catalog order within each owner, without duplicates.
+    """
+    positions = catalog.positions(anime_ids)
+    found = positions >= 0
+    owner, positions = owner[found], positions[found]
 
-    top_animes = user_df[user_df.rating >= threshold].anime_id.values
-    anime_df_rows = df[df["anime_id"].isin(top_animes)][["eng_version", "Genres"]]
+    order = np.lexsort((positions, owner))
+    owner, positions = owner[order], positions[order]
+    first = np.ones(len(positions), dtype=bool)
+    first[1:] = (owner[1:] != owner[:-1]) | (positions[1:] != positions[:-1])
 
-    return anime_df_rows
+    return catalog.columns["eng_version"][positions[first]]
 
 
-######## 6. USER RECOMMENDATION
+def rank_by_count(names, n):
+    """Top-n most frequent names as a Series of counts; ties keep first appearance."""
+    codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    order = np.argsort(-counts, kind="stable")[:n]
+    return pd.Series(counts[order], index=uniques[order])
 
+
+@HELPER_LATENCY.timed()
 def get_user_recommendations(
     similar_users,
     user_pref,
@@ -169,34 +227,52 @@ def get_user_recommendations(
     path_synopsis_df,
     path_rating_df,
     n=10,
+    store=None,
+    watched=None,
+    path_anime2anime_encoded=None,
 ):
+    """
+    Anime the similar users like most, with genres and synopsis.
+
+    `watched` is the user's packed bitset from WatchedIndex.bitsets (shape
+    (1, n_bytes)): everything set there is excluded by encoded anime index,
+    encoded with the encoder at `path_anime2anime_encoded` (the store's by
+    default). Without it, the titles in `user_pref` are excluded by name.
+    """
+    store = store or get_artifact_store()
+    rating_index = store.load_rating_index(path_rating_df)
+    catalog = store.load_catalog(path_anime_df)
     recommended_animes = []
-    anime_list = []
-
-    for user_id in similar_users.similar_users.values:
-        pref_list = get_user_preferences(int(user_id), path_rating_df, path_anime_df)
 
-        pref_list = pref_list[
-            ~pref_list.eng_version.isin(user_pref.eng_version.values)
-        ]
+    # Top items of every similar user in one pass
+    owner, anime_ids = rating_index.preferences_many(similar_users.similar_users.values)
 
-        if not pref_list.empty:
-            anime_list.extend(pref_list.eng_version.values)
+    if watched is not None:
+        anime2anime_encoded = store.load_encoder(path_anime2anime_encoded or store.paths["anime2anime_encoded"])
+        codes = encode_many(anime2anime_encoded, anime_ids)
+        keep = ~WatchedIndex.contains(watched, np.zeros(len(codes), dtype=np.int64), codes)
+        anime_list = preference_names(owner[keep], anime_ids[keep], catalog)
+    else:
+        names = preference_names(owner, anime_ids, catalog)
+        anime_list = names[~pd.Series(names).isin(user_pref.eng_version.values).to_numpy()]
 
-    if not anime_list:
+    if len(anime_list) == 0:
         return pd.DataFrame()
 
-    counts = pd.Series(anime_list).value_counts().head(n)
+    counts = rank_by_count(anime_list, n)
 
-    for anime_name, cnt in counts.items():
-        frame = getAnimeFrame(anime_name, path_anime_df)
-        anime_id = frame.anime_id.values[0]
+    positions = catalog.positions_by_name(counts.index)
+    if (positions < 0).any():
+        raise ValueError(f"Anime not found: {counts.index[positions < 0][0]}")
+    rows = catalog.take(positions, ["anime_id", "Genres"])
+    synopses = store.load_synopsis_store(path_synopsis_df).get_many(rows["anime_id"])
 
+    for anime_name, cnt, genres, synopsis in zip(counts.index, counts.values, rows["Genres"], synopses):
         recommended_animes.append({
             "n": cnt,
             "anime_name": anime_name,
-            "Genres": frame.Genres.values[0],
-            "Synopsis": getSynopsis(anime_id, path_synopsis_df),
+            "Genres": genres,
+            "Synopsis": synopsis,
         })
 
     return pd.DataFrame(recommended_animes)
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from utils.common_functions import save_array
+
+
+class IdEncoder:
+    """
+    Array-backed replacement for the id -> code dicts (user2user_encoded, ...).
+
+    ids[code] is the raw id of each code; sorted_ids / sorted_codes are the same
+    pairs ordered by raw id, so encoding is a binary search. Saved as a single
+    (3, n) int64 .npy that can be memory-mapped and shared between processes.
+    Supports the dict methods existing callers use (.get, [], in, len).
+    """
+
+    def __init__(self, ids, sorted_ids=None, sorted_codes=None):
+        self.ids = ids
+        if sorted_ids is None:
+            sorted_codes = np.argsort(ids, kind="stable")
+            sorted_ids = ids[sorted_codes]
+        self.sorted_ids = sorted_ids
+        self.sorted_codes = sorted_codes
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Encoder where code i is ids[i]."""
+        return cls(np.asarray(ids, dtype=np.int64))
+
+    @classmethod
+    def factorize(cls, values):
+        """
+        Encode `values` in order of first appearance (as unique() + map would).
+        Returns (int32 codes, encoder); missing values get code -1.
+        """
+        values = np.asarray(values)
+        if values.dtype.kind in "iu" and len(values) and values.min() >= 0 and values.max() < 4 * len(values):
+            # Small non-negative ids: a dense id -> code table beats hashing every row
+            uniques = pd.unique(values)
+            table = np.full(int(uniques.max()) + 1, -1, dtype=np.int32)
+            table[uniques] = np.arange(len(uniques), dtype=np.int32)
+            return table[values], cls.from_ids(uniques)
+
+        codes, uniques = pd.factorize(values, sort=False)
+        return codes.astype(np.int32), cls.from_ids(uniques)
+
+    @classmethod
+    def from_dict(cls, decoded):
+        """Encoder from a {code: id} dict with contiguous codes."""
+        return cls.from_ids([decoded[i] for i in range(len(decoded))])
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        data = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(data[0], data[1], data[2])
+
+    def save(self, path):
+        save_array(path, np.stack([self.ids, self.sorted_ids, self.sorted_codes]).astype(np.int64))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __contains__(self, raw_id):
+        return self.get(raw_id) is not None
+
+    def __getitem__(self, raw_id):
+        code = self.get(raw_id)
+        if code is None:
+            raise KeyError(raw_id)
+        return code
+
+    def get(self, raw_id, default=None):
+        try:
+            raw_id = int(raw_id)
+        except (TypeError, ValueError):
+            return default
+        i = int(np.searchsorted(self.sorted_ids, raw_id))
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == raw_id:
+            return int(self.sorted_codes[i])
+        return default
+
+    def keys(self):
+        return self.ids.tolist()
+
+    def values(self):
+        return list(range(len(self.ids)))
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def encode_many(self, raw_ids):
+        """Vectorized encoding (-1 where the id is unknown)."""
+        raw_ids = np.asarray(raw_ids, dtype=np.int64)
+        if len(self.sorted_ids) == 0:
+            return np.full(raw_ids.shape, -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self.sorted_ids, raw_ids), len(self.sorted_ids) - 1)
+        return np.where(self.sorted_ids[i] == raw_ids, self.sorted_codes[i], -1)
+
+    def decode_many(self, codes):
+        """Vectorized decoding (-1 where the code is out of range)."""
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = (codes >= 0) & (codes < len(self.ids))
+        return np.where(valid, self.ids[np.where(valid, codes, 0)], -1) if len(self.ids) else np.full(codes.shape, -1)
+
+    @property
+    def decoder(self):
+        return IdDecoder(self)
+
+
+class IdDecoder:
+    """code -> id view of an IdEncoder, compatible with the *_decoded dicts."""
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+
+    def __len__(self):
+        return len(self.encoder)
+
+    def __iter__(self):
+        return iter(range(len(self.encoder)))
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __getitem__(self, code):
+        raw_id = self.get(code)
+        if raw_id is None:
+            raise KeyError(code)
+        return raw_id
+
+    def get(self, code, default=None):
+        try:
+            code = int(code)
+        except (TypeError, ValueError):
+            return default
+        if 0 <= code < len(self.encoder):
+            return int(self.encoder.ids[code])
+        return default
+
+    def keys(self):
+        return list(range(len(self.encoder)))
+
+    def values(self):
+        return self.encoder.ids.tolist()
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def decode_many(self, codes):
+        return self.encoder.decode_many(codes)
+
+
+def encode_many(encoder, raw_ids):
+    """Vectorized encode for an IdEncoder or a legacy dict (-1 where unknown)."""
+    if isinstance(encoder, IdEncoder):
+        return encoder.encode_many(raw_ids)
+    return np.array([encoder.get(raw_id, -1) for raw_id in raw_ids], dtype=np.int64)
+
+
+def decode_many(decoder, codes):
+    """Vectorized decode for an IdDecoder or a legacy dict (-1 where unknown)."""
+    if isinstance(decoder, IdDecoder):
+        return decoder.decode_many(codes)
+    return np.array([decoder.get(int(code), -1) for code in codes], dtype=np.int64)
@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import os
+
+
+class LocalBlob:
+    """
+    A file standing in for a GCS blob: the attributes and the ranged
+    download_as_bytes() that DataIngestion uses, with google-cloud-storage
+    semantics (md5_hash is base64, `end` is inclusive).
+    """
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.directory, name)
+        self.reload()
+
+    def reload(self):
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.generation = stat.st_mtime_ns
+        self.crc32c = None
+
+        md5 = hashlib.md5()
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        self.md5_hash = base64.b64encode(md5.digest()).decode("ascii")
+
+    def download_as_bytes(self, start=None, end=None):
+        start = start or 0
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(-1 if end is None else end - start + 1)
+
+
+class LocalBucket:
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+
+    def get_blob(self, blob_name):
+        if not os.path.isfile(os.path.join(self.directory, blob_name)):
+            return None
+        return LocalBlob(self, blob_name)
+
+
+class LocalBucketClient:
+    """
+    Drop-in for google.cloud.storage.Client backed by a local directory:
+    every bucket name resolves to `directory`, whose files are the blobs.
+
+        DataIngestion(config, client=LocalBucketClient("/data/bucket"))
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def bucket(self, bucket_name):
+        return LocalBucket(bucket_name, self.directory)
@@ -0,0 +1,239 @@
+import bisect
+import functools
+import threading
+import time
+
+# Latency buckets in seconds: 0.1 ms .. 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, labels, extra=()):
+    pairs = [*zip(labelnames, labels), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Unlabelled counters are exported from the start, at 0
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def inc(self, *labels, amount=1):
+        if not REGISTRY.enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _format_labels(self.labelnames, labels), value) for labels, value in sorted(values.items())]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram (Prometheus semantics), one set of buckets per
+    label combination. observe() is a bisect plus a few additions under a lock.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}    # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def observe(self, value, *labels):
+        if not REGISTRY.enabled:
+            return
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *labels):
+        """Context manager observing the elapsed wall time of its block."""
+        if not REGISTRY.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def timed(self, *labels):
+        """Decorator form of time(); defaults the label to the function name."""
+        def decorator(fn):
+            fn_labels = labels or (fn.__name__,)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.time(*fn_labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def collect(self):
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+
+        samples = []
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), values):
+                cumulative += n
+                le = (("le", _format_value(float(bound))),)
+                samples.append((f"{self.name}_bucket", _format_labels(self.labelnames, labels, le), cumulative))
+            samples.append((f"{self.name}_sum", _format_labels(self.labelnames, labels), values[-2]))
+            samples.append((f"{self.name}_count", _format_labels(self.labelnames, labels), values[-1]))
+        return samples
+
+
+class CallbackMetric:
+    """Metric whose values are read from `fn()` ({labels tuple: value}) at scrape time."""
+
+    def __init__(self, name, help, kind, labelnames, fn, registry=None):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        (registry or REGISTRY).register(self)
+
+    def collect(self):
+        return [(self.name, _format_labels(self.labelnames, labels), value)
+                for labels, value in sorted(self.fn().items())]
+
+
+class Registry:
+    """Metrics rendered together in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.collect():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def set_enabled(enabled):
+    """Turn recording on or off process-wide (disabled timers cost one attribute check)."""
+    REGISTRY.enabled = bool(enabled)
+
+
+# Hot-path metrics shared by the serving modules
+STAGE_LATENCY = Histogram(
+    "recommendation_stage_seconds",
+    "Time spent in each stage of the recommendation pipeline.",
+    ("pipeline", "stage"),
+)
+HELPER_LATENCY = Histogram(
+    "recommendation_helper_seconds",
+    "Time spent in each helper of utils/helpers.py.",
+    ("helper",),
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_seconds",
+    "Flask request latency by endpoint.",
+    ("endpoint",),
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Flask requests by endpoint and status code.",
+    ("endpoint", "status"),
+)
+CACHE_LOOKUPS = Counter(
+    "recommendation_cache_lookups_total",
+    "Result cache lookups by outcome (hit or miss).",
+    ("result",),
+)
+ARTIFACT_LOADS = Counter(
+    "artifact_loads_total",
+    "Artifacts read from disk by the artifact store, by kind.",
+    ("kind",),
+)
+ARTIFACT_LOAD_LATENCY = Histogram(
+    "artifact_load_seconds",
+    "Time to read an artifact from disk, by kind.",
+    ("kind",),
+)
+ARTIFACT_RELOADS = Counter(
+    "artifact_reloads_total",
+    "Artifact version changes picked up by the artifact store.",
+)
@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into batches for a vectorized handler.
+
+    A worker thread takes the first queued item, keeps collecting until
+    `max_wait_ms` has passed or `max_batch_size` items are queued, then calls
+    `handler(items)` once and hands each caller its own result. A request
+    therefore waits at most max_wait_ms plus one batch's compute time.
+    """
+
+    def __init__(self, handler, max_batch_size=64, max_wait_ms=5.0):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.counters = {"batches": 0, "items": 0}
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Queue one item; the returned Future resolves to handler's result for it."""
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.handler(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._lock:
+                self.counters["batches"] += 1
+                self.counters["items"] += len(batch)
+
+    def stats(self):
+        with self._lock:
+            batches, items = self.counters["batches"], self.counters["items"]
+        return {"batches": batches, "items": items, "mean_batch_size": items / batches if batches else 0.0}
@@ -0,0 +1,59 @@
+import numpy as np
+
+from utils.topk import top_k
+
+
+class NeighbourTable:
+    """
+    Precomputed top-K neighbours of every embedding row.
+
+    indices[i] holds the K most similar rows to row i (itself excluded), most
+    similar first, padded with -1; similarities[i] holds their scores.
+    """
+
+    FIELDS = ("indices", "similarities")
+
+    def __init__(self, indices, similarities):
+        self.indices = indices
+        self.similarities = similarities
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    @classmethod
+    def build(cls, weights, k, block_size=1024):
+        """All-pairs top-k, one (block x n) matrix multiply at a time."""
+        weights = np.asarray(weights, dtype=np.float32)
+        n_rows = len(weights)
+        indices = np.full((n_rows, k), -1, dtype=np.int32)
+        similarities = np.zeros((n_rows, k), dtype=np.float16)
+
+        for start in range(0, n_rows, block_size):
+            rows = np.arange(start, min(start + block_size, n_rows))
+            scores = weights[rows] @ weights.T
+            best = top_k(scores, k, self_index=rows)
+            width = best.shape[1]
+
+            valid = best >= 0
+            indices[rows, :width] = best
+            similarities[rows, :width] = np.where(valid, np.take_along_axis(scores, np.maximum(best, 0), axis=1), 0)
+
+        return cls(indices, similarities)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.FIELDS}
+        for arr in arrays.values():
+            arr.setflags(write=False)
+        return cls(**arrays)
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name) for name in self.FIELDS})
+
+    def lookup(self, index, n):
+        """(neighbour indices, similarities) of one row, most similar first."""
+        indices = self.indices[index, :n]
+        valid = indices >= 0
+        return indices[valid].astype(np.int64), self.similarities[index, :n][valid].astype(np.float32)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+
+def _percentile_75(sorted_desc, starts, counts):
+    """
+    Per-user 75th percentile over descending-sorted rating slices.
+    Reproduces np.percentile's linear interpolation exactly.
+    """
+    pos = 0.75 * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, counts - 1)
+    t = pos - lo
+
+    # Ascending index j lives at descending index (count - 1 - j)
+    a = sorted_desc[starts + counts - 1 - lo]
+    b = sorted_desc[starts + counts - 1 - hi]
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+class RatingIndex:
+    """
+    Compressed-sparse-row index over the processed ratings.
+
+    Users are sorted by id; user i owns rows offsets[i]:offsets[i + 1] of the
+    parallel anime_ids / ratings arrays, ordered by rating (highest first).
+    top_counts[i] is the number of leading rows at or above that user's 75th
+    percentile, so a user's preferences are a single slice.
+    """
+
+    FIELDS = ("user_ids", "offsets", "anime_ids", "ratings", "top_counts")
+
+    def __init__(self, user_ids, offsets, anime_ids, ratings, top_counts):
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.anime_ids = anime_ids
+        self.ratings = ratings
+        self.top_counts = top_counts
+
+    @classmethod
+    def from_frame(cls, rating_df: pd.DataFrame):
+        """Build the index from a frame with user_id, anime_id and rating columns."""
+        rating_df = rating_df.dropna(subset=["rating"])
+        users = rating_df["user_id"].to_numpy(dtype=np.int64)
+        anime = rating_df["anime_id"].to_numpy(dtype=np.int64)
+        ratings = rating_df["rating"].to_numpy(dtype=np.float64)
+
+        # Group by user, highest rating first (stable for ties)
+        order = np.lexsort((-ratings, users))
+        users, anime, ratings = users[order], anime[order], ratings[order]
+
+        user_ids, starts, counts = np.unique(users, return_index=True, return_counts=True)
+        offsets = np.append(starts, len(users)).astype(np.int64)
+
+        threshold = _percentile_75(ratings, starts, counts)
+        owner = np.repeat(np.arange(len(user_ids)), counts)
+        top_counts = np.bincount(owner, weights=ratings >= threshold[owner], minlength=len(user_ids))
+
+        return cls(user_ids, offsets, anime.astype(np.int32), ratings, top_counts.astype(np.int64))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in cls.FIELDS}
+        for arr in arrays.values():
+            arr.setflags(write=False)
+        return cls(**arrays)
+
+    def save(self, path):
+        np.savez(path, **{name: getattr(self, name) for name in self.FIELDS})
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def row(self, user_id):
+        """Row of a user in the index, or -1 if the user has no ratings."""
+        i = int(np.searchsorted(self.user_ids, user_id))
+        if i < len(self.user_ids) and self.user_ids[i] == user_id:
+            return i
+        return -1
+
+    def rows(self, user_ids):
+        """Vectorized row lookup (-1 where missing)."""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if len(self.user_ids) == 0:
+            return np.full(user_ids.shape, -1, dtype=np.int64)
+        i = np.minimum(np.searchsorted(self.user_ids, user_ids), len(self.user_ids) - 1)
+        return np.where(self.user_ids[i] == user_ids, i, -1)
+
+    def user_ratings(self, user_id):
+        """(anime_ids, ratings) of everything a user rated, highest first."""
+        i = self.row(user_id)
+        if i < 0:
+            return self.anime_ids[:0], self.ratings[:0]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.anime_ids[start:stop], self.ratings[start:stop]
+
+    def preferences(self, user_id):
+        """anime_ids rated at or above the user's 75th percentile."""
+        i = self.row(user_id)
+        if i < 0:
+            return self.anime_ids[:0]
+        start = self.offsets[i]
+        return self.anime_ids[start:start + self.top_counts[i]]
+
+    def preferences_many(self, user_ids):
+        """
+        Top-quartile items for many users in one gather.
+        Returns (owner, anime_ids) where owner[j] is the position in
+        `user_ids` that anime_ids[j] belongs to.
+        """
+        rows = self.rows(user_ids)
+        owners = np.flatnonzero(rows >= 0)
+        rows = rows[owners]
+
+        starts = self.offsets[rows]
+        counts = self.top_counts[rows]
+        owner = np.repeat(owners, counts)
+
+        # Flat positions: each slice start plus 0..count-1
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owner, self.anime_ids[np.repeat(starts, counts) + within]
+
+    def take(self, rows):
+        """Index restricted to the given rows, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        counts = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        gather = np.repeat(self.offsets[rows] - offsets[:-1], counts) + np.arange(offsets[-1])
+        return RatingIndex(
+            self.user_ids[rows], offsets, self.anime_ids[gather], self.ratings[gather], self.top_counts[rows]
+        )
+
+    def to_frame(self):
+        """user_id / anime_id / rating frame of the whole index."""
+        return pd.DataFrame({
+            "user_id": np.repeat(self.user_ids, np.diff(self.offsets)),
+            "anime_id": self.anime_ids,
+            "rating": self.ratings,
+        })
+
+    def update(self, rating_df: pd.DataFrame):
+        """
+        New index with the ratings in `rating_df` added. A rating replaces every
+        earlier rating of the same (user, anime) pair, and the last one wins
+        when `rating_df` repeats a pair. Only the users present in `rating_df`
+        are re-sorted; every other user's slice is copied as is.
+        """
+        keys = ["user_id", "anime_id"]
+        rating_df = rating_df[keys + ["rating"]].drop_duplicates(keys, keep="last")
+        changed = np.unique(rating_df["user_id"].to_numpy(dtype=np.int64))
+        rows = self.rows(changed)
+
+        previous = self.take(rows[rows >= 0]).to_frame()
+        re_rated = pd.MultiIndex.from_frame(previous[keys]).isin(pd.MultiIndex.from_frame(rating_df[keys]))
+        merged = pd.concat([previous[~re_rated], rating_df])
+        updated = RatingIndex.from_frame(merged)
+        kept = self.take(np.flatnonzero(~np.isin(self.user_ids, changed)))
+
+        # Interleave the two disjoint user sets back into id order
+        both = [kept, updated]
+        user_ids = np.concatenate([index.user_ids for index in both])
+        shift = np.cumsum([0] + [len(index.anime_ids) for index in both[:-1]])
+        combined = RatingIndex(
+            user_ids,
+            np.concatenate([index.offsets[:-1] + s for index, s in zip(both, shift)] + [[shift[-1] + len(updated.anime_ids)]]),
+            np.concatenate([index.anime_ids for index in both]),
+            np.concatenate([index.ratings for index in both]),
+            np.concatenate([index.top_counts for index in both]),
+        )
+        return combined.take(np.argsort(user_ids, kind="stable"))
@@ -0,0 +1,191 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(user_id, user_weight, content_weight, version, rerank_weight=0.0):
+    """String key shared by every backend (and every worker using the same artifacts)."""
+    key = f"{int(user_id)}|{float(user_weight)!r}|{float(content_weight)!r}|{version}"
+    # Re-ranked results are keyed apart; plain keys keep their existing format
+    return f"{key}|rerank={float(rerank_weight)!r}" if rerank_weight else key
+
+
+class ResultCache:
+    """
+    In-process LRU cache of recommendation results.
+
+    Bounded by entry count and by the pickled size of the stored values;
+    entries older than `ttl` seconds count as misses. Keys carry the artifact
+    version (see cache_key), so results from older weights are never served.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 2**20, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()   # key -> (value, size, created)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[2] > self.ttl:
+                self._remove(key)
+                self.counters["expirations"] += 1
+                entry = None
+
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(key) + len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.time())
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class SQLiteResultCache:
+    """
+    ResultCache backed by a local SQLite file, shared by every worker process
+    on the host. Same limits and TTL; LRU order is the last-access timestamp.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=64 * 2**20, ttl=3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connect(self):
+        # One connection per thread; WAL lets readers and a writer run concurrently
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+
+        if row is not None and self.ttl and now - row[1] > self.ttl:
+            with conn:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._count("expirations")
+            row = None
+
+        if row is None:
+            self._count("misses")
+            return None
+
+        with conn:
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(key) + len(blob)
+        if size > self.max_bytes:
+            return
+
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, size, now, now),
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+
+            # Least recently used first, until both limits hold again
+            evicted = 0
+            while count > self.max_entries or total > self.max_bytes:
+                old_key, old_size = conn.execute(
+                    "SELECT key, size FROM results ORDER BY accessed LIMIT 1"
+                ).fetchone()
+                conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                count, total, evicted = count - 1, total - old_size, evicted + 1
+        self._count("evictions", evicted)
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self):
+        count, total = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        with self._lock:
+            return {**self.counters, "entries": count, "bytes": total}
+
+
+def build_result_cache(config: dict, default_sqlite_path=None):
+    """Cache described by the `serving.cache` section of config.yaml (None when disabled)."""
+    if not config.get("enabled", True):
+        return None
+
+    limits = {
+        "max_entries": config.get("max_entries", 10000),
+        "max_bytes": config.get("max_bytes", 64 * 2**20),
+        "ttl": config.get("ttl_seconds", 3600),
+    }
+    if config.get("backend", "memory") == "sqlite":
+        return SQLiteResultCache(config.get("sqlite_path") or default_sqlite_path, **limits)
+    return ResultCache(**limits)
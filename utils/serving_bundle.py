@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.numpy_trainer import HEAD
+from utils.columnar import column_kind, decode_strings, encode_strings
+from utils.id_encoder import IdEncoder
+from utils.neighbour_table import NeighbourTable
+from utils.rating_index import RatingIndex
+from utils.synopsis_store import FIELDS as SYNOPSIS_FIELDS, SynopsisStore
+from utils.watched_index import WatchedIndex
+
+MAGIC = b"ANIMEBDL"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# magic, format version, header length, header crc32
+_PREFIX = struct.Struct("<8sIQI")
+
+
+def _aligned(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _crc32(array):
+    return zlib.crc32(memoryview(np.ascontiguousarray(array)).cast("B")) & 0xFFFFFFFF
+
+
+def frame_arrays(name, df):
+    """Arrays and column spec for a DataFrame (numeric columns as-is, strings as blob + offsets + nulls)."""
+    arrays, columns = {}, []
+    for column in df.columns:
+        kind, values = column_kind(df[column])
+        key = f"{name}/{column}"
+        if kind == "numeric":
+            arrays[key] = values
+        else:
+            blob, offsets, nulls = encode_strings(values)
+            arrays.update({f"{key}.blob": blob, f"{key}.offsets": offsets, f"{key}.nulls": nulls})
+        columns.append({"name": str(column), "kind": kind})
+    return arrays, {"rows": len(df), "columns": columns}
+
+
+def write_bundle(path, arrays, frames=None, meta=None):
+    """
+    Write named arrays (and frame specs from frame_arrays) as one file:
+
+        prefix   magic, format version, header length, header crc32
+        header   JSON: offset/dtype/shape/crc32 of every array, frames, meta
+        data     each array C-contiguous at a 64-byte aligned offset
+
+    The file is written next to `path` and moved into place, so processes
+    that have the previous bundle memory-mapped keep a valid view.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {
+            "offset": offset,
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "crc32": _crc32(array),
+        }
+        offset = _aligned(offset + array.nbytes)
+
+    content = hashlib.sha1(json.dumps(layout, sort_keys=True).encode()).hexdigest()[:12]
+    header = {
+        "format_version": FORMAT_VERSION,
+        "bundle_version": content,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "arrays": layout,
+        "frames": frames or {},
+        "meta": meta or {},
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _aligned(_PREFIX.size + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes), zlib.crc32(header_bytes) & 0xFFFFFFFF))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(memoryview(array).cast("B"))
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    return header
+
+
+class ServingBundle:
+    """
+    Read side of write_bundle: the file is memory-mapped once and every array
+    is a zero-copy, read-only view into it, so opening costs one header parse.
+    Array checksums are only computed by verify().
+    """
+
+    def __init__(self, path, header, buffer, data_start):
+        self.path = path
+        self.header = header
+        self._buffer = buffer
+        self._data_start = data_start
+
+    @classmethod
+    def open(cls, path, verify=False):
+        # Plain ndarray views (the memmap stays alive as their base)
+        buffer = np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+        magic, format_version, header_length, header_crc = _PREFIX.unpack(bytes(buffer[:_PREFIX.size]))
+        if magic != MAGIC:
+            raise ValueError(f"Not a serving bundle: {path}")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported serving bundle format {format_version} (expected {FORMAT_VERSION})")
+
+        header_bytes = bytes(buffer[_PREFIX.size:_PREFIX.size + header_length])
+        if zlib.crc32(header_bytes) & 0xFFFFFFFF != header_crc:
+            raise ValueError(f"Serving bundle header checksum mismatch: {path}")
+
+        bundle = cls(path, json.loads(header_bytes), buffer, _aligned(_PREFIX.size + header_length))
+        if verify:
+            bundle.verify()
+        return bundle
+
+    @property
+    def version(self):
+        return self.header["bundle_version"]
+
+    def __contains__(self, name):
+        """An array, a frame, or a group of arrays stored as "<name>/<field>"."""
+        arrays = self.header["arrays"]
+        return name in arrays or name in self.header["frames"] or any(key.startswith(f"{name}/") for key in arrays)
+
+    def array(self, name):
+        spec = self.header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = self._data_start + spec["offset"]
+        return self._buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+    def verify(self):
+        """Check every array against its stored crc32; raises ValueError on the first mismatch."""
+        for name, spec in self.header["arrays"].items():
+            if _crc32(self.array(name)) != spec["crc32"]:
+                raise ValueError(f"Serving bundle checksum mismatch for {name}: {self.path}")
+
+    # -----------------------------
+    # Typed views
+    # -----------------------------
+    def frame(self, name, columns=None):
+        spec = self.header["frames"][name]
+        data = {}
+        for column in spec["columns"]:
+            if columns is not None and column["name"] not in columns:
+                continue
+            key = f"{name}/{column['name']}"
+            if column["kind"] == "numeric":
+                data[column["name"]] = np.asarray(self.array(key))
+            else:
+                data[column["name"]] = decode_strings(
+                    self.array(f"{key}.blob"), self.array(f"{key}.offsets"), self.array(f"{key}.nulls")
+                )
+        return pd.DataFrame(data)
+
+    def encoder(self, name):
+        data = self.array(name)
+        return IdEncoder(data[0], data[1], data[2])
+
+    def rating_index(self):
+        return RatingIndex(**{field: self.array(f"rating_index/{field}") for field in RatingIndex.FIELDS})
+
+    def watched_index(self):
+        # Shares the rating index offsets; only the codes are stored
+        return WatchedIndex(self.array("rating_index/offsets"), self.array("watched_index/codes"),
+                            self.header["meta"]["anime"])
+
+    def synopsis_store(self):
+        spec = self.header["meta"]["synopsis_store"]
+        arrays = {field: self.array(f"synopsis_store/{field}") for field in SYNOPSIS_FIELDS}
+        return SynopsisStore(**arrays, compression=spec["compression"], block_rows=spec["block_rows"])
+
+    def model_head(self):
+        if "model_head" not in self:
+            return None
+        return {name: float(value) for name, value in zip(HEAD, self.array("model_head"))}
+
+    def neighbour_table(self):
+        if "anime_neighbours/indices" not in self:
+            return None
+        return NeighbourTable(**{field: self.array(f"anime_neighbours/{field}") for field in NeighbourTable.FIELDS})
+
+
+def _encoder_array(encoder):
+    if not isinstance(encoder, IdEncoder):
+        # Legacy {id: code} pickle
+        encoder = IdEncoder.from_ids([raw_id for raw_id, _ in sorted(encoder.items(), key=lambda item: item[1])])
+    return np.stack([encoder.ids, encoder.sorted_ids, encoder.sorted_codes]).astype(np.int64)
+
+
+def build_serving_bundle(path, store):
+    """
+    Package the serving artifacts of `store` (an ArtifactStore over the
+    current training outputs) into one bundle file at `path`.
+    """
+    user_weights = np.asarray(store.user_weights, dtype=np.float32)
+    anime_weights = np.asarray(store.anime_weights, dtype=np.float32)
+    user_encoder = store.user2user_encoded
+    anime_encoder = store.anime2anime_encoded
+    rating_index = store.rating_index
+
+    arrays = {
+        "user_weights": user_weights,
+        "anime_weights": anime_weights,
+        "user_encoder": _encoder_array(user_encoder),
+        "anime_encoder": _encoder_array(anime_encoder),
+    }
+    arrays.update({f"rating_index/{field}": getattr(rating_index, field) for field in RatingIndex.FIELDS})
+
+    arrays["watched_index/codes"] = store.watched_index.codes
+
+    neighbours = store.anime_neighbours
+    if neighbours is not None:
+        arrays.update({f"anime_neighbours/{field}": getattr(neighbours, field) for field in NeighbourTable.FIELDS})
+
+    head = store.model_head
+    if head is not None:
+        arrays["model_head"] = np.asarray([head[name] for name in HEAD], dtype=np.float32)
+
+    synopses = store.synopses
+    arrays.update({f"synopsis_store/{field}": getattr(synopses, field) for field in SYNOPSIS_FIELDS})
+
+    frames = {}
+    for name, df in (("anime_df", store.anime_df), ("synopsis_df", store.synopsis_df)):
+        frame_data, frames[name] = frame_arrays(name, df)
+        arrays.update(frame_data)
+
+    meta = {
+        "source_version": store.version,
+        "users": len(user_encoder),
+        "anime": len(anime_encoder),
+        "embedding_size": int(user_weights.shape[1]),
+        "synopsis_store": {"compression": synopses.compression, "block_rows": synopses.block_rows},
+    }
+    return write_bundle(path, arrays, frames, meta)
+
+
+def check_bundle_sources(path, paths, since=None):
+    """
+    Check that the bundle at `path` was built from the artifact files in
+    `paths` (ArtifactStore path names): its weights, encoders and rating
+    index must have the checksums of those files. With `since` (a
+    time.time() value), the weight files must also have been written after
+    it, i.e. by the run that just finished. Raises ValueError on the first
+    artifact that doesn't match.
+    """
+    bundle = ServingBundle.open(path)
+
+    if since is not None:
+        for name in ("user_weights", "anime_weights"):
+            if os.path.getmtime(paths[name]) < since:
+                raise ValueError(f"{paths[name]} predates this run; the bundle would serve stale {name}")
+
+    rating_index = RatingIndex.load(paths["rating_index"])
+    sources = {
+        "user_weights": np.load(paths["user_weights"], mmap_mode="r").astype(np.float32),
+        "anime_weights": np.load(paths["anime_weights"], mmap_mode="r").astype(np.float32),
+        "user_encoder": _encoder_array(IdEncoder.load(paths["user2user_encoded"])),
+        "anime_encoder": _encoder_array(IdEncoder.load(paths["anime2anime_encoded"])),
+        **{f"rating_index/{field}": getattr(rating_index, field) for field in RatingIndex.FIELDS},
+    }
+    for name, array in sources.items():
+        if _crc32(array) != bundle.header["arrays"][name]["crc32"]:
+            raise ValueError(f"Serving bundle {name} doesn't match its source file: {path}")
+
@@ -0,0 +1,198 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+MANIFEST = "stage.json"
+DIGESTS = "file_digests.json"
+FORMAT_VERSION = 1
+
+
+def code_version(*objects):
+    """Hash of the source of the functions/classes/modules a stage depends on."""
+    sha = hashlib.sha1()
+    for obj in objects:
+        sha.update(inspect.getsource(obj).encode("utf-8"))
+    return sha.hexdigest()[:12]
+
+
+def _output_stat(path):
+    """(name, size, mtime) of a file, or of every file under a directory; None when missing."""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return [[os.path.basename(path), stat.st_size, stat.st_mtime_ns]]
+    if not os.path.isdir(path):
+        return None
+
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            entries.append([os.path.relpath(os.path.join(root, name), path), stat.st_size, stat.st_mtime_ns])
+    return sorted(entries)
+
+
+class StageCache:
+    """
+    Fingerprinted outputs of pipeline stages, one directory per stage:
+
+        <directory>/<stage>/stage.json   fingerprint + stat of external outputs
+        <directory>/<stage>/...          files the stage cached itself
+
+    A stage's fingerprint hashes its input files' contents, its parameters,
+    its code version and the fingerprint of the stage it reads from, so a
+    change anywhere upstream invalidates everything after it. Only the latest
+    entry per stage is kept, prune() drops entries no run can hit any more,
+    and with max_bytes the oldest entries are evicted once the cache grows
+    past it. File digests are remembered by size and mtime so an unchanged
+    input is not re-hashed.
+
+    With force=True every lookup misses (entries are still written).
+    """
+
+    def __init__(self, directory, force=False, max_bytes=None):
+        self.directory = directory
+        self.force = force
+        self.max_bytes = max_bytes
+        self.reused = []
+        self.computed = []
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._digests_path = os.path.join(self.directory, DIGESTS)
+        self._digests = {}
+        if os.path.exists(self._digests_path):
+            with open(self._digests_path) as f:
+                self._digests = json.load(f)
+
+    # -----------------------------
+    # Fingerprints
+    # -----------------------------
+    def file_digest(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self._digests.get(path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha1"]
+
+        sha = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        self._digests[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha.hexdigest()}
+        self._write_json(self._digests_path, self._digests)
+        return sha.hexdigest()
+
+    def fingerprint(self, stage, inputs=(), params=None, code=None, upstream=None):
+        spec = {
+            "format_version": FORMAT_VERSION,
+            "stage": stage,
+            "inputs": [self.file_digest(path) for path in inputs],
+            "params": params or {},
+            "code": code,
+            "upstream": upstream,
+        }
+        return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    # -----------------------------
+    # Entries
+    # -----------------------------
+    def path(self, stage):
+        return os.path.join(self.directory, stage)
+
+    def lookup(self, stage, fingerprint):
+        """Directory of the cached stage when its fingerprint matches and its outputs are untouched, else None."""
+        manifest = None if self.force else self._manifest(stage)
+        if manifest is None or manifest["fingerprint"] != fingerprint:
+            return None
+        if any(_output_stat(path) != stat for path, stat in manifest["outputs"].items()):
+            return None
+        return self.path(stage)
+
+    def store(self, stage, fingerprint, write=None, outputs=()):
+        """
+        Record a stage run. `write(directory)` saves whatever the stage caches
+        itself; `outputs` are files/directories it wrote elsewhere, checked by
+        stat on lookup. The entry is assembled aside and renamed into place.
+        """
+        tmp_path = f"{self.path(stage)}.tmp"
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        if write is not None:
+            write(tmp_path)
+
+        manifest = {
+            "fingerprint": fingerprint,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "outputs": {path: _output_stat(path) for path in outputs},
+        }
+        self._write_json(os.path.join(tmp_path, MANIFEST), manifest)
+
+        if os.path.isdir(self.path(stage)):
+            shutil.rmtree(self.path(stage))
+        os.replace(tmp_path, self.path(stage))
+        self._enforce_cap(keep=stage)
+
+    def discard(self, stage):
+        """Remove a stage's entry (e.g. one a later stage's entry supersedes)."""
+        if os.path.isdir(self.path(stage)):
+            shutil.rmtree(self.path(stage))
+
+    def prune(self, current):
+        """
+        Remove what no run can hit any more: entries of stages missing from
+        `current` (stage -> this run's fingerprint) or stored under another
+        fingerprint, leftover temporary directories, and the digests of files
+        that no longer exist.
+        """
+        for stage in self._stages():
+            manifest = self._manifest(stage)
+            if stage.endswith(".tmp") or manifest is None or current.get(stage) != manifest["fingerprint"]:
+                shutil.rmtree(self.path(stage))
+
+        existing = {path: digest for path, digest in self._digests.items() if os.path.exists(path)}
+        if len(existing) != len(self._digests):
+            self._digests = existing
+            self._write_json(self._digests_path, self._digests)
+
+    def nbytes(self, stage=None):
+        """Bytes on disk of one entry, or of every entry."""
+        stages = [stage] if stage else self._stages()
+        return sum(size for stage in stages for _, size, _ in _output_stat(self.path(stage)) or [])
+
+    def _enforce_cap(self, keep):
+        """Evict the oldest entries other than `keep` while the cache is over max_bytes."""
+        if self.max_bytes is None:
+            return
+        sizes = {stage: self.nbytes(stage) for stage in self._stages() if stage != keep}
+        total = sum(sizes.values()) + self.nbytes(keep)
+        for stage in sorted(sizes, key=lambda stage: os.stat(self.path(stage)).st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self.path(stage))
+            total -= sizes[stage]
+
+    def _stages(self):
+        return sorted(name for name in os.listdir(self.directory) if os.path.isdir(self.path(name)))
+
+    def _manifest(self, stage):
+        manifest_path = os.path.join(self.path(stage), MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def record(self, stage, reused):
+        (self.reused if reused else self.computed).append(stage)
+
+    def summary(self):
+        return {"reused": list(self.reused), "computed": list(self.computed)}
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
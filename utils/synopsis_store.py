@@ -0,0 +1,186 @@
+import json
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar import decode_strings, encode_strings
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+FIELDS = ("ids", "offsets", "nulls", "blob", "block_offsets", "names_blob", "names_offsets", "name_rows")
+
+
+def synopsis_columns(df):
+    """(id, name, text) column names of a synopsis frame (anime_with_synopsis.csv spells it "sypnopsis")."""
+    id_col = "MAL_ID" if "MAL_ID" in df.columns else "anime_id"
+    text_col = "sypnopsis" if "sypnopsis" in df.columns else "synopsis"
+    return id_col, "Name", text_col
+
+
+class SynopsisStore:
+    """
+    Synopses indexed by anime_id: a sorted id array, byte offsets and one UTF-8
+    blob, so a lookup is a binary search plus a slice of the (memory-mapped)
+    blob. Names resolve through the same rows: unique names are kept sorted
+    with the row each one points to.
+
+    With compression, the blob is split into blocks of `block_rows` synopses,
+    each zlib-compressed on its own; offsets stay in uncompressed bytes and
+    block_offsets locate each compressed block. Recently used blocks are kept
+    decompressed.
+
+    Every frame row is kept; when an id or a name appears more than once, the
+    first row wins (as a filter over the frame would return).
+    """
+
+    def __init__(self, ids, offsets, nulls, blob, block_offsets, names_blob, names_offsets, name_rows,
+                 compression=None, block_rows=64, cached_blocks=64):
+        self.ids = ids
+        self.offsets = offsets
+        self.nulls = nulls
+        self.blob = blob
+        self.block_offsets = block_offsets
+        self.names_blob = names_blob
+        self.names_offsets = names_offsets
+        self.name_rows = name_rows
+        self.compression = compression
+        self.block_rows = block_rows
+
+        self._names = None
+        self._blocks = OrderedDict()
+        self._cached_blocks = cached_blocks
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, compression=None, block_rows=64):
+        id_col, name_col, text_col = synopsis_columns(df)
+        ids = pd.to_numeric(df[id_col]).to_numpy(dtype=np.int64)
+        # Stable sort: the first row of a repeated id is the one searchsorted finds
+        order = np.argsort(ids, kind="stable")
+
+        blob, offsets, nulls = encode_strings(df[text_col].to_numpy(dtype=object)[order])
+        block_offsets = np.zeros(1, dtype=np.int64)
+        if compression == "zlib":
+            blob, block_offsets = cls._compress(blob, offsets, block_rows)
+        elif compression is not None:
+            raise ValueError(f"Unknown synopsis compression: {compression}")
+
+        # Name -> store row of the first frame row with that name
+        names = df[name_col].astype(object).where(df[name_col].notna(), None).to_numpy()
+        named = pd.Series(names).notna().to_numpy() & ~pd.Series(names).duplicated(keep="first").to_numpy()
+        rows = np.empty(len(order), dtype=np.int64)
+        rows[order] = np.arange(len(order))
+        rows = rows[named]
+        unique_names = np.asarray([str(name) for name in names[named]], dtype=object)
+        name_order = np.argsort(unique_names, kind="stable")
+        names_blob, names_offsets, _ = encode_strings(unique_names[name_order])
+
+        return cls(ids[order], offsets, nulls, blob, block_offsets, names_blob, names_offsets,
+                   rows[name_order].astype(np.int64), compression, block_rows)
+
+    @staticmethod
+    def _compress(blob, offsets, block_rows):
+        starts = offsets[::block_rows]
+        ends = np.append(starts[1:], offsets[-1])
+        blocks = [zlib.compress(bytes(blob[start:end])) for start, end in zip(starts, ends)]
+        block_offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+        np.cumsum([len(block) for block in blocks], out=block_offsets[1:])
+        return np.frombuffer(b"".join(blocks), dtype=np.uint8), block_offsets
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, directory):
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+        for field in FIELDS:
+            np.save(os.path.join(directory, f"{field}.npy"), getattr(self, field))
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "rows": len(self),
+            "compression": self.compression,
+            "block_rows": self.block_rows,
+        }
+        with open(os.path.join(directory, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        arrays = {
+            field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r" if mmap and field == "blob" else None)
+            for field in FIELDS
+        }
+        return cls(**arrays, compression=manifest["compression"], block_rows=manifest["block_rows"])
+
+    @staticmethod
+    def exists(directory):
+        # Columnar tables have a manifest.json too; only a store has ids.npy next to it
+        return all(os.path.exists(os.path.join(directory, name)) for name in (MANIFEST, "ids.npy"))
+
+    # -----------------------------
+    # Lookups
+    # -----------------------------
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, anime_ids):
+        """Row of each anime id (-1 where missing)."""
+        anime_ids = np.asarray(anime_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, anime_ids)
+        found = rows < len(self.ids)
+        found[found] = self.ids[rows[found]] == anime_ids[found]
+        return np.where(found, rows, -1)
+
+    def row_by_name(self, name):
+        if self._names is None:
+            self._names = decode_strings(self.names_blob, self.names_offsets)
+        i = int(np.searchsorted(self._names, name))
+        if i < len(self._names) and self._names[i] == name:
+            return int(self.name_rows[i])
+        return -1
+
+    def _block(self, block):
+        with self._lock:
+            data = self._blocks.get(block)
+            if data is not None:
+                self._blocks.move_to_end(block)
+                return data
+
+        start, end = self.block_offsets[block], self.block_offsets[block + 1]
+        data = zlib.decompress(bytes(self.blob[start:end]))
+        with self._lock:
+            self._blocks[block] = data
+            if len(self._blocks) > self._cached_blocks:
+                self._blocks.popitem(last=False)
+        return data
+
+    def text(self, row):
+        """Synopsis of a row (None for a missing synopsis or row -1)."""
+        if row < 0 or self.nulls[row]:
+            return None
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        if self.compression is None:
+            return bytes(self.blob[start:end]).decode("utf-8")
+
+        block = row // self.block_rows
+        base = int(self.offsets[block * self.block_rows])
+        return self._block(block)[start - base:end - base].decode("utf-8")
+
+    def get(self, anime):
+        """Synopsis by anime id (int) or name (str); None when not found."""
+        if isinstance(anime, str):
+            return self.text(self.row_by_name(anime))
+        return self.text(int(self.rows([anime])[0]))
+
+    def get_many(self, anime_ids):
+        """Synopses for a sequence of anime ids, in order (None where missing)."""
+        return [self.text(int(row)) for row in self.rows(anime_ids)]
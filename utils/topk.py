@@ -0,0 +1,51 @@
+import numpy as np
+
+
+def top_k(scores, k, neg=False, self_index=None, excluded=None):
+    """
+    Indices of the k best scores, best first, using partial selection.
+
+    scores     : 1-D array (one query) or 2-D array (one query per row)
+    neg        : pick the lowest scores instead of the highest
+    self_index : index to leave out (e.g. the query itself); for 2-D input
+                 one index per row, -1 meaning none
+    excluded   : boolean mask of columns to leave out, shape (N,) or (rows, N)
+
+    argpartition is O(N); only the k survivors get sorted. For 2-D input,
+    rows with fewer than k eligible columns are padded with -1.
+    """
+    scores = np.asarray(scores)
+    single = scores.ndim == 1
+    scores = np.atleast_2d(scores)
+    rows, n_cols = scores.shape
+
+    # Work on "higher is better" keys so both directions share one path
+    keys = -scores if neg else scores.copy()
+    if keys.dtype.kind != "f":
+        keys = keys.astype(np.float64)
+
+    if excluded is not None:
+        keys[np.broadcast_to(excluded, keys.shape)] = -np.inf
+    if self_index is not None:
+        self_index = np.broadcast_to(np.asarray(self_index), (rows,))
+        has_self = self_index >= 0
+        keys[np.flatnonzero(has_self), self_index[has_self]] = -np.inf
+
+    k = min(k, n_cols)
+    if k <= 0:
+        empty = np.empty((rows, 0), dtype=np.int64)
+        return empty[0] if single else empty
+
+    if k < n_cols:
+        part = np.argpartition(keys, n_cols - k, axis=1)[:, n_cols - k:]
+    else:
+        part = np.broadcast_to(np.arange(n_cols), (rows, n_cols)).copy()
+
+    part_keys = np.take_along_axis(keys, part, axis=1)
+    order = np.argsort(-part_keys, axis=1, kind="stable")
+    idx = np.take_along_axis(part, order, axis=1)
+    valid = np.take_along_axis(part_keys, order, axis=1) > -np.inf
+
+    if single:
+        return idx[0][valid[0]]
+    return np.where(valid, idx, -1)
@@ -0,0 +1,68 @@
+import numpy as np
+
+from utils.id_encoder import encode_many
+
+# Largest anime id encoded through a dense lookup table (64 MB of codes)
+MAX_LOOKUP_ID = 1 << 24
+
+
+class WatchedIndex:
+    """
+    Everything each user has rated, as encoded anime indices.
+
+    Parallel to a RatingIndex: row i owns codes[offsets[i]:offsets[i + 1]]
+    (-1 for anime without an embedding). bitsets() packs the rows of a group
+    of users into one bit per anime, so dropping watched anime from a
+    candidate list is a gather and a mask instead of string comparisons.
+    """
+
+    FIELDS = ("offsets", "codes")
+
+    def __init__(self, offsets, codes, n_anime):
+        self.offsets = offsets
+        self.codes = codes
+        self.n_anime = n_anime
+
+    @classmethod
+    def from_rating_index(cls, rating_index, anime_encoder):
+        anime_ids = rating_index.anime_ids
+        if len(anime_ids) and 0 <= anime_ids.min() and anime_ids.max() < MAX_LOOKUP_ID:
+            # Anime ids are small: encode every id up to the largest once, then one gather
+            lookup = encode_many(anime_encoder, np.arange(int(anime_ids.max()) + 1))
+            codes = lookup[anime_ids]
+        else:
+            codes = encode_many(anime_encoder, anime_ids)
+        return cls(rating_index.offsets, codes.astype(np.int32), len(anime_encoder))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def bitsets(self, rows):
+        """
+        Packed bitsets of the given rating-index rows, shape
+        (len(rows), ceil(n_anime / 8)) uint8, bit `code` set for every anime
+        the user rated (np.packbits order). Rows of -1 are empty.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        n_bytes = (self.n_anime + 7) // 8
+        packed = np.zeros(len(rows) * n_bytes, dtype=np.uint8)
+
+        owners = np.flatnonzero(rows >= 0)
+        starts = self.offsets[rows[owners]]
+        counts = self.offsets[rows[owners] + 1] - starts
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        codes = self.codes[np.repeat(starts, counts) + within].astype(np.int64)
+        owner = np.repeat(owners, counts)[codes >= 0]
+        codes = codes[codes >= 0]
+
+        # OR, not add: a user can have rated the same anime more than once
+        np.bitwise_or.at(packed, owner * n_bytes + (codes >> 3), (128 >> (codes & 7)).astype(np.uint8))
+        return packed.reshape(len(rows), n_bytes)
+
+    @staticmethod
+    def contains(bitsets, owners, codes):
+        """Whether codes[j] is set in bitsets[owners[j]] (False for codes of -1)."""
+        codes = np.asarray(codes, dtype=np.int64)
+        safe = np.maximum(codes, 0)
+        bits = bitsets[np.asarray(owners, dtype=np.int64), safe >> 3] & (128 >> (safe & 7))
+        return (bits != 0) & (codes >= 0)